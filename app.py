@@ -1,31 +1,93 @@
 #!/usr/bin/env python3
 """
 Database Prediction Pipeline - Main Application Entry Point
+
+Production:  python app.py --workers 4
+Development: python app.py --reload
+
+Each worker is a separate process that imports the app and opens its own connection
+pool during startup. SIGHUP restarts the workers gracefully; workers are also recycled
+after --max-requests requests (plus jitter, so they do not all restart together).
 """
 
-import sys
+import argparse
 import os
-import uvicorn
+import socket
+
+APP_IMPORT_PATH = "src.api.main:app"
+ENV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
 
-# Add src to Python path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+def __getattr__(name):
+    # Keeps `uvicorn app:app` working without importing the API when only the launcher is needed
+    if name == "app":
+        from src.api.main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from src.api.main import app
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
 
-def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Telco Customer Churn API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=env_int("API_PORT", 8000))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_WORKERS", 1),
+                        help="Worker processes (default: WEB_WORKERS or 1)")
+    parser.add_argument("--max-requests", type=int, default=env_int("WEB_MAX_REQUESTS", 10000),
+                        help="Recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--max-requests-jitter", type=int, default=env_int("WEB_MAX_REQUESTS_JITTER", 1000),
+                        help="Random extra requests per worker before recycling")
+    parser.add_argument("--keep-alive", type=int, default=env_int("WEB_KEEP_ALIVE", 5),
+                        help="Seconds to keep idle client connections open")
+    parser.add_argument("--backlog", type=int, default=env_int("WEB_BACKLOG", 2048),
+                        help="Maximum pending connections in the listen queue")
+    parser.add_argument("--graceful-timeout", type=int, default=env_int("WEB_GRACEFUL_TIMEOUT", 30),
+                        help="Seconds to let in-flight requests finish on shutdown/restart")
+    parser.add_argument("--log-level", default=os.getenv("WEB_LOG_LEVEL", "info"))
+    parser.add_argument("--no-access-log", action="store_true", help="Disable per-request access logging")
+    parser.add_argument("--reload", action="store_true", help="Development mode: single process, reload on code changes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main application entry point"""
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+    args = parse_args(argv)
+    import uvicorn
+    # Not public API: Multiprocess(config, sockets) is the uvicorn>=0.51 signature, kept in range
+    # by requirements.txt (older releases also take the worker target)
+    from uvicorn.supervisors import Multiprocess
+    # Workers label their metrics with their pid when there are several of them
+    os.environ["WEB_WORKERS"] = str(max(args.workers, 1))
+    # Loaded once in the parent so every worker starts with the same environment
+    env_file = ENV_FILE if os.path.exists(ENV_FILE) else None
+    if args.reload:
+        uvicorn.run(APP_IMPORT_PATH, host=args.host, port=args.port, reload=True, log_level=args.log_level, env_file=env_file)
+        return
+    config = uvicorn.Config(
+        APP_IMPORT_PATH,
+        env_file=env_file,
+        host=args.host,
+        port=args.port,
+        workers=max(args.workers, 1),
+        limit_max_requests=args.max_requests or None,
+        limit_max_requests_jitter=args.max_requests_jitter if args.max_requests else 0,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=not args.no_access_log
     )
+    # Always run under the supervisor (uvicorn.run serves in-process for a single worker), so a
+    # recycled or crashed worker is replaced and SIGHUP restarts workers even with --workers 1
+    sock = config.bind_socket()
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        # bind_socket() leaves proto=0, which workers inherit; asyncio only enables TCP_NODELAY on
+        # accepted sockets whose proto is IPPROTO_TCP, and without it every response waits ~40 ms
+        # for a delayed ACK
+        sock = socket.socket(sock.family, sock.type, socket.IPPROTO_TCP, fileno=sock.detach())
+    try:
+        Multiprocess(config, sockets=[sock]).run()
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
-    # For direct execution
-    uvicorn.run(
-        "src.api.main:app",
-        host="0.0.0.0", 
-        port=8000,
-        reload=True
-    )
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold import time of the API and CLI entry points, with a regression budget
+
+Imports each module in a fresh interpreter with `python -X importtime`, repeats a few
+times and reports the median, a per-package breakdown of self time and the slowest
+individual modules. Exits with status 1 when a module's median import time exceeds the
+budget or when it imports a module that must stay lazy (database drivers, pandas, ...),
+so it can run as a CI check.
+
+The web framework alone (`import fastapi`) takes 450-550 ms on a small CI runner, more than
+any fixed budget for the whole API could leave room for, and it varies with the machine.
+For modules that import it, the budget applies to the time on top of a bare
+`import fastapi` measured in the same run (the app's own modules, route and model
+construction, and whatever else they import). src.api.main spends about 400 ms there,
+most of it FastAPI analysing the ~80 routes; the 600 ms default leaves room for run-to-run
+noise while a newly eager heavy import (pandas alone is several hundred ms) still fails.
+
+Usage:
+    python benchmarks/bench_import_time.py [--module src.api.main] [--runs 5] [--budget-ms 600]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DEFAULT_MODULES = ["src.api.main", "src.database.export", "app"]
+# Modules that must only be imported on first use
+# Framework whose own import time is not counted against the budget
+DEFAULT_BASELINE = "fastapi"
+DEFAULT_FORBIDDEN = ["pandas", "numpy", "pyarrow", "sklearn", "psycopg2", "pymongo", "bson", "dotenv", "uvicorn"]
+
+def import_profile(module: str):
+    """Import a module in a fresh interpreter; returns [(module, self_us, cumulative_us, depth)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+def summarize(module: str, runs: int, top: int, forbidden):
+    profiles = [import_profile(module) for _ in range(runs)]
+    totals = [sum(entry[1] for entry in profile) for profile in profiles]
+    median_index = totals.index(sorted(totals)[len(totals) // 2])
+    profile = profiles[median_index]
+
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in profile:
+        by_package[name.split(".")[0]] += self_us
+    imported = {name for name, _, _, _ in profile}
+    leaked = sorted(name for name in forbidden if name in imported)
+    return {
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "modules": len(profile),
+        "packages": sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top],
+        "slowest": sorted(profile, key=lambda entry: entry[1], reverse=True)[:top],
+        "leaked": leaked,
+        "imported": imported
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="Module to import (repeatable)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "600")),
+                        help="Maximum median import time per module, on top of the baseline "
+                             "(default: IMPORT_BUDGET_MS or 600)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="Module whose import time is subtracted for modules importing it ('' for none)")
+    parser.add_argument("--forbid", default=",".join(DEFAULT_FORBIDDEN),
+                        help="Comma-separated top-level modules that must not be imported eagerly")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    forbidden = [name for name in args.forbid.split(",") if name]
+
+    baseline_ms = None
+    failures = []
+    for module in args.module or DEFAULT_MODULES:
+        summary = summarize(module, args.runs, args.top, forbidden)
+        own_ms = summary["median_ms"]
+        if args.baseline and args.baseline in summary["imported"] and module != args.baseline:
+            if baseline_ms is None:
+                baseline_ms = summarize(args.baseline, args.runs, args.top, [])["median_ms"]
+                print(f"baseline: import {args.baseline} median {baseline_ms:.1f} ms")
+            own_ms -= baseline_ms
+        within = own_ms <= args.budget_ms
+        print(f"\nimport {module}: median {summary['median_ms']:.1f} ms ({own_ms:.1f} ms own), "
+              f"min {summary['min_ms']:.1f} ms, {summary['modules']} modules "
+              f"(budget {args.budget_ms:.0f} ms: {'OK' if within else 'EXCEEDED'})")
+        print("  self time by package:")
+        for package, self_us in summary["packages"]:
+            print(f"    {self_us / 1000:8.1f} ms  {package}")
+        print("  slowest modules (self / cumulative):")
+        for name, self_us, cumulative_us, _ in summary["slowest"]:
+            print(f"    {self_us / 1000:8.1f} / {cumulative_us / 1000:8.1f} ms  {name}")
+        if summary["leaked"]:
+            print(f"  eagerly imported: {', '.join(summary['leaked'])}")
+            failures.append(f"{module} imports {', '.join(summary['leaked'])}")
+        if not within:
+            failures.append(f"{module} takes {own_ms:.1f} ms on top of the baseline (budget {args.budget_ms:.0f} ms)")
+
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nAll imports within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request overhead of the metrics middleware and CRUD instrumentation
+
+Drives the ASGI app in-process (no network, no databases) so the numbers isolate
+the instrumentation cost. Compares the same trivial route with and without
+MetricsMiddleware, and a bare function with and without the CRUD timing wrapper.
+
+Usage:
+    python benchmarks/bench_metrics_overhead.py [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from fastapi import FastAPI
+from src.monitoring.metrics import MetricsMiddleware, instrument_crud
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def drive(app, requests: int) -> float:
+    """Send requests straight through the ASGI interface; returns seconds per request"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/api/items/{i}", "raw_path": f"/api/items/{i}".encode(),
+            "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234), "server": ("bench", 80)
+        }
+
+    # Warm up (builds the middleware stack and caches)
+    for i in range(200):
+        await app(scope(i), receive, send)
+
+    started = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - started) / requests
+
+def bench_crud_wrapper(calls: int):
+    class PlainCRUD:
+        @staticmethod
+        def get(x):
+            return x
+
+    class TimedCRUD:
+        @staticmethod
+        def get(x):
+            return x
+
+    instrument_crud(TimedCRUD, "bench")
+
+    results = {}
+    for name, cls in (("plain", PlainCRUD), ("instrumented", TimedCRUD)):
+        started = time.perf_counter()
+        for i in range(calls):
+            cls.get(i)
+        results[name] = (time.perf_counter() - started) / calls
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    baseline = asyncio.run(drive(build_app(False), args.requests))
+    instrumented = asyncio.run(drive(build_app(True), args.requests))
+    overhead = instrumented - baseline
+
+    print(f"HTTP route, {args.requests} requests")
+    print(f"  without metrics: {baseline * 1e6:8.1f} µs/request")
+    print(f"  with metrics:    {instrumented * 1e6:8.1f} µs/request")
+    print(f"  overhead:        {overhead * 1e6:8.1f} µs/request ({overhead / baseline * 100:.1f}% of a no-op route)")
+
+    crud = bench_crud_wrapper(args.requests * 10)
+    print(f"CRUD method wrapper, {args.requests * 10} calls")
+    print(f"  plain:        {crud['plain'] * 1e9:8.0f} ns/call")
+    print(f"  instrumented: {crud['instrumented'] * 1e9:8.0f} ns/call")
+    print(f"  overhead:     {(crud['instrumented'] - crud['plain']) * 1e9:8.0f} ns/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: MongoDB bulk write route against the single-document routes
+
+Against a running API (python app.py), inserts, updates and deletes the same number of
+throwaway customers twice: once with one POST/PUT/DELETE per document, once through
+POST /api/mongodb/customers/bulk in batches. Reports documents/second per phase. All
+benchmark documents use a "bench-" customerID prefix and are deleted at the end.
+
+Usage:
+    python benchmarks/bench_mongo_bulk.py [--url http://127.0.0.1:8000] [--documents 2000] [--batch 500]
+"""
+
+import argparse
+import http.client
+import json
+import time
+import uuid
+from urllib.parse import urlparse
+
+def customer(customer_id: str) -> dict:
+    return {
+        "customerID": customer_id, "customer_name": "Bench Customer", "gender": "Female",
+        "SeniorCitizen": False, "Partner": True, "Dependents": False, "tenure": 12, "PhoneService": True
+    }
+
+class Client:
+    """One keep-alive connection sending JSON requests"""
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+
+    def request(self, method: str, path: str, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status}: {data[:200]!r}")
+        return json.loads(data) if data else None
+
+def single_document(client: Client, ids):
+    timings = {}
+    started = time.perf_counter()
+    for customer_id in ids:
+        client.request("POST", "/api/mongodb/customers/", customer(customer_id))
+    timings["insert"] = time.perf_counter() - started
+    started = time.perf_counter()
+    for customer_id in ids:
+        client.request("PUT", f"/api/mongodb/customers/{customer_id}", {"tenure": 24})
+    timings["update"] = time.perf_counter() - started
+    started = time.perf_counter()
+    for customer_id in ids:
+        client.request("DELETE", f"/api/mongodb/customers/{customer_id}")
+    timings["delete"] = time.perf_counter() - started
+    return timings
+
+def bulk(client: Client, ids, batch: int):
+    phases = {
+        "insert": lambda customer_id: {"op": "insert", "document": customer(customer_id)},
+        "update": lambda customer_id: {"op": "update", "customerID": customer_id, "document": {"tenure": 24}},
+        "delete": lambda customer_id: {"op": "delete", "customerID": customer_id}
+    }
+    timings = {}
+    for phase, build in phases.items():
+        started = time.perf_counter()
+        for start in range(0, len(ids), batch):
+            result = client.request("POST", "/api/mongodb/customers/bulk",
+                                    {"operations": [build(customer_id) for customer_id in ids[start:start + batch]]})
+            if result["error_count"]:
+                raise RuntimeError(f"{phase}: {result['error_count']} operations failed")
+        timings[phase] = time.perf_counter() - started
+    return timings
+
+def cleanup(client: Client, ids, batch: int):
+    for start in range(0, len(ids), batch):
+        client.request("POST", "/api/mongodb/customers/bulk",
+                       {"operations": [{"op": "delete", "customerID": customer_id} for customer_id in ids[start:start + batch]]})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500, help="Operations per bulk request")
+    args = parser.parse_args()
+
+    run = uuid.uuid4().hex[:8]
+    client = Client(args.url)
+    single_ids = [f"bench-{run}-s{n}" for n in range(args.documents)]
+    bulk_ids = [f"bench-{run}-b{n}" for n in range(args.documents)]
+    try:
+        single = single_document(client, single_ids)
+        batched = bulk(client, bulk_ids, args.batch)
+    finally:
+        cleanup(client, single_ids + bulk_ids, args.batch)
+
+    print(f"{args.documents} documents per phase, bulk batches of {args.batch}")
+    print(f"{'phase':>8} {'single docs/s':>14} {'bulk docs/s':>12} {'speedup':>8}")
+    for phase in ("insert", "update", "delete"):
+        single_rate = args.documents / single[phase]
+        bulk_rate = args.documents / batched[phase]
+        print(f"{phase:>8} {single_rate:>14.0f} {bulk_rate:>12.0f} {bulk_rate / single_rate:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
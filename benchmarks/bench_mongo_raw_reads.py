@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU per document of the MongoDB GET routes, dict path vs. raw BSON path
+
+Drives two in-process FastAPI apps (no network, no database) that answer a list route
+from the same BSON bytes a MongoDB reply would carry:
+
+- dict: decode to dicts, rewrite _id with str(), return through the Dict[str, Any]
+  response model (what the routes do with MONGO_RAW_READS=false)
+- raw: RawBSONDocuments with _id already a string (as the $toString pipeline returns
+  them), encoded by encode_json() and sent as bytes
+
+The list and search routes share this code path; page sizes cover the single-document
+routes (1), the default page (100) and the largest page (1000). CPU time is measured
+with time.process_time().
+
+Usage:
+    python benchmarks/bench_mongo_raw_reads.py [--requests 500]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from bson import ObjectId, decode_all, encode
+from bson.raw_bson import RawBSONDocument
+from fastapi import FastAPI
+from fastapi.responses import Response
+from src.database.raw_bson import encode_json
+
+def customer(n: int, id_as_string: bool) -> dict:
+    object_id = ObjectId()
+    return {
+        "_id": str(object_id) if id_as_string else object_id,
+        "customerID": f"{n:04d}-BENCH", "customer_name": f"Customer {n}", "gender": "Female" if n % 2 else "Male",
+        "SeniorCitizen": n % 5 == 0, "Partner": n % 3 == 0, "Dependents": False, "tenure": n % 72, "PhoneService": True
+    }
+
+def build_app(page: int) -> FastAPI:
+    # What the server sends back: BSON with an ObjectId _id (find) or a string _id (pipeline)
+    find_reply = b"".join(encode(customer(n, False)) for n in range(page))
+    pipeline_reply = [RawBSONDocument(encode(customer(n, True))) for n in range(page)]
+    app = FastAPI()
+
+    @app.get("/dict", response_model=List[Dict[str, Any]])
+    async def dict_path():
+        documents = []
+        for document in decode_all(find_reply):
+            document["_id"] = str(document["_id"])
+            documents.append(document)
+        return documents
+
+    @app.get("/raw", response_model=List[Dict[str, Any]])
+    async def raw_path():
+        return Response(content=encode_json(pipeline_reply), media_type="application/json")
+
+    return app
+
+async def drive(app, path: str, requests: int) -> float:
+    """Send requests straight through the ASGI interface; returns CPU seconds per request"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80)
+    }
+
+    # Warm up (builds the middleware stack and caches)
+    for _ in range(20):
+        await app(dict(scope), receive, send)
+
+    started = time.process_time()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.process_time() - started) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'documents':>10} {'dict µs/doc':>12} {'raw µs/doc':>11} {'saved':>7}")
+    for page in (1, 100, 1000):
+        app = build_app(page)
+        requests = max(args.requests * 100 // max(page, 100), 20)
+        dict_cpu = asyncio.run(drive(app, "/dict", requests)) / page
+        raw_cpu = asyncio.run(drive(app, "/raw", requests)) / page
+        print(f"{page:>10} {dict_cpu * 1e6:>12.2f} {raw_cpu * 1e6:>11.2f} {(1 - raw_cpu / dict_cpu) * 100:>6.0f}%")
+
+if __name__ == "__main__":
+    main()
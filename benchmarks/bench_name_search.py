@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark: customer name search latency at 1M and 10M customers, PostgreSQL and MongoDB
+
+Loads synthetic customers ("<first> <last> <n>" names) into a scratch schema (PostgreSQL)
+or collection (MongoDB) with the name search indexes from sql/schema_design.sql and
+MONGO_INDEXES, then times the queries the name search routes generate for each mode
+(prefix, substring, similar) on common and rare terms. Reports the median latency, the
+number of results and, for PostgreSQL, the index the plan uses.
+
+Uses the PG_* and MONGO_* settings from .env; scratch data is dropped at the end.
+
+Usage:
+    python benchmarks/bench_name_search.py [--store postgresql|mongodb|both] [--rows 1000000,10000000] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from dotenv import load_dotenv
+from src.database.crud_postgresql import build_name_search_query
+from src.database.crud_mongodb import name_search_query
+from src.database.mongo_indexes import MONGO_INDEXES
+
+SCRATCH = "name_search_bench"
+LIMIT = 20
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+               "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Zbigniew", "Oluwaseun", "Siobhan", "Xiomara"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Kowalczyk", "Adeyemi", "Ni Bhriain", "Quintanilla"]
+
+# (mode, query): common and rare prefixes and substrings, misspellings for similarity
+QUERIES = [
+    ("prefix", "Mar"), ("prefix", "Zbig"), ("prefix", "Jennifer Lop"),
+    ("substring", "son"), ("substring", "walc"), ("substring", "Xiomara Quint"),
+    ("similar", "Jenifer Smyth"), ("similar", "Oluwasen Adeyem"), ("similar", "Siobhan Ni Bhriain 4242"),
+]
+
+def pg_name_indexes():
+    """CREATE EXTENSION and customer_name CREATE INDEX statements of sql/schema_design.sql"""
+    with open(os.path.join(project_root, "sql", "schema_design.sql")) as file:
+        schema_sql = file.read()
+    statements = []
+    for statement in schema_sql.split(";"):
+        statement = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--")).strip()
+        if statement.startswith("CREATE EXTENSION") or (statement.startswith("CREATE INDEX") and "customer_name" in statement):
+            statements.append(statement)
+    return statements
+
+def time_query(run, repeat: int):
+    """Median milliseconds of run() and its last result"""
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def bench_postgresql(rows: int, repeat: int):
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    conn = psycopg2.connect(
+        dbname=os.getenv("PG_DB"), user=os.getenv("PG_USER"), password=os.getenv("PG_PASSWORD"),
+        host=os.getenv("PG_HOST"), port=os.getenv("PG_PORT")
+    )
+    conn.autocommit = True
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCRATCH} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCRATCH}")
+        # public stays on the path for extensions installed there (pg_trgm)
+        cursor.execute(f"SET search_path TO {SCRATCH}, public")
+        cursor.execute("""
+            CREATE TABLE customers (
+                customer_id SERIAL PRIMARY KEY, customer_name VARCHAR(100), gender VARCHAR(10), senior_citizen BOOLEAN,
+                partner BOOLEAN, dependents BOOLEAN, tenure INT, phone_service BOOLEAN
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO customers (customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service)
+            SELECT (%(first)s::text[])[1 + floor(random() * cardinality(%(first)s))::int] || ' '
+                || (%(last)s::text[])[1 + floor(random() * cardinality(%(last)s))::int] || ' ' || n,
+                'Female', FALSE, FALSE, FALSE, 0, TRUE
+            FROM generate_series(1, %(rows)s) n
+        """, {"first": FIRST_NAMES, "last": LAST_NAMES, "rows": rows})
+        for statement in pg_name_indexes():
+            cursor.execute(statement)
+        cursor.execute("ANALYZE customers")
+
+        for mode, q in QUERIES:
+            query, params = build_name_search_query(q, mode=mode, limit=LIMIT)
+            if mode == "similar":
+                cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', '0.3', false)")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cursor.fetchone()["QUERY PLAN"][0]["Plan"]
+            indexes = index_names(plan)
+
+            def run():
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
+            median_ms, results = time_query(run, repeat)
+            yield mode, q, median_ms, len(results), ", ".join(indexes) or "no index"
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCRATCH} CASCADE")
+        conn.close()
+
+def index_names(plan, found=None):
+    found = [] if found is None else found
+    if plan.get("Index Name") and plan["Index Name"] not in found:
+        found.append(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        index_names(child, found)
+    return found
+
+def bench_mongodb(rows: int, repeat: int):
+    import random
+    from pymongo import IndexModel, MongoClient
+    client = MongoClient(os.getenv("MONGO_URI"))
+    collection = client[os.getenv("MONGO_DB")][SCRATCH]
+    try:
+        collection.drop()
+        batch = []
+        for n in range(1, rows + 1):
+            batch.append({"customerID": f"bench-{n}",
+                          "customer_name": f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {n}"})
+            if len(batch) == 10000:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False)
+        collection.create_indexes([IndexModel(keys, **options) for keys, options in MONGO_INDEXES["customers"]
+                                   if any(field == "customer_name" for field, _ in keys)])
+
+        for mode, q in QUERIES:
+            criteria, projection, sort = name_search_query(q, mode)
+            median_ms, results = time_query(lambda: list(collection.find(criteria, projection).sort(sort).limit(LIMIT)), repeat)
+            yield mode, q, median_ms, len(results), ""
+    finally:
+        collection.drop()
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", choices=["postgresql", "mongodb", "both"], default="both")
+    parser.add_argument("--rows", default="1000000,10000000", help="Comma-separated customer counts")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median reported)")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(project_root, ".env"))
+    stores = ["postgresql", "mongodb"] if args.store == "both" else [args.store]
+    benches = {"postgresql": bench_postgresql, "mongodb": bench_mongodb}
+
+    for store in stores:
+        for rows in (int(value) for value in args.rows.split(",")):
+            print(f"\n{store}, {rows} customers")
+            print(f"{'mode':>10} {'query':<26} {'median ms':>10} {'results':>8}  plan")
+            for mode, q, median_ms, count, plan in benches[store](rows, args.repeat):
+                print(f"{mode:>10} {q:<26} {median_ms:>10.2f} {count:>8}  {plan}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tail latency under overload with and without admission control
+
+Sends requests to the list route GET /api/postgresql/customers/ open-loop at --overload
+times the database's capacity, the way a traffic burst arrives regardless of how fast the
+API answers. Without admission control the backlog grows until clients time out; with it
+the excess is shed with 503 + Retry-After and admitted requests keep a bounded latency.
+
+By default the API runs in-process (httpx ASGI transport) with its full middleware stack and
+the real route, which runs in the threadpool like every database route. Only the query is
+replaced: CustomerCRUD.get_customers blocks its thread for --service-ms while holding one of
+--connections database connections, the way a psycopg2 call does. Each configuration runs in
+its own process because ADMISSION_ENABLED is read at import.
+
+With --url the same load goes to a running server instead (real database, whatever
+admission settings the server was started with), e.g. to compare ADMISSION_ENABLED=false.
+
+Usage:
+    python benchmarks/bench_overload.py [--overload 2] [--duration 10] [--connections 2] [--service-ms 20]
+    python benchmarks/bench_overload.py --url http://localhost:8000 --rate 500
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+import httpx
+
+LIST_ROUTE = "/api/postgresql/customers/"
+
+def in_process_app(connections: int, service_time: float):
+    """The real API with a blocking stand-in for the customer list query"""
+    from src.api.main import app
+    from src.database.crud_postgresql import CustomerCRUD
+
+    pool = threading.BoundedSemaphore(connections)
+
+    def get_customers(skip: int = 0, limit: int = 100):
+        with pool:
+            time.sleep(service_time)
+        return []
+
+    CustomerCRUD.get_customers = staticmethod(get_customers)
+    return app
+
+async def run(client: httpx.AsyncClient, rate: float, duration: float, client_timeout: float):
+    results = []
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(client.get(LIST_ROUTE), client_timeout)
+            results.append((response.status_code, time.perf_counter() - started))
+        except asyncio.TimeoutError:
+            results.append(("timeout", client_timeout))
+
+    tasks = []
+    started = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - started < duration:
+        # Open-loop arrivals: send on schedule whether or not earlier requests finished
+        due = int((time.perf_counter() - started) * rate)
+        while sent < due:
+            tasks.append(asyncio.create_task(one()))
+            sent += 1
+        await asyncio.sleep(0.001)
+    await asyncio.gather(*tasks)
+    return results
+
+async def run_in_process(args, rate: float):
+    app = in_process_app(args.connections, args.service_ms / 1000)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run(client, rate, args.duration, args.client_timeout)
+
+async def run_against(args, rate: float):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await run(client, rate, args.duration, args.client_timeout)
+
+def percentile(values, fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else float("nan")
+
+def report(name: str, results, duration: float):
+    ok = sorted(latency for status, latency in results if status == 200)
+    shed = sum(1 for status, _ in results if status == 503)
+    timeouts = sum(1 for status, _ in results if status == "timeout")
+    print(f"{name:<20} {len(results):>6} {len(ok) / duration:>8.1f} {percentile(ok, 0.5) * 1000:>8.1f} "
+          f"{percentile(ok, 0.99) * 1000:>8.1f} {shed:>6} {timeouts:>8}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--overload", type=float, default=2.0, help="Arrival rate as a multiple of capacity")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=2, help="Database connections of the stand-in query")
+    parser.add_argument("--service-ms", type=float, default=20, help="Time the stand-in query holds a connection")
+    parser.add_argument("--client-timeout", type=float, default=2.0, help="Client gives up after this many seconds")
+    parser.add_argument("--url", help="Load a running server instead of the in-process app")
+    parser.add_argument("--rate", type=float, help="Requests per second (default: --overload times capacity)")
+    parser.add_argument("--label", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    capacity = args.connections / (args.service_ms / 1000)
+    rate = args.rate or capacity * args.overload
+    if args.label:
+        # One in-process configuration, started by the parent below
+        report(args.label, asyncio.run(run_in_process(args, rate)), args.duration)
+        return
+
+    header = f"{'':<20} {'sent':>6} {'ok/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'503':>6} {'timeouts':>8}"
+    if args.url:
+        print(f"{args.url}: offered {rate:.0f} req/s for {args.duration:.0f}s, client timeout {args.client_timeout:.1f}s")
+        print(header)
+        report("server", asyncio.run(run_against(args, rate)), args.duration)
+        return
+
+    print(f"capacity {capacity:.0f} req/s, offered {rate:.0f} req/s for {args.duration:.0f}s, "
+          f"client timeout {args.client_timeout:.1f}s")
+    print(header, flush=True)
+    for name, enabled in (("no admission", "false"), ("admission control", "true")):
+        env = dict(os.environ, ADMISSION_ENABLED=enabled,
+                   ADMISSION_LIMITS=f"list={args.connections}:{args.connections * 4}")
+        subprocess.run([sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--label", name],
+                       env=env, check=True)
+
+if __name__ == "__main__":
+    main()
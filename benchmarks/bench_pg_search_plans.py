@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PostgreSQL customer search plans and latency at scale, with a no-seq-scan check
+
+Creates the customers, contracts and services tables and their indexes in a scratch schema
+exactly as sql/schema_design.sql defines them, loads --rows synthetic customers (Telco-like
+value distributions) and runs EXPLAIN ANALYZE on the queries the search route generates
+(build_search_query) for the common filter and sort combinations, first and second
+(keyset) page. Prints the execution
+time and the scan nodes of each plan. Exits with status 1 when any plan contains a
+sequential scan, so it can run as a CI check against a scratch database.
+
+Uses the PG_* settings from .env; the scratch schema is dropped at the end unless --keep.
+
+Usage:
+    python benchmarks/bench_pg_search_plans.py [--rows 1000000] [--limit 100] [--keep]
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+from src.database.crud_postgresql import build_search_query, encode_search_cursor
+from src.database.schema import schema_statements
+from src.models.models import CustomerSearchFilters
+
+SCHEMA = "search_bench"
+
+DATA = """
+    INSERT INTO customers (customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service)
+    SELECT 'Customer_' || n, (ARRAY['Male', 'Female'])[1 + floor(random() * 2)::int], random() < 0.16,
+        random() < 0.48, random() < 0.3, floor(random() * 73)::int, random() < 0.9
+    FROM generate_series(1, %(rows)s) n;
+
+    INSERT INTO contracts (customer_id, contract_type, paperless_billing, payment_method, monthly_charges, total_charges, churn)
+    SELECT customer_id, contract_type, paperless_billing, payment_method, monthly_charges,
+        round(monthly_charges * greatest(tenure, 1), 2), churn
+    FROM (
+        SELECT customer_id, tenure,
+            (ARRAY['Month-to-month', 'Month-to-month', 'One year', 'Two year'])[1 + floor(random() * 4)::int] AS contract_type,
+            random() < 0.6 AS paperless_billing,
+            (ARRAY['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'])[1 + floor(random() * 4)::int] AS payment_method,
+            round((18 + random() * 101)::numeric, 2) AS monthly_charges,
+            random() < 0.27 AS churn
+        FROM customers
+    ) generated;
+
+    INSERT INTO services (customer_id, internet_service, online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies)
+    SELECT customer_id, (ARRAY['DSL', 'Fiber optic', 'Fiber optic', 'No'])[1 + floor(random() * 4)::int],
+        'No', 'No', 'No', 'No', 'No', 'No'
+    FROM customers;
+"""
+
+# (label, filters, sort, descending)
+CASES = [
+    ("no filters", {}, "contract_id", False),
+    ("month-to-month, high charges, fiber", {"contract_type": "Month-to-month", "monthly_charges_min": 100,
+                                             "internet_service": "Fiber optic"}, "monthly_charges", True),
+    ("contract type + payment method", {"contract_type": "Two year", "payment_method": "Mailed check"}, "contract_id", False),
+    ("churned by charges", {"churn": True}, "monthly_charges", True),
+    ("charges range", {"monthly_charges_min": 50, "monthly_charges_max": 60}, "monthly_charges", False),
+    ("top total charges", {}, "total_charges", True),
+    ("senior partners by tenure", {"senior_citizen": True, "partner": True}, "tenure", False),
+    ("tenure range, DSL", {"tenure_min": 12, "tenure_max": 24, "internet_service": "DSL"}, "tenure", True),
+    ("no internet, churned", {"internet_service": "No", "churn": True}, "contract_id", False),
+]
+
+SEARCH_TABLES = ("customers", "contracts", "services")
+
+def schema_search_statements():
+    """sql/schema_design.sql statements the search depends on: its tables, extensions and their indexes"""
+    statements = []
+    for statement in schema_statements():
+        words = statement.split()
+        if words[:2] == ["CREATE", "TABLE"] and words[2] in SEARCH_TABLES:
+            statements.append(statement)
+        elif words[:2] == ["CREATE", "EXTENSION"]:
+            statements.append(statement)
+        elif words[:2] == ["CREATE", "INDEX"] and words[words.index("ON") + 1] in SEARCH_TABLES:
+            statements.append(statement)
+    return statements
+
+def setup(cursor, rows: int):
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    # public stays on the path for extensions installed there (pg_trgm)
+    cursor.execute(f"SET search_path TO {SCHEMA}, public")
+    statements = schema_search_statements()
+    for statement in statements:
+        if statement.startswith("CREATE TABLE"):
+            cursor.execute(statement)
+    cursor.execute(DATA, {"rows": rows})
+    for statement in statements:
+        if not statement.startswith("CREATE TABLE"):
+            cursor.execute(statement)
+    cursor.execute("ANALYZE")
+
+def scan_nodes(plan, found=None):
+    """(node type, relation, index) of every scan node in an EXPLAIN JSON plan"""
+    found = [] if found is None else found
+    if "Scan" in plan["Node Type"]:
+        found.append((plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")))
+    for child in plan.get("Plans", []):
+        scan_nodes(child, found)
+    return found
+
+def explain(cursor, query: str, params):
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+    result = cursor.fetchone()
+    document = result["QUERY PLAN"] if isinstance(result, dict) else result[0]
+    return document[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Customers (one contract and service each)")
+    parser.add_argument("--limit", type=int, default=100, help="Page size")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema for manual EXPLAINs")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(project_root, ".env"))
+    conn = psycopg2.connect(
+        dbname=os.getenv("PG_DB"), user=os.getenv("PG_USER"), password=os.getenv("PG_PASSWORD"),
+        host=os.getenv("PG_HOST"), port=os.getenv("PG_PORT")
+    )
+    conn.autocommit = True
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    print(f"Generating {args.rows} customers in schema {SCHEMA}...")
+    setup(cursor, args.rows)
+
+    failures = 0
+    try:
+        print(f"{'case':<40} {'page':>4} {'rows':>5} {'ms':>8}  scans")
+        for label, filters, sort, descending in CASES:
+            search_filters = CustomerSearchFilters(**filters)
+            after = None
+            for page in (1, 2):
+                query, params = build_search_query(search_filters, sort=sort, descending=descending,
+                                                   limit=args.limit, after=after)
+                plan = explain(cursor, query, params)
+                scans = scan_nodes(plan["Plan"])
+                sequential = [scan for scan in scans if scan[0] == "Seq Scan"]
+                failures += bool(sequential)
+                described = ", ".join(f"{node} {index or relation}" for node, relation, index in scans)
+                print(f"{label:<40} {page:>4} {plan['Plan']['Actual Rows']:>5} {plan['Execution Time']:>8.2f}  "
+                      f"{'SEQ SCAN ' if sequential else ''}{described}")
+
+                # Next page starts after the last row of this one
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                if len(rows) < args.limit:
+                    break
+                after = encode_search_cursor(sort, descending, rows[-1][sort], rows[-1]["contract_id"])
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+    if failures:
+        print(f"❌ {failures} plans use a sequential scan")
+        sys.exit(1)
+    print("✅ No sequential scans")
+
+if __name__ == "__main__":
+    main()
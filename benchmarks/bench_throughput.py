@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: request throughput of the production launcher as worker processes are added
+
+Starts `app.py --workers N` for each N, then drives it from several client processes
+(one keep-alive connection each) for a fixed duration and reports requests/second and
+latency percentiles. The default path does no database work, so the numbers show how
+far the server scales with cores; point --path at a real endpoint (e.g.
+/api/postgresql/customers/?limit=100) to include the database.
+
+Run on a machine with at least as many cores as the largest worker count plus the
+client processes, or the client and server compete for the same CPUs.
+
+Usage:
+    python benchmarks/bench_throughput.py [--workers 1,2,4] [--clients 8] [--duration 10] [--path /health/live]
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(port: int, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health/live")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+def client(port: int, path: str, duration: float, results):
+    """Send requests over one keep-alive connection until the duration is up"""
+    latencies, errors = [], 0
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            # Recycled workers close their connections; reconnect and carry on
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    results.put((latencies, errors))
+
+def run_load(port: int, path: str, clients: int, duration: float):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=client, args=(port, path, duration, results)) for _ in range(clients)]
+    for process in processes:
+        process.start()
+    latencies, errors = [], 0
+    for _ in processes:
+        client_latencies, client_errors = results.get()
+        latencies.extend(client_latencies)
+        errors += client_errors
+    for process in processes:
+        process.join()
+    return sorted(latencies), errors
+
+def percentile(values, fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+def bench_workers(workers: int, args) -> dict:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "app.py", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1",
+         "--no-access-log", "--log-level", "warning", "--max-requests", "0"],
+        cwd=project_root
+    )
+    try:
+        wait_until_ready(port)
+        # Warm up every worker
+        run_load(port, args.path, args.clients, 1)
+        latencies, errors = run_load(port, args.path, args.clients, args.duration)
+    finally:
+        server.send_signal(signal.SIGINT)
+        server.wait(timeout=60)
+    return {
+        "workers": workers,
+        "rps": len(latencies) / args.duration,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors
+    }
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cores} & set(range(1, cores + 1)) | {1})
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(n) for n in default_workers),
+                        help="Comma-separated worker counts to compare")
+    parser.add_argument("--clients", type=int, default=max(cores, 4), help="Concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per worker count")
+    parser.add_argument("--path", default="/health/live")
+    args = parser.parse_args()
+
+    print(f"{cores} CPU cores, {args.clients} clients, {args.duration:.0f}s per run, GET {args.path}")
+    print(f"{'workers':>8} {'req/s':>10} {'scaling':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline = None
+    for workers in (int(n) for n in args.workers.split(",")):
+        result = bench_workers(workers, args)
+        baseline = baseline or result["rps"]
+        print(f"{workers:>8} {result['rps']:>10.0f} {result['rps'] / baseline:>7.2f}x "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
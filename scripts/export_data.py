@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Stream a full table/collection from PostgreSQL or MongoDB to NDJSON, CSV or Parquet
+
+Examples:
+    python scripts/export_data.py postgresql customers --format csv --gzip
+    python scripts/export_data.py mongodb contracts --format parquet --output data/contracts.parquet
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from src.database.export import EXPORT_TABLES, EXPORT_FORMATS, DEFAULT_BATCH_SIZE, export_table, export_filename
+
+def main():
+    """Export a table to a file (or stdout with --output -)"""
+    parser = argparse.ArgumentParser(description="Export a table/collection with bounded memory")
+    parser.add_argument("store", choices=["postgresql", "mongodb"])
+    parser.add_argument("table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output (gzip for NDJSON/CSV, gzip codec for Parquet)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--output", help="Output file path ('-' for stdout, defaults to <table>.<format> in data/)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(project_root, 'data', export_filename(args.table, args.format, args.gzip))
+
+    try:
+        chunks = export_table(args.store, args.table, format=args.format, compress=args.gzip, batch_size=args.batch_size)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    written = 0
+    try:
+        if output == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+                written += len(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    written += len(chunk)
+    except ValueError as e:
+        # Fields the CSV/Parquet columns cannot hold; the partial file is not a valid export
+        if output != "-" and os.path.exists(output):
+            os.remove(output)
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    if output != "-":
+        print(f"✅ Exported {args.store} {args.table} to {output} ({written} bytes)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
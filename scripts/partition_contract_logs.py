@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Convert an existing (unpartitioned) contract_logs table to the monthly partitioned layout
+
+Renames the old table, creates contract_logs, its default partition, contract_log_daily and
+their indexes from sql/schema_design.sql, creates a partition for every month that has log
+rows, copies the rows (log_id values kept, sequence moved past them) and drops the old
+table. All of it runs in one transaction, holding an exclusive lock on the old table, so
+billing updates wait for the copy. A maintenance pass follows: partitions ahead, daily
+rollups, retention (CONTRACT_LOG_* settings). Does nothing but the maintenance pass when
+contract_logs is already partitioned.
+
+Examples:
+    python scripts/partition_contract_logs.py
+    python scripts/partition_contract_logs.py --keep-old
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from dotenv import load_dotenv
+from src.database.contract_logs import ContractLogMaintainer, add_months, attached_partitions, create_partition
+from src.database.database import create_pg_connection
+
+OLD_TABLE = "contract_logs_unpartitioned"
+
+def contract_log_statements():
+    """CREATE statements of sql/schema_design.sql for contract_logs and contract_log_daily (comment lines dropped)"""
+    with open(os.path.join(project_root, "sql", "schema_design.sql")) as file:
+        schema_sql = file.read()
+    statements = []
+    for statement in schema_sql.split(";"):
+        statement = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--")).strip()
+        if statement.startswith("CREATE") and "contract_log" in statement.split("(")[0]:
+            statements.append(statement)
+    return statements
+
+def partition(cursor, keep_old: bool) -> int:
+    """Move contract_logs into the partitioned layout; returns the rows copied"""
+    cursor.execute("LOCK TABLE contract_logs IN EXCLUSIVE MODE")
+    # The old table's key index and sequence would take the new table's names
+    cursor.execute(f"ALTER TABLE contract_logs RENAME TO {OLD_TABLE}")
+    cursor.execute(f"ALTER INDEX IF EXISTS contract_logs_pkey RENAME TO {OLD_TABLE}_pkey")
+    cursor.execute(f"ALTER SEQUENCE IF EXISTS contract_logs_log_id_seq RENAME TO {OLD_TABLE}_log_id_seq")
+
+    cursor.execute("SELECT to_regclass('contract_log_daily') IS NOT NULL")
+    rollups_exist = cursor.fetchone()[0]
+    for statement in contract_log_statements():
+        if rollups_exist and "contract_log_daily" in statement:
+            continue
+        cursor.execute(statement)
+
+    cursor.execute(f"SELECT min(updated_at)::date, max(updated_at)::date FROM {OLD_TABLE}")
+    oldest, newest = cursor.fetchone()
+    if oldest is not None:
+        month, last = oldest.replace(day=1), newest.replace(day=1)
+        while month <= last:
+            create_partition(cursor, month)
+            month = add_months(month, 1)
+
+    # Rows without a timestamp are stamped with the migration time
+    cursor.execute(f"""
+        INSERT INTO contract_logs (log_id, customer_id, old_total, new_total, updated_at)
+        SELECT log_id, customer_id, old_total, new_total, COALESCE(updated_at, LOCALTIMESTAMP)
+        FROM {OLD_TABLE}
+    """)
+    copied = cursor.rowcount
+    cursor.execute(f"""
+        SELECT setval(pg_get_serial_sequence('contract_logs', 'log_id'), COALESCE(max(log_id), 1), max(log_id) IS NOT NULL)
+        FROM {OLD_TABLE}
+    """)
+    if not keep_old:
+        cursor.execute(f"DROP TABLE {OLD_TABLE}")
+    return copied
+
+def main():
+    """Partition contract_logs if needed, then run one maintenance pass"""
+    parser = argparse.ArgumentParser(description="Convert contract_logs to monthly partitions")
+    parser.add_argument("--keep-old", action="store_true", help=f"Keep the old table as {OLD_TABLE}")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(project_root, ".env"))
+    conn = create_pg_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('contract_logs')")
+            row = cursor.fetchone()
+            if row is None:
+                print("❌ contract_logs does not exist (create the schema first)")
+                sys.exit(1)
+            if row[0] == "p":
+                print("contract_logs is already partitioned")
+            else:
+                copied = partition(cursor, args.keep_old)
+                conn.commit()
+                print(f"✅ Copied {copied} log rows into {len(attached_partitions(cursor))} monthly partitions")
+    finally:
+        conn.close()
+
+    maintainer = ContractLogMaintainer()
+    try:
+        report = maintainer.maintain()
+    finally:
+        maintainer.close()
+    print(f"Created partitions: {', '.join(report['created']) or 'none'}")
+    print(f"Rolled up {report['rolled_up_days']} days")
+    print(f"Retired partitions: {', '.join(report['retired']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,17 @@ import psycopg2
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
+import sys
 import numpy as np
 
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from src.database.mongo_indexes import ensure_mongo_indexes
+from src.database.schema import schema_statements
+from src.database.customer_profiles import PROFILE_COLLECTION, MERGE_INTO_PROFILES, profile_pipeline
+
 # Load environment variables
 load_dotenv()
 
@@ -26,18 +35,10 @@ def setup_postgresql():
         
         print("Connected to PostgreSQL!")
         
-        # Read and execute schema
-        sql_dir = os.path.join(os.path.dirname(__file__), '..', 'sql')
-        schema_file = os.path.join(sql_dir, 'schema_design.sql')
-        
-        with open(schema_file, 'r') as file:
-            schema_sql = file.read()
-        
-        # Split by statements and execute
-        statements = schema_sql.split(';')
-        for statement in statements:
-            statement = statement.strip()
-            if statement and not statement.startswith('--'):
+        # Execute the schema statement by statement (comments dropped, function bodies kept whole).
+        # CREATE DATABASE is for psql; we are already connected to PG_DB
+        for statement in schema_statements():
+            if not statement.startswith('CREATE DATABASE'):
                 try:
                     cursor.execute(statement)
                     print(f"Executed: {statement[:50]}...")
@@ -110,6 +111,9 @@ def setup_postgresql():
                 ))
             
             print(f"Inserted {len(df)} records into PostgreSQL")
+            
+            # Pre-aggregated churn segments over the loaded data
+            cursor.execute("REFRESH MATERIALIZED VIEW churn_segments")
         
         cursor.close()
         conn.close()
@@ -134,6 +138,7 @@ def setup_mongodb():
         db.customers.drop()
         db.contracts.drop()
         db.services.drop()
+        db[PROFILE_COLLECTION].drop()
         
         # Load dataset
         data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
@@ -202,6 +207,14 @@ def setup_mongodb():
             
             print(f"Inserted {len(df)} records into MongoDB collections")
         
+        # Indexes for lookups by customerID and for paginated search
+        for collection_name, names in ensure_mongo_indexes(db).items():
+            print(f"Indexes on {collection_name}: {', '.join(names)}")
+        
+        # Customer profiles read model (one document per customer, contract and service embedded)
+        db.customers.aggregate(profile_pipeline() + [MERGE_INTO_PROFILES], allowDiskUse=True)
+        print(f"Built {db[PROFILE_COLLECTION].count_documents({})} customer profiles")
+        
         client.close()
         return True
         
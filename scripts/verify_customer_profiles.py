@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Check the customer_profiles read model against the customers, contracts and services collections
+
+Reports profiles that are missing, stale (differ from the source documents) or orphaned
+(customer deleted). Drift comes from profile updates that failed after the source write
+(counted by customer_profile_sync_errors_total) or from writes that bypassed the API.
+
+Examples:
+    python scripts/verify_customer_profiles.py
+    python scripts/verify_customer_profiles.py --repair
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to Python path
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, project_root)
+
+from src.database.customer_profiles import verify_profiles
+
+def main():
+    """Verify (and optionally repair) every customer profile"""
+    parser = argparse.ArgumentParser(description="Verify the customer_profiles read model")
+    parser.add_argument("--repair", action="store_true", help="Rebuild missing/stale profiles and delete orphaned ones")
+    parser.add_argument("--samples", type=int, default=20, help="customerIDs listed per kind of drift")
+    args = parser.parse_args()
+
+    report = verify_profiles(repair=args.repair, sample_size=args.samples)
+    drift = report["missing"] + report["stale"] + report["orphaned"]
+
+    print(f"Checked {report['checked']} customer profiles")
+    for kind in ("missing", "stale", "orphaned"):
+        samples = ", ".join(report["samples"][kind])
+        print(f"  {kind:>8}: {report[kind]}" + (f" ({samples})" if samples else ""))
+    if args.repair:
+        print(f"✅ Repaired {report['repaired']} profiles")
+    elif drift:
+        print("❌ Profiles drifted from the source collections (run with --repair)")
+        sys.exit(1)
+    else:
+        print("✅ Profiles match the source collections")
+
+if __name__ == "__main__":
+    main()
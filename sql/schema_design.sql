@@ -22,10 +22,16 @@ CREATE TABLE customers (
 -- ========================================
 -- Table 2: Contracts
 -- ========================================
+-- Billing fields live on the contract: the API, ingest, search, churn view and billing
+-- trigger all read and write them here
 CREATE TABLE contracts (
     contract_id SERIAL PRIMARY KEY,
     customer_id INT REFERENCES customers(customer_id) ON DELETE CASCADE,
     contract_type VARCHAR(50),
+    paperless_billing BOOLEAN,
+    payment_method VARCHAR(100),
+    monthly_charges DECIMAL(10,2),
+    total_charges DECIMAL(10,2),
     start_date DATE,
     end_date DATE,
     status VARCHAR(20),
@@ -33,20 +39,7 @@ CREATE TABLE contracts (
 );
 
 -- ========================================
--- Table 3: Billing
--- ========================================
-CREATE TABLE billing (
-    billing_id SERIAL PRIMARY KEY,
-    contract_id INT REFERENCES contracts(contract_id) ON DELETE CASCADE,
-    payment_method VARCHAR(100),
-    paperless_billing BOOLEAN,
-    monthly_charges DECIMAL(10,2),
-    total_charges DECIMAL(10,2),
-    billing_date DATE DEFAULT CURRENT_DATE
-);
-
--- ========================================
--- Table 4: Services
+-- Table 3: Services
 -- ========================================
 CREATE TABLE services (
     service_id SERIAL PRIMARY KEY,
@@ -61,16 +54,122 @@ CREATE TABLE services (
 );
 
 -- ========================================
--- Table 5: Contract Logs (for trigger)
+-- Table 4: Contract Logs (for trigger)
 -- ========================================
+-- Range-partitioned by month on updated_at. Partitions are named contract_logs_pYYYYMM and
+-- are created ahead, rolled up into contract_log_daily and dropped past retention by the
+-- API's maintenance worker (src/database/contract_logs.py). The primary key has to
+-- include the partition key
 CREATE TABLE contract_logs (
-    log_id SERIAL PRIMARY KEY,
+    log_id BIGSERIAL,
     customer_id INT REFERENCES customers(customer_id) ON DELETE CASCADE,
     old_total DECIMAL(10,2),
     new_total DECIMAL(10,2),
-    updated_at TIMESTAMP DEFAULT NOW()
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (log_id, updated_at)
+) PARTITION BY RANGE (updated_at);
+
+-- Catches rows outside the monthly partitions so the trigger never fails. The maintenance
+-- worker creates the partition of every month found here, which moves the rows out
+CREATE TABLE contract_logs_default PARTITION OF contract_logs DEFAULT;
+
+-- ========================================
+-- Table 5: Contract Log Daily Rollups
+-- ========================================
+-- Per-customer daily summary of contract_logs, kept after the raw partitions are dropped
+CREATE TABLE contract_log_daily (
+    customer_id INT REFERENCES customers(customer_id) ON DELETE CASCADE,
+    day DATE,
+    updates INT NOT NULL,
+    first_old_total DECIMAL(10,2),
+    last_new_total DECIMAL(10,2),
+    min_new_total DECIMAL(10,2),
+    max_new_total DECIMAL(10,2),
+    PRIMARY KEY (customer_id, day)
 );
 
+-- ========================================
+-- Indexes
+-- ========================================
+-- Foreign key lookups used by the per-customer and complete-profile queries.
+-- The services index also answers the customer search's internet_service filter per customer
+CREATE INDEX idx_contracts_customer_id ON contracts (customer_id);
+CREATE INDEX idx_services_customer_id ON services (customer_id, internet_service);
+
+-- Customer search (/api/postgresql/customers/search). Sorted columns end with contract_id
+-- so keyset pages are index range scans in either direction
+-- Contract type or payment method equality, then the charges range/sort
+CREATE INDEX idx_contracts_type_charges ON contracts (contract_type, monthly_charges, contract_id);
+CREATE INDEX idx_contracts_payment_charges ON contracts (payment_method, monthly_charges, contract_id);
+-- Sort (or range) on charges without a contract type
+CREATE INDEX idx_contracts_monthly_charges ON contracts (monthly_charges, contract_id);
+CREATE INDEX idx_contracts_total_charges ON contracts (total_charges, contract_id);
+-- Churned customers are a small, frequently searched slice
+CREATE INDEX idx_contracts_churned ON contracts (monthly_charges, contract_id) WHERE churn;
+-- Sort (or range) on tenure
+CREATE INDEX idx_customers_tenure ON customers (tenure, customer_id);
+
+-- Customer name search (/api/postgresql/customers/search/name)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- Substring and similarity matches (ILIKE '%...%' and the % operator)
+CREATE INDEX idx_customers_name_trgm ON customers USING GIN (customer_name gin_trgm_ops);
+-- Case-insensitive prefix matches in name order
+CREATE INDEX idx_customers_name_prefix ON customers ((lower(customer_name) COLLATE "C"), customer_id);
+
+-- Contract log history (/api/postgresql/customers/{id}/billing-history), created on every
+-- partition. Rollups scan one day at a time, which the BRIN index narrows to a few pages
+-- of the (append-ordered) partition
+CREATE INDEX idx_contract_logs_customer ON contract_logs (customer_id, updated_at DESC);
+CREATE INDEX idx_contract_logs_updated_at ON contract_logs USING BRIN (updated_at);
+-- Latest rolled-up day, where each maintenance run resumes
+CREATE INDEX idx_contract_log_daily_day ON contract_log_daily (day);
+
+-- ========================================
+-- Materialized View: Churn Segments
+-- ========================================
+-- Churn counts and average monthly charges per segment of each dashboard dimension, in one
+-- pass over the contracts. Refreshed concurrently by the API's background refresher after
+-- writes to the source tables (src/database/analytics.py). source_writes records the write
+-- counters at refresh time. Tenure buckets match TENURE_BUCKETS
+CREATE MATERIALIZED VIEW churn_segments AS
+WITH base AS (
+    SELECT ct.contract_type, ct.payment_method, ct.monthly_charges, ct.churn, s.internet_service,
+        CASE
+            WHEN c.tenure IS NULL THEN 'Unknown'
+            WHEN c.tenure <= 12 THEN '0-12'
+            WHEN c.tenure <= 24 THEN '13-24'
+            WHEN c.tenure <= 48 THEN '25-48'
+            WHEN c.tenure <= 72 THEN '49-72'
+            ELSE '73+'
+        END AS tenure_bucket
+    FROM contracts ct
+    JOIN customers c ON c.customer_id = ct.customer_id
+    LEFT JOIN LATERAL (
+        SELECT internet_service FROM services
+        WHERE services.customer_id = ct.customer_id
+        ORDER BY service_id LIMIT 1
+    ) s ON TRUE
+)
+SELECT d.dimension, d.segment,
+    count(*) AS contracts,
+    count(*) FILTER (WHERE base.churn) AS churned,
+    round(avg(base.monthly_charges), 2) AS avg_monthly_charges,
+    now() AS refreshed_at,
+    (SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)::bigint
+     FROM pg_stat_user_tables
+     WHERE schemaname = current_schema() AND relname IN ('customers', 'contracts', 'services')) AS source_writes
+FROM base
+CROSS JOIN LATERAL (VALUES
+    ('contract_type', COALESCE(base.contract_type, 'Unknown')),
+    ('payment_method', COALESCE(base.payment_method, 'Unknown')),
+    ('tenure_bucket', base.tenure_bucket),
+    ('internet_service', COALESCE(base.internet_service, 'Unknown'))
+) AS d(dimension, segment)
+GROUP BY d.dimension, d.segment;
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_churn_segments ON churn_segments (dimension, segment);
+
 -- ========================================
 -- STORED PROCEDURE
 -- ========================================
@@ -80,24 +179,19 @@ RETURNS VOID AS $$
 BEGIN
     UPDATE contracts
     SET churn = TRUE
-    WHERE contract_id IN (
-        SELECT b.contract_id
-        FROM billing b
-        WHERE b.total_charges > 5000
-    );
+    WHERE total_charges > 5000 AND churn = FALSE;
 END;
 $$ LANGUAGE plpgsql;
 
 -- ========================================
 -- TRIGGER FUNCTION
 -- ========================================
+-- Logs a contract's total_charges change for its customer
 CREATE OR REPLACE FUNCTION log_billing_update()
 RETURNS TRIGGER AS $$
 BEGIN
     INSERT INTO contract_logs (customer_id, old_total, new_total, updated_at)
-    SELECT c.customer_id, OLD.total_charges, NEW.total_charges, NOW()
-    FROM contracts c
-    WHERE c.contract_id = NEW.contract_id;
+    VALUES (NEW.customer_id, OLD.total_charges, NEW.total_charges, NOW());
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -105,7 +199,10 @@ $$ LANGUAGE plpgsql;
 -- ========================================
 -- TRIGGER
 -- ========================================
+-- Fires on the contracts table, where the charges live (and the churn view reads them).
+-- Updates that leave total_charges unchanged are not logged
 CREATE TRIGGER billing_update_log
-AFTER UPDATE OF total_charges ON billing
+AFTER UPDATE OF total_charges ON contracts
 FOR EACH ROW
+WHEN (OLD.total_charges IS DISTINCT FROM NEW.total_charges)
 EXECUTE FUNCTION log_billing_update();
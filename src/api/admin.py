@@ -0,0 +1,175 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Optional
+import hmac
+import os
+from ..models.models import APIResponse
+from ..monitoring.slow_queries import SLOW_QUERIES, SLOW_QUERY_THRESHOLD_MS
+from ..monitoring.profiling import PROFILE_STORE, PROFILING_ENABLED
+from ..monitoring.memory import MEMORY_TRACKER, MEMORY_TRACE_FRAMES
+from ..database.analytics import CHURN_VIEW_REFRESHER, MONGO_CHURN_CACHE
+from ..database.contract_logs import CONTRACT_LOG_MAINTAINER
+from ..database.customer_profiles import verify_profiles
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Require the X-Admin-Token header to match ADMIN_TOKEN; admin endpoints are closed while it is unset"""
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing admin token")
+
+# Diagnostics endpoints, mounted under /admin. Handlers that query a database or walk every
+# traced allocation are plain def, so FastAPI runs them in the threadpool; the others are
+# quick reads of in-process state or the profile directory and stay async
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# Slow Query Endpoints
+@router.get("/slow-queries", response_model=APIResponse)
+async def get_slow_queries(
+    store: Optional[str] = Query(None, pattern="^(postgresql|mongodb)$"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Most recent slow statements with their normalized query, parameter shape and plan"""
+    entries = SLOW_QUERIES.entries(store=store, limit=limit)
+    return APIResponse(
+        message="Slow queries",
+        data={"threshold_ms": SLOW_QUERY_THRESHOLD_MS, "total_recorded": SLOW_QUERIES.total, "entries": entries},
+        count=len(entries)
+    )
+
+@router.delete("/slow-queries", response_model=APIResponse)
+async def clear_slow_queries():
+    """Clear the slow query log"""
+    SLOW_QUERIES.clear()
+    return APIResponse(message="Slow query log cleared")
+
+# Profiling Endpoints
+@router.get("/profiles", response_model=APIResponse)
+async def list_profiles():
+    """Stored request profiles, newest first"""
+    profiles = PROFILE_STORE.list()
+    return APIResponse(
+        message="Request profiles",
+        data={"enabled": PROFILING_ENABLED, "directory": PROFILE_STORE.directory, "profiles": profiles},
+        count=len(profiles)
+    )
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Download one profile (collapsed stacks as text, pstats as binary)"""
+    path = PROFILE_STORE.path_for(name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "text/plain" if name.endswith(".collapsed") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+# Memory Endpoints: tracing state is per worker process, so responses carry the worker's pid
+GROUP_BY_PATTERN = "^(lineno|filename|traceback)$"
+
+@router.get("/memory", response_model=APIResponse)
+async def get_memory_status():
+    """RSS, traced heap size and stored snapshots"""
+    return APIResponse(message="Memory status", data=MEMORY_TRACKER.status())
+
+@router.post("/memory/tracing/start", response_model=APIResponse)
+async def start_memory_tracing(frames: int = Query(MEMORY_TRACE_FRAMES, ge=1, le=100)):
+    """Start allocation tracing (slows the process down while running)"""
+    try:
+        MEMORY_TRACKER.start(frames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(message="Allocation tracing started", data=MEMORY_TRACKER.status())
+
+@router.post("/memory/tracing/stop", response_model=APIResponse)
+def stop_memory_tracing():
+    """Stop allocation tracing (frees every trace); stored snapshots are kept"""
+    try:
+        MEMORY_TRACKER.stop()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(message="Allocation tracing stopped", data=MEMORY_TRACKER.status())
+
+@router.post("/memory/snapshots", response_model=APIResponse)
+def take_memory_snapshot(name: Optional[str] = Query(None, max_length=100)):
+    """Take and store a named snapshot of live allocations"""
+    try:
+        snapshot = MEMORY_TRACKER.take_snapshot(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(message="Snapshot taken", data=snapshot)
+
+@router.get("/memory/snapshots", response_model=APIResponse)
+async def list_memory_snapshots():
+    """Stored snapshots, oldest first"""
+    snapshots = MEMORY_TRACKER.snapshots()
+    return APIResponse(message="Memory snapshots", data={"snapshots": snapshots}, count=len(snapshots))
+
+@router.delete("/memory/snapshots", response_model=APIResponse)
+async def clear_memory_snapshots():
+    """Drop all stored snapshots"""
+    MEMORY_TRACKER.clear()
+    return APIResponse(message="Memory snapshots cleared")
+
+@router.get("/memory/snapshots/diff", response_model=APIResponse)
+def diff_memory_snapshots(
+    base: str,
+    target: str,
+    group_by: str = Query("lineno", pattern=GROUP_BY_PATTERN),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Call sites whose allocations changed the most between two snapshots"""
+    try:
+        stats = MEMORY_TRACKER.diff(base, target, group_by, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e.args[0]} not found")
+    return APIResponse(
+        message=f"Allocation changes from {base} to {target}",
+        data={"pid": os.getpid(), "group_by": group_by, "statistics": stats},
+        count=len(stats)
+    )
+
+@router.get("/memory/top", response_model=APIResponse)
+def top_memory_allocations(
+    group_by: str = Query("lineno", pattern=GROUP_BY_PATTERN),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Largest live allocations right now"""
+    try:
+        stats = MEMORY_TRACKER.top(group_by, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(
+        message="Top allocating call sites",
+        data={"pid": os.getpid(), "group_by": group_by, "statistics": stats},
+        count=len(stats)
+    )
+
+# Read Model Endpoints
+@router.post("/customer-profiles/verify", response_model=APIResponse)
+def verify_customer_profiles(repair: bool = False):
+    """Compare customer_profiles with the source collections (and rebuild drifted profiles with repair=true)"""
+    report = verify_profiles(repair=repair)
+    drift = report["missing"] + report["stale"] + report["orphaned"]
+    return APIResponse(message="Customer profiles verified", data=report, count=drift)
+
+# Analytics Endpoints
+@router.post("/analytics/refresh", response_model=APIResponse)
+def refresh_analytics():
+    """Refresh the churn materialized view now and drop the cached MongoDB churn aggregation"""
+    refreshed = CHURN_VIEW_REFRESHER.refresh(force=True)
+    MONGO_CHURN_CACHE.clear()
+    return APIResponse(
+        message="Analytics refreshed" if refreshed else "Refresh already running in another worker",
+        data={"postgresql_refreshed": refreshed}
+    )
+
+# Contract Log Endpoints
+@router.post("/contract-logs/maintain", response_model=APIResponse)
+def maintain_contract_logs():
+    """Create upcoming contract_logs partitions, update the daily rollups and retire partitions past retention now"""
+    report = CONTRACT_LOG_MAINTAINER.maintain()
+    return APIResponse(
+        message="Contract logs maintenance already running in another worker" if report["skipped"] else "Contract logs maintained",
+        data=report
+    )
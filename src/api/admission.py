@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+from ..database.deadline import remaining
+from ..monitoring.metrics import REGISTRY, DB_LATENCY_BUCKETS
+
+# Admission control is on by default; set ADMISSION_ENABLED=false to serve every request immediately
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Longest a request waits in a queue before it is shed, in seconds
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+# Retry-After sent with 503 responses, in seconds
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# Per-process (per worker) limits: group -> (concurrent requests, waiting requests)
+DEFAULT_LIMITS = {
+    "streaming": (2, 2),
+    "bulk": (2, 4),
+    "search": (4, 8),
+    "complete": (8, 16),
+    "list": (8, 16),
+    "default": (32, 64)
+}
+
+# Streaming export/ingest run for as long as the data takes, so they get their own slots
+# instead of holding the bulk group's (lookups and batches stay short and bounded)
+STREAMING_ROUTES = re.compile(r"^/api/(ingest|[^/]+/export/)")
+
+# First match wins; paths that match nothing (health, metrics, admin, docs) are never limited
+ROUTE_GROUPS = (
+    ("streaming", STREAMING_ROUTES),
+    ("bulk", re.compile(r"^/api/.*/(bulk|batch|lookup)/?$")),
+    ("search", re.compile(r"^/api/.*/search(/|$)")),
+    ("complete", re.compile(r"^/api/.*/complete/?$")),
+    ("list", re.compile(r"^/api/.+/$")),
+    ("default", re.compile(r"^/api/"))
+)
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "admission_in_flight", "Requests admitted and being served, by route group", ("group",))
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "admission_queue_depth", "Requests waiting for admission, by route group", ("group",))
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Requests shed with 503, by route group and reason (queue_full, timeout)",
+    ("group", "reason"))
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent waiting in the queue, by route group",
+    ("group",), buckets=DB_LATENCY_BUCKETS)
+
+def parse_limits(value: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Parse "search=4:8,bulk=2:4" (concurrency:queue per group) over the defaults"""
+    limits = dict(DEFAULT_LIMITS)
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        group, _, numbers = item.partition("=")
+        concurrency, _, queue = numbers.partition(":")
+        group = group.strip()
+        if group not in limits:
+            raise ValueError(f"Unknown admission group '{group}', expected one of: {', '.join(limits)}")
+        limits[group] = (int(concurrency), int(queue or limits[group][1]))
+    return limits
+
+def admitted_concurrency(limits: Dict[str, Tuple[int, int]]) -> int:
+    """Requests that may run at once across all groups (each sync handler holds a threadpool thread)"""
+    return sum(concurrency for concurrency, _ in limits.values())
+
+def route_group(method: str, path: str) -> Optional[str]:
+    for group, pattern in ROUTE_GROUPS:
+        if pattern.match(path):
+            # Trailing-slash collection paths are only "list" for reads (POST to them creates)
+            if group == "list" and method != "GET":
+                return "default"
+            return group
+    return None
+
+class AdmissionGroup:
+    """Concurrency limit with a bounded, time-limited FIFO wait queue"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a slot; returns None once admitted, or the reason the request was shed"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            ADMISSION_IN_FLIGHT.set(self.active, self.name)
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        started = time.perf_counter()
+        # release() hands its slot straight to the oldest waiter by resolving its future
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.name)
+        # A request never waits past its own deadline
+        left = remaining()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout if left is None else min(self.queue_timeout, left))
+        except asyncio.TimeoutError:
+            # release() may have handed over the slot just as the wait timed out; pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            return "timeout"
+        except asyncio.CancelledError:
+            # Client went away; if a slot was handed over just before, pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.name)
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started, self.name)
+        return None
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.name)
+                return
+        self.active -= 1
+        ADMISSION_IN_FLIGHT.set(self.active, self.name)
+
+class AdmissionMiddleware:
+    """ASGI middleware limiting concurrent requests per route group and shedding overflow with 503
+
+    Limits apply per worker process. A request that finds its group's queue full, or waits
+    longer than the queue timeout, gets 503 with Retry-After straight away instead of piling
+    up behind the database connections.
+    """
+
+    def __init__(self, app, limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 classify: Callable[[str, str], Optional[str]] = route_group,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, retry_after: int = ADMISSION_RETRY_AFTER):
+        self.app = app
+        limits = limits or parse_limits(os.getenv("ADMISSION_LIMITS"))
+        self.groups = {
+            name: AdmissionGroup(name, concurrency, queue_size, queue_timeout)
+            for name, (concurrency, queue_size) in limits.items()
+        }
+        self.classify = classify
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = self.groups.get(self.classify(scope["method"], scope["path"]))
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await group.acquire()
+        if reason is not None:
+            ADMISSION_REJECTED.inc(group.name, reason)
+            await self._reject(send, group.name)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.release()
+
+    async def _reject(self, send, group: str):
+        body = json.dumps({"detail": f"Server busy ({group} requests), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
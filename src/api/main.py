@@ -1,24 +1,133 @@
-from fastapi import FastAPI, HTTPException, Query
-from typing import List, Optional, Dict, Any
-import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from anyio import to_thread
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional, Dict, Any, Tuple
+import os
 from ..models.models import (
     Customer, CustomerCreate, CustomerUpdate,
     Contract, ContractCreate, ContractUpdate,
     Service, ServiceCreate, ServiceUpdate,
     CustomerMongo, ContractMongo, ServiceMongo,
+    CustomerComplete, CustomerCompleteCreate, CustomerCompleteBatchCreate,
+    LookupRequest, MongoLookupRequest, LookupResult,
+    MongoBulkRequest, MongoBulkResult,
+    CustomerSearchFilters, CustomerSearchPage, CustomerNameMatch, MongoFacetedSearchResult,
+    ChurnAnalytics, ContractLog, ContractLogDaily,
     APIResponse
 )
-from ..database.crud_postgresql import CustomerCRUD, ContractCRUD, ServiceCRUD
+from ..database.crud_postgresql import CustomerCRUD, ContractCRUD, ServiceCRUD, AnalyticsCRUD, ContractLogCRUD
 from ..database.crud_mongodb import MongoCRUD
-from ..database.database import test_pg_connection, test_mongo_connection
+from ..database.analytics import ANALYTICS_REFRESH_ENABLED, CHURN_VIEW_REFRESHER
+from ..database.contract_logs import CONTRACT_LOG_MAINTENANCE_ENABLED, CONTRACT_LOG_MAINTAINER
+from ..database.database import init_pg_pool, close_connections
+from ..database.deadline import DeadlineExceeded
+from ..database.raw_bson import MONGO_RAW_READS
+from ..database.export import export_table, export_filename, MEDIA_TYPES
+from ..database.ingest import ingest_stream
+from ..monitoring.health import HEALTH_PROBER
+from ..monitoring.metrics import REGISTRY, MetricsMiddleware
+from ..monitoring.profiling import PROFILING_ENABLED, ProfiledRoute, ProfilingMiddleware
+from .admin import router as admin_router
+from .admission import ADMISSION_ENABLED, AdmissionMiddleware, admitted_concurrency, parse_limits
+from .timeouts import DEADLINE_ENABLED, DeadlineMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-process startup: connection pool and background workers (runs in each worker after fork)"""
+    init_pg_pool()
+    if ADMISSION_ENABLED:
+        # Give every admitted request a threadpool thread, so admission does the queueing, not the pool
+        limiter = to_thread.current_default_thread_limiter()
+        limiter.total_tokens = max(limiter.total_tokens, admitted_concurrency(parse_limits(os.getenv("ADMISSION_LIMITS"))))
+    HEALTH_PROBER.start()
+    if ANALYTICS_REFRESH_ENABLED:
+        CHURN_VIEW_REFRESHER.start()
+    if CONTRACT_LOG_MAINTENANCE_ENABLED:
+        CONTRACT_LOG_MAINTAINER.start()
+    try:
+        yield
+    finally:
+        CONTRACT_LOG_MAINTAINER.stop()
+        CHURN_VIEW_REFRESHER.stop()
+        HEALTH_PROBER.stop()
+        close_connections()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Telco Customer Churn API",
     description="API for managing Telco Customer data with PostgreSQL and MongoDB",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Per-route-group concurrency limits; overflow is shed with 503 + Retry-After.
+# Added before the metrics middleware so shed requests still show up in the request metrics
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# Per-request deadline (X-Request-Timeout-Ms or route default) enforced as statement timeouts; 504 once passed.
+# Wraps admission so queueing time counts against the deadline
+if DEADLINE_ENABLED:
+    app.add_middleware(DeadlineMiddleware)
+
+# Request metrics (latency, status, payload sizes, in-flight), exposed at /metrics
+if os.getenv("METRICS_ENABLED", "true").lower() == "true":
+    app.add_middleware(MetricsMiddleware)
+
+# Per-request profiling (X-Profile header or sampling); not installed at all unless enabled.
+# ProfiledRoute (set before the routes below are declared) follows sync handlers into the threadpool
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.router.route_class = ProfiledRoute
+
+# Diagnostics (slow query log, ...)
+app.include_router(admin_router)
+
+def build_lookup_results(ids: List[Any], records: List[Any]) -> List[LookupResult]:
+    """Pair requested IDs with their records, keeping request order and flagging missing IDs"""
+    results = []
+    for record_id, record in zip(ids, records):
+        if record is not None and not isinstance(record, dict):
+            record = record.dict()
+        results.append(LookupResult(id=record_id, found=record is not None, data=record))
+    return results
+
+# Mongo list/search pagination: `after` is the _id of the last document of the previous page,
+# `fields` a comma-separated projection
+OBJECT_ID_PATTERN = r"^[0-9a-fA-F]{24}$"
+FIELDS_PATTERN = r"^[A-Za-z_][\w.]*(,[A-Za-z_][\w.]*)*$"
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return fields.split(",") if fields else None
+
+# PostgreSQL search sort: a SEARCH_SORTS key, "-" prefixed for descending
+SEARCH_SORT_PATTERN = r"^-?(contract_id|tenure|monthly_charges|total_charges)$"
+# Churn analytics dimensions (CHURN_DIMENSIONS)
+CHURN_DIMENSION_PATTERN = "^(contract_type|payment_method|tenure_bucket|internet_service)$"
+# Name search modes; queries shorter than three characters have no trigrams to look up
+NAME_SEARCH_MODE_PATTERN = "^(prefix|substring|similar)$"
+NAME_SEARCH_MIN_LENGTH = 3
+# Raw billing history reaches back a few monthly partitions; older history comes from the daily rollups
+BILLING_HISTORY_MAX_DAYS = 92
+
+# Total count of list/search results, sent as X-Total-Count / X-Total-Count-Estimated headers:
+# none (default, no count query), estimated (planner statistics) or exact (cached COUNT)
+COUNT_MODE_PATTERN = "^(none|estimated|exact)$"
+
+def count_headers(count: str, counter: Callable[[str], Tuple[Optional[int], bool]]) -> Dict[str, str]:
+    """Total count headers for the count mode; counter(mode) returns (count, estimated), count None when unavailable"""
+    if count == "none":
+        return {}
+    total, estimated = counter(count)
+    if total is None:
+        return {}
+    return {"X-Total-Count": str(total), "X-Total-Count-Estimated": "true" if estimated else "false"}
+
+def json_bytes_response(content: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Send JSON that is already encoded (skips response model validation and re-encoding)"""
+    return Response(content=content, media_type="application/json", headers=headers)
+
 # Health check endpoints
 @app.get("/", response_model=APIResponse)
 async def root():
@@ -27,30 +136,138 @@ async def root():
 
 @app.get("/health", response_model=APIResponse)
 async def health_check():
-    """Health check endpoint"""
-    pg_status = test_pg_connection()
-    mongo_status = test_mongo_connection()
-    
-    return APIResponse(
-        message="Health Check",
-        data={
-            "postgresql": "connected" if pg_status else "disconnected",
-            "mongodb": "connected" if mongo_status else "disconnected",
-            "overall": "healthy" if pg_status and mongo_status else "unhealthy"
-        }
-    )
-
+    """Health check endpoint (cached results of the background prober, no database round trip)"""
+    snapshot = HEALTH_PROBER.snapshot()
+    data = {name: check["status"] for name, check in snapshot["checks"].items()}
+    data.update(snapshot)
+    return APIResponse(message="Health Check", data=data)
+
+@app.get("/health/live", response_model=APIResponse)
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return APIResponse(message="alive")
+
+@app.get("/health/ready", response_model=APIResponse)
+async def readiness():
+    """Readiness probe: 503 while a database is down or the cached status is stale"""
+    snapshot = HEALTH_PROBER.snapshot()
+    response = APIResponse(message="ready" if snapshot["overall"] == "healthy" else "not ready", data=snapshot)
+    if snapshot["overall"] != "healthy":
+        return JSONResponse(status_code=503, content=response.dict())
+    return response
+
+# Metrics are kept per worker process; with several workers every series carries the worker's
+# pid, so scrapes that land on different workers stay separate series (sum them in queries)
+METRICS_PID_LABEL = int(os.getenv("WEB_WORKERS", "1")) > 1
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    const_labels = {"pid": str(os.getpid())} if METRICS_PID_LABEL else None
+    return PlainTextResponse(REGISTRY.render(const_labels), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Database routes are plain functions: FastAPI runs them in the threadpool, so blocking
+# psycopg2/pymongo calls never stall the event loop and admission control can queue them
 # PostgreSQL Customer Endpoints
 @app.post("/api/postgresql/customers/", response_model=Customer)
-async def create_customer_pg(customer: CustomerCreate):
+def create_customer_pg(customer: CustomerCreate):
     """Create a new customer in PostgreSQL"""
     try:
         return CustomerCRUD.create_customer(customer)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/postgresql/customers/lookup", response_model=List[LookupResult])
+def lookup_customers_pg(lookup: LookupRequest):
+    """Get many customers by ID from PostgreSQL in one query"""
+    return build_lookup_results(lookup.ids, CustomerCRUD.get_many_customers(lookup.ids))
+
+@app.post("/api/postgresql/customers/complete", response_model=CustomerComplete)
+def create_customer_complete_pg(customer: CustomerCompleteCreate):
+    """Create a customer with its contract and service in PostgreSQL in one transaction"""
+    try:
+        return CustomerCRUD.create_customer_complete(customer)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/postgresql/customers/complete/batch", response_model=List[CustomerComplete])
+def create_customers_complete_pg(batch: CustomerCompleteBatchCreate):
+    """Create many customers with their contracts and services in PostgreSQL in one transaction"""
+    try:
+        return CustomerCRUD.create_many_customers_complete(batch.customers)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/postgresql/customers/complete/lookup", response_model=List[LookupResult])
+def lookup_customers_complete_pg(lookup: LookupRequest):
+    """Get many customers with their contracts and services from PostgreSQL in one query"""
+    return build_lookup_results(lookup.ids, CustomerCRUD.get_many_customers_complete(lookup.ids))
+
+@app.get("/api/postgresql/customers/search", response_model=CustomerSearchPage)
+def search_customers_pg(
+    response: Response,
+    gender: Optional[str] = None,
+    senior_citizen: Optional[bool] = None,
+    partner: Optional[bool] = None,
+    dependents: Optional[bool] = None,
+    tenure_min: Optional[int] = Query(None, ge=0),
+    tenure_max: Optional[int] = Query(None, ge=0),
+    contract_type: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    paperless_billing: Optional[bool] = None,
+    monthly_charges_min: Optional[float] = None,
+    monthly_charges_max: Optional[float] = None,
+    total_charges_min: Optional[float] = None,
+    total_charges_max: Optional[float] = None,
+    churn: Optional[bool] = None,
+    internet_service: Optional[str] = None,
+    sort: str = Query("contract_id", pattern=SEARCH_SORT_PATTERN),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Search PostgreSQL customers by customer, contract and service fields (one hit per contract),
+    sorted by `sort` (`-` prefix for descending) with keyset pagination through `after`;
+    `count` adds the number of hits over all pages as X-Total-Count
+
+    Contracts whose sort column is NULL (tenure, monthly_charges, total_charges) are not
+    returned: keyset pages need a value to continue from, so the query filters them out.
+    """
+    filters = CustomerSearchFilters(
+        gender=gender, senior_citizen=senior_citizen, partner=partner, dependents=dependents,
+        tenure_min=tenure_min, tenure_max=tenure_max,
+        contract_type=contract_type, payment_method=payment_method, paperless_billing=paperless_billing,
+        monthly_charges_min=monthly_charges_min, monthly_charges_max=monthly_charges_max,
+        total_charges_min=total_charges_min, total_charges_max=total_charges_max,
+        churn=churn, internet_service=internet_service
+    )
+    try:
+        page = CustomerCRUD.search_customers(filters, sort=sort.lstrip("-"), descending=sort.startswith("-"),
+                                             limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(count_headers(count, lambda mode: CustomerCRUD.count_search_customers(filters, mode)))
+    return page
+
+@app.get("/api/postgresql/customers/search/name", response_model=List[CustomerNameMatch])
+def search_customers_by_name_pg(
+    q: str = Query(..., min_length=NAME_SEARCH_MIN_LENGTH, max_length=100),
+    mode: str = Query("substring", pattern=NAME_SEARCH_MODE_PATTERN),
+    limit: int = Query(20, ge=1, le=100),
+    threshold: float = Query(0.3, ge=0, le=1)
+):
+    """Search PostgreSQL customers by partial name: prefix (name order), substring or
+    similarity above `threshold` (both ranked by trigram similarity)"""
+    return CustomerCRUD.search_customers_by_name(q, mode=mode, limit=limit, threshold=threshold)
+
 @app.get("/api/postgresql/customers/{customer_id}", response_model=Customer)
-async def get_customer_pg(customer_id: int):
+def get_customer_pg(customer_id: int):
     """Get a customer by ID from PostgreSQL"""
     customer = CustomerCRUD.get_customer(customer_id)
     if not customer:
@@ -58,12 +275,18 @@ async def get_customer_pg(customer_id: int):
     return customer
 
 @app.get("/api/postgresql/customers/", response_model=List[Customer])
-async def get_customers_pg(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all customers from PostgreSQL with pagination"""
+def get_customers_pg(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all customers from PostgreSQL with pagination (`count` adds the table's row count as X-Total-Count)"""
+    response.headers.update(count_headers(count, CustomerCRUD.count_customers))
     return CustomerCRUD.get_customers(skip=skip, limit=limit)
 
 @app.put("/api/postgresql/customers/{customer_id}", response_model=Customer)
-async def update_customer_pg(customer_id: int, customer_update: CustomerUpdate):
+def update_customer_pg(customer_id: int, customer_update: CustomerUpdate):
     """Update a customer in PostgreSQL"""
     customer = CustomerCRUD.update_customer(customer_id, customer_update)
     if not customer:
@@ -71,23 +294,38 @@ async def update_customer_pg(customer_id: int, customer_update: CustomerUpdate):
     return customer
 
 @app.delete("/api/postgresql/customers/{customer_id}", response_model=APIResponse)
-async def delete_customer_pg(customer_id: int):
+def delete_customer_pg(customer_id: int):
     """Delete a customer from PostgreSQL"""
     if not CustomerCRUD.delete_customer(customer_id):
         raise HTTPException(status_code=404, detail="Customer not found")
     return APIResponse(message="Customer deleted successfully")
 
+@app.get("/api/postgresql/customers/{customer_id}/complete", response_model=CustomerComplete)
+def get_customer_complete_pg(customer_id: int):
+    """Get complete customer data from PostgreSQL (customer + contracts + services) in one query"""
+    customer = CustomerCRUD.get_customer_complete(customer_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
+
 # PostgreSQL Contract Endpoints
 @app.post("/api/postgresql/contracts/", response_model=Contract)
-async def create_contract_pg(contract: ContractCreate):
+def create_contract_pg(contract: ContractCreate):
     """Create a new contract in PostgreSQL"""
     try:
         return ContractCRUD.create_contract(contract)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/postgresql/contracts/lookup", response_model=List[LookupResult])
+def lookup_contracts_pg(lookup: LookupRequest):
+    """Get many contracts by ID from PostgreSQL in one query"""
+    return build_lookup_results(lookup.ids, ContractCRUD.get_many_contracts(lookup.ids))
+
 @app.get("/api/postgresql/contracts/{contract_id}", response_model=Contract)
-async def get_contract_pg(contract_id: int):
+def get_contract_pg(contract_id: int):
     """Get a contract by ID from PostgreSQL"""
     contract = ContractCRUD.get_contract(contract_id)
     if not contract:
@@ -95,17 +333,23 @@ async def get_contract_pg(contract_id: int):
     return contract
 
 @app.get("/api/postgresql/contracts/", response_model=List[Contract])
-async def get_contracts_pg(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all contracts from PostgreSQL with pagination"""
+def get_contracts_pg(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all contracts from PostgreSQL with pagination (`count` adds the table's row count as X-Total-Count)"""
+    response.headers.update(count_headers(count, ContractCRUD.count_contracts))
     return ContractCRUD.get_contracts(skip=skip, limit=limit)
 
 @app.get("/api/postgresql/customers/{customer_id}/contracts/", response_model=List[Contract])
-async def get_customer_contracts_pg(customer_id: int):
+def get_customer_contracts_pg(customer_id: int):
     """Get contracts by customer ID from PostgreSQL"""
     return ContractCRUD.get_contracts_by_customer(customer_id)
 
 @app.put("/api/postgresql/contracts/{contract_id}", response_model=Contract)
-async def update_contract_pg(contract_id: int, contract_update: ContractUpdate):
+def update_contract_pg(contract_id: int, contract_update: ContractUpdate):
     """Update a contract in PostgreSQL"""
     contract = ContractCRUD.update_contract(contract_id, contract_update)
     if not contract:
@@ -113,7 +357,7 @@ async def update_contract_pg(contract_id: int, contract_update: ContractUpdate):
     return contract
 
 @app.delete("/api/postgresql/contracts/{contract_id}", response_model=APIResponse)
-async def delete_contract_pg(contract_id: int):
+def delete_contract_pg(contract_id: int):
     """Delete a contract from PostgreSQL"""
     if not ContractCRUD.delete_contract(contract_id):
         raise HTTPException(status_code=404, detail="Contract not found")
@@ -121,15 +365,22 @@ async def delete_contract_pg(contract_id: int):
 
 # PostgreSQL Service Endpoints
 @app.post("/api/postgresql/services/", response_model=Service)
-async def create_service_pg(service: ServiceCreate):
+def create_service_pg(service: ServiceCreate):
     """Create a new service in PostgreSQL"""
     try:
         return ServiceCRUD.create_service(service)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/postgresql/services/lookup", response_model=List[LookupResult])
+def lookup_services_pg(lookup: LookupRequest):
+    """Get many services by ID from PostgreSQL in one query"""
+    return build_lookup_results(lookup.ids, ServiceCRUD.get_many_services(lookup.ids))
+
 @app.get("/api/postgresql/services/{service_id}", response_model=Service)
-async def get_service_pg(service_id: int):
+def get_service_pg(service_id: int):
     """Get a service by ID from PostgreSQL"""
     service = ServiceCRUD.get_service(service_id)
     if not service:
@@ -137,17 +388,23 @@ async def get_service_pg(service_id: int):
     return service
 
 @app.get("/api/postgresql/services/", response_model=List[Service])
-async def get_services_pg(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all services from PostgreSQL with pagination"""
+def get_services_pg(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all services from PostgreSQL with pagination (`count` adds the table's row count as X-Total-Count)"""
+    response.headers.update(count_headers(count, ServiceCRUD.count_services))
     return ServiceCRUD.get_services(skip=skip, limit=limit)
 
 @app.get("/api/postgresql/customers/{customer_id}/services/", response_model=List[Service])
-async def get_customer_services_pg(customer_id: int):
+def get_customer_services_pg(customer_id: int):
     """Get services by customer ID from PostgreSQL"""
     return ServiceCRUD.get_services_by_customer(customer_id)
 
 @app.put("/api/postgresql/services/{service_id}", response_model=Service)
-async def update_service_pg(service_id: int, service_update: ServiceUpdate):
+def update_service_pg(service_id: int, service_update: ServiceUpdate):
     """Update a service in PostgreSQL"""
     service = ServiceCRUD.update_service(service_id, service_update)
     if not service:
@@ -155,36 +412,84 @@ async def update_service_pg(service_id: int, service_update: ServiceUpdate):
     return service
 
 @app.delete("/api/postgresql/services/{service_id}", response_model=APIResponse)
-async def delete_service_pg(service_id: int):
+def delete_service_pg(service_id: int):
     """Delete a service from PostgreSQL"""
     if not ServiceCRUD.delete_service(service_id):
         raise HTTPException(status_code=404, detail="Service not found")
     return APIResponse(message="Service deleted successfully")
 
+# Billing History Endpoints
+@app.get("/api/postgresql/customers/{customer_id}/billing-history", response_model=List[ContractLog])
+def get_billing_history_pg(
+    customer_id: int,
+    days: int = Query(30, ge=1, le=BILLING_HISTORY_MAX_DAYS),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Total charges changes of a customer over the last `days` days, newest first (recent contract_logs partitions only)"""
+    return ContractLogCRUD.get_contract_logs(customer_id, days=days, limit=limit)
+
+@app.get("/api/postgresql/customers/{customer_id}/billing-history/daily", response_model=List[ContractLogDaily])
+def get_billing_history_daily_pg(customer_id: int, days: int = Query(365, ge=1, le=3660)):
+    """Daily summaries of a customer's total charges changes, newest first (kept after the raw log is dropped)"""
+    return ContractLogCRUD.get_contract_log_rollups(customer_id, days=days)
+
 # MongoDB Customer Endpoints
 @app.post("/api/mongodb/customers/", response_model=Dict[str, Any])
-async def create_customer_mongo(customer: CustomerMongo):
+def create_customer_mongo(customer: CustomerMongo):
     """Create a new customer in MongoDB"""
     try:
         return MongoCRUD.create_customer_mongo(customer)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/mongodb/customers/lookup", response_model=List[LookupResult])
+def lookup_customers_mongo(lookup: MongoLookupRequest):
+    """Get many customers by customer ID from MongoDB in one query"""
+    return build_lookup_results(lookup.ids, MongoCRUD.get_many_customers_mongo(lookup.ids))
+
+@app.post("/api/mongodb/customers/bulk", response_model=MongoBulkResult)
+def bulk_write_customers_mongo(bulk: MongoBulkRequest):
+    """Insert, update and delete many customers in MongoDB with unordered bulk writes"""
+    try:
+        return MongoCRUD.bulk_write_customers_mongo(bulk.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/mongodb/customers/{customer_id}", response_model=Dict[str, Any])
-async def get_customer_mongo(customer_id: str):
+def get_customer_mongo(customer_id: str):
     """Get a customer by ID from MongoDB"""
+    if MONGO_RAW_READS:
+        customer = MongoCRUD.get_customer_mongo_json(customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return json_bytes_response(customer)
     customer = MongoCRUD.get_customer_mongo(customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
 @app.get("/api/mongodb/customers/", response_model=List[Dict[str, Any]])
-async def get_customers_mongo(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all customers from MongoDB with pagination"""
-    return MongoCRUD.get_customers_mongo(skip=skip, limit=limit)
+def get_customers_mongo(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, pattern=OBJECT_ID_PATTERN),
+    fields: Optional[str] = Query(None, pattern=FIELDS_PATTERN),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all customers from MongoDB in _id order with pagination (pass the last _id as `after` for the next page;
+    `count` adds the collection's document count as X-Total-Count)"""
+    headers = count_headers(count, lambda mode: MongoCRUD.count_documents_mongo("customers", mode=mode))
+    if MONGO_RAW_READS:
+        return json_bytes_response(MongoCRUD.get_customers_mongo_json(skip=skip, limit=limit, after=after, fields=parse_fields(fields)),
+                                   headers)
+    response.headers.update(headers)
+    return MongoCRUD.get_customers_mongo(skip=skip, limit=limit, after=after, fields=parse_fields(fields))
 
 @app.put("/api/mongodb/customers/{customer_id}", response_model=Dict[str, Any])
-async def update_customer_mongo(customer_id: str, customer_update: Dict[str, Any]):
+def update_customer_mongo(customer_id: str, customer_update: Dict[str, Any]):
     """Update a customer in MongoDB"""
     customer = MongoCRUD.update_customer_mongo(customer_id, customer_update)
     if not customer:
@@ -192,7 +497,7 @@ async def update_customer_mongo(customer_id: str, customer_update: Dict[str, Any
     return customer
 
 @app.delete("/api/mongodb/customers/{customer_id}", response_model=APIResponse)
-async def delete_customer_mongo(customer_id: str):
+def delete_customer_mongo(customer_id: str):
     """Delete a customer from MongoDB"""
     if not MongoCRUD.delete_customer_mongo(customer_id):
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -200,28 +505,61 @@ async def delete_customer_mongo(customer_id: str):
 
 # MongoDB Contract Endpoints
 @app.post("/api/mongodb/contracts/", response_model=Dict[str, Any])
-async def create_contract_mongo(contract: ContractMongo):
+def create_contract_mongo(contract: ContractMongo):
     """Create a new contract in MongoDB"""
     try:
         return MongoCRUD.create_contract_mongo(contract)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/mongodb/contracts/lookup", response_model=List[LookupResult])
+def lookup_contracts_mongo(lookup: MongoLookupRequest):
+    """Get many contracts by customer ID from MongoDB in one query"""
+    return build_lookup_results(lookup.ids, MongoCRUD.get_many_contracts_mongo(lookup.ids))
+
+@app.post("/api/mongodb/contracts/bulk", response_model=MongoBulkResult)
+def bulk_write_contracts_mongo(bulk: MongoBulkRequest):
+    """Insert, update and delete many contracts in MongoDB with unordered bulk writes"""
+    try:
+        return MongoCRUD.bulk_write_contracts_mongo(bulk.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/mongodb/contracts/{customer_id}", response_model=Dict[str, Any])
-async def get_contract_mongo(customer_id: str):
+def get_contract_mongo(customer_id: str):
     """Get a contract by customer ID from MongoDB"""
+    if MONGO_RAW_READS:
+        contract = MongoCRUD.get_contract_mongo_json(customer_id)
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        return json_bytes_response(contract)
     contract = MongoCRUD.get_contract_mongo(customer_id)
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
     return contract
 
 @app.get("/api/mongodb/contracts/", response_model=List[Dict[str, Any]])
-async def get_contracts_mongo(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all contracts from MongoDB with pagination"""
-    return MongoCRUD.get_contracts_mongo(skip=skip, limit=limit)
+def get_contracts_mongo(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, pattern=OBJECT_ID_PATTERN),
+    fields: Optional[str] = Query(None, pattern=FIELDS_PATTERN),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all contracts from MongoDB in _id order with pagination (pass the last _id as `after` for the next page;
+    `count` adds the collection's document count as X-Total-Count)"""
+    headers = count_headers(count, lambda mode: MongoCRUD.count_documents_mongo("contracts", mode=mode))
+    if MONGO_RAW_READS:
+        return json_bytes_response(MongoCRUD.get_contracts_mongo_json(skip=skip, limit=limit, after=after, fields=parse_fields(fields)),
+                                   headers)
+    response.headers.update(headers)
+    return MongoCRUD.get_contracts_mongo(skip=skip, limit=limit, after=after, fields=parse_fields(fields))
 
 @app.put("/api/mongodb/contracts/{customer_id}", response_model=Dict[str, Any])
-async def update_contract_mongo(customer_id: str, contract_update: Dict[str, Any]):
+def update_contract_mongo(customer_id: str, contract_update: Dict[str, Any]):
     """Update a contract in MongoDB"""
     contract = MongoCRUD.update_contract_mongo(customer_id, contract_update)
     if not contract:
@@ -229,7 +567,7 @@ async def update_contract_mongo(customer_id: str, contract_update: Dict[str, Any
     return contract
 
 @app.delete("/api/mongodb/contracts/{customer_id}", response_model=APIResponse)
-async def delete_contract_mongo(customer_id: str):
+def delete_contract_mongo(customer_id: str):
     """Delete a contract from MongoDB"""
     if not MongoCRUD.delete_contract_mongo(customer_id):
         raise HTTPException(status_code=404, detail="Contract not found")
@@ -237,28 +575,61 @@ async def delete_contract_mongo(customer_id: str):
 
 # MongoDB Service Endpoints
 @app.post("/api/mongodb/services/", response_model=Dict[str, Any])
-async def create_service_mongo(service: ServiceMongo):
+def create_service_mongo(service: ServiceMongo):
     """Create a new service in MongoDB"""
     try:
         return MongoCRUD.create_service_mongo(service)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/mongodb/services/lookup", response_model=List[LookupResult])
+def lookup_services_mongo(lookup: MongoLookupRequest):
+    """Get many services by customer ID from MongoDB in one query"""
+    return build_lookup_results(lookup.ids, MongoCRUD.get_many_services_mongo(lookup.ids))
+
+@app.post("/api/mongodb/services/bulk", response_model=MongoBulkResult)
+def bulk_write_services_mongo(bulk: MongoBulkRequest):
+    """Insert, update and delete many services in MongoDB with unordered bulk writes"""
+    try:
+        return MongoCRUD.bulk_write_services_mongo(bulk.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/mongodb/services/{customer_id}", response_model=Dict[str, Any])
-async def get_service_mongo(customer_id: str):
+def get_service_mongo(customer_id: str):
     """Get a service by customer ID from MongoDB"""
+    if MONGO_RAW_READS:
+        service = MongoCRUD.get_service_mongo_json(customer_id)
+        if not service:
+            raise HTTPException(status_code=404, detail="Service not found")
+        return json_bytes_response(service)
     service = MongoCRUD.get_service_mongo(customer_id)
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
     return service
 
 @app.get("/api/mongodb/services/", response_model=List[Dict[str, Any]])
-async def get_services_mongo(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
-    """Get all services from MongoDB with pagination"""
-    return MongoCRUD.get_services_mongo(skip=skip, limit=limit)
+def get_services_mongo(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, pattern=OBJECT_ID_PATTERN),
+    fields: Optional[str] = Query(None, pattern=FIELDS_PATTERN),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
+):
+    """Get all services from MongoDB in _id order with pagination (pass the last _id as `after` for the next page;
+    `count` adds the collection's document count as X-Total-Count)"""
+    headers = count_headers(count, lambda mode: MongoCRUD.count_documents_mongo("services", mode=mode))
+    if MONGO_RAW_READS:
+        return json_bytes_response(MongoCRUD.get_services_mongo_json(skip=skip, limit=limit, after=after, fields=parse_fields(fields)),
+                                   headers)
+    response.headers.update(headers)
+    return MongoCRUD.get_services_mongo(skip=skip, limit=limit, after=after, fields=parse_fields(fields))
 
 @app.put("/api/mongodb/services/{customer_id}", response_model=Dict[str, Any])
-async def update_service_mongo(customer_id: str, service_update: Dict[str, Any]):
+def update_service_mongo(customer_id: str, service_update: Dict[str, Any]):
     """Update a service in MongoDB"""
     service = MongoCRUD.update_service_mongo(customer_id, service_update)
     if not service:
@@ -266,7 +637,7 @@ async def update_service_mongo(customer_id: str, service_update: Dict[str, Any])
     return service
 
 @app.delete("/api/mongodb/services/{customer_id}", response_model=APIResponse)
-async def delete_service_mongo(customer_id: str):
+def delete_service_mongo(customer_id: str):
     """Delete a service from MongoDB"""
     if not MongoCRUD.delete_service_mongo(customer_id):
         raise HTTPException(status_code=404, detail="Service not found")
@@ -274,22 +645,40 @@ async def delete_service_mongo(customer_id: str):
 
 # MongoDB Utility Endpoints
 @app.get("/api/mongodb/customers/{customer_id}/complete", response_model=Dict[str, Any])
-async def get_customer_complete_data_mongo(customer_id: str):
+def get_customer_complete_data_mongo(customer_id: str):
     """Get complete customer data from MongoDB (customer + contract + service)"""
     data = MongoCRUD.get_customer_complete_data(customer_id)
     if not data["customer"]:
         raise HTTPException(status_code=404, detail="Customer not found")
     return data
 
+@app.get("/api/mongodb/customers/{customer_id}/profile", response_model=Dict[str, Any])
+def get_customer_profile_mongo(customer_id: str):
+    """Get a customer with its contract and service embedded, from the customer_profiles read model (one document)"""
+    if MONGO_RAW_READS:
+        profile = MongoCRUD.get_customer_profile_mongo_json(customer_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return json_bytes_response(profile)
+    profile = MongoCRUD.get_customer_profile_mongo(customer_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return profile
+
 @app.get("/api/mongodb/customers/search/", response_model=List[Dict[str, Any]])
-async def search_customers_mongo(
+def search_customers_mongo(
+    response: Response,
     gender: Optional[str] = None,
     senior_citizen: Optional[bool] = None,
     partner: Optional[bool] = None,
     skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, pattern=OBJECT_ID_PATTERN),
+    fields: Optional[str] = Query(None, pattern=FIELDS_PATTERN),
+    count: str = Query("none", pattern=COUNT_MODE_PATTERN)
 ):
-    """Search customers by criteria in MongoDB"""
+    """Search customers by criteria in MongoDB, in _id order with pagination
+    (`count` adds the number of matches as X-Total-Count; with criteria, only count=exact does)"""
     criteria = {}
     if gender:
         criteria["gender"] = gender
@@ -298,12 +687,110 @@ async def search_customers_mongo(
     if partner is not None:
         criteria["Partner"] = partner
     
-    return MongoCRUD.search_customers_by_criteria(criteria, skip=skip, limit=limit)
+    headers = count_headers(count, lambda mode: MongoCRUD.count_documents_mongo("customers", criteria, mode))
+    if MONGO_RAW_READS:
+        return json_bytes_response(MongoCRUD.search_customers_by_criteria_json(
+            criteria, skip=skip, limit=limit, after=after, fields=parse_fields(fields)), headers)
+    response.headers.update(headers)
+    return MongoCRUD.search_customers_by_criteria(criteria, skip=skip, limit=limit, after=after, fields=parse_fields(fields))
+
+@app.get("/api/mongodb/customers/search/name", response_model=List[Dict[str, Any]])
+def search_customers_by_name_mongo(
+    q: str = Query(..., min_length=NAME_SEARCH_MIN_LENGTH, max_length=100),
+    mode: str = Query("substring", pattern=NAME_SEARCH_MODE_PATTERN),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search MongoDB customers by partial name: prefix, substring (name order) or
+    similar (text index word matches ranked by score)"""
+    return MongoCRUD.search_customers_by_name(q, mode=mode, limit=limit)
+
+@app.get("/api/mongodb/customers/search/facets", response_model=MongoFacetedSearchResult)
+def search_customers_faceted_mongo(
+    gender: Optional[str] = None,
+    senior_citizen: Optional[bool] = None,
+    partner: Optional[bool] = None,
+    dependents: Optional[bool] = None,
+    tenure_min: Optional[int] = Query(None, ge=0),
+    tenure_max: Optional[int] = Query(None, ge=0),
+    contract_type: Optional[str] = None,
+    payment_method: Optional[str] = None,
+    paperless_billing: Optional[bool] = None,
+    monthly_charges_min: Optional[float] = None,
+    monthly_charges_max: Optional[float] = None,
+    total_charges_min: Optional[float] = None,
+    total_charges_max: Optional[float] = None,
+    churn: Optional[bool] = None,
+    internet_service: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, pattern=OBJECT_ID_PATTERN)
+):
+    """Search customers by customer, contract and service fields in MongoDB, with the total and
+    counts per contract type, payment method and internet service from one aggregation"""
+    filters = CustomerSearchFilters(
+        gender=gender, senior_citizen=senior_citizen, partner=partner, dependents=dependents,
+        tenure_min=tenure_min, tenure_max=tenure_max,
+        contract_type=contract_type, payment_method=payment_method, paperless_billing=paperless_billing,
+        monthly_charges_min=monthly_charges_min, monthly_charges_max=monthly_charges_max,
+        total_charges_min=total_charges_min, total_charges_max=total_charges_max,
+        churn=churn, internet_service=internet_service
+    )
+    return MongoCRUD.search_customers_faceted(filters, skip=skip, limit=limit, after=after)
+
+# Analytics Endpoints
+@app.get("/api/postgresql/analytics/churn", response_model=ChurnAnalytics)
+def churn_analytics_pg(dimension: Optional[str] = Query(None, pattern=CHURN_DIMENSION_PATTERN)):
+    """Churn rate and average monthly charges per segment, from the churn_segments materialized view"""
+    return AnalyticsCRUD.get_churn_segments(dimension)
+
+@app.get("/api/mongodb/analytics/churn", response_model=ChurnAnalytics)
+def churn_analytics_mongo(dimension: Optional[str] = Query(None, pattern=CHURN_DIMENSION_PATTERN)):
+    """Churn rate and average monthly charges per segment, from a cached aggregation over the customer profiles"""
+    return MongoCRUD.get_churn_segments_mongo(dimension)
+
+# Export Endpoints
+@app.get("/api/{store}/export/{table}")
+def export_table_stream(
+    store: str,
+    table: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    compress: bool = False,
+    batch_size: int = Query(5000, ge=100, le=50000)
+):
+    """Stream a full table/collection (customers, contracts, services) as NDJSON, CSV or Parquet"""
+    try:
+        chunks = export_table(store, table, format=format, compress=compress, batch_size=batch_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type = "application/gzip" if compress and format != "parquet" else MEDIA_TYPES[format]
+    filename = export_filename(table, format, compress)
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Ingest Endpoints
+@app.post("/api/ingest", response_model=APIResponse)
+async def ingest_upload(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    target: str = Query("both", pattern="^(postgresql|mongodb|both)$"),
+    chunk_size: int = Query(5000, ge=100, le=50000)
+):
+    """Ingest a streamed NDJSON or CSV upload in Telco format into PostgreSQL and/or MongoDB"""
+    try:
+        report = await ingest_stream(request.stream(), format=format, target=target, chunk_size=chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(message="Ingest completed", data=report, count=report["rows_valid"])
 
 # Run the application
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
-        "main:app",
+        "src.api.main:app",
         host="0.0.0.0",
         port=8000,
         reload=True
@@ -0,0 +1,106 @@
+import json
+import os
+from typing import Callable, Dict, Optional
+from ..database.deadline import DeadlineExceeded, deadline
+from ..monitoring.metrics import REGISTRY, route_label
+from .admission import route_group
+
+# Deadlines are on by default; set DEADLINE_ENABLED=false to let requests run without one
+DEADLINE_ENABLED = os.getenv("DEADLINE_ENABLED", "true").lower() == "true"
+# Client-supplied time budget for the whole request, in milliseconds
+DEADLINE_HEADER = b"x-request-timeout-ms"
+# Upper bound on client-supplied budgets, in milliseconds
+DEADLINE_MAX_MS = int(os.getenv("DEADLINE_MAX_MS", "30000"))
+
+# Per-route-group default budget in milliseconds (groups as in admission control). Streaming
+# export/ingest run for as long as the data takes and never get a deadline
+DEFAULT_DEADLINES_MS: Dict[str, Optional[int]] = {
+    "bulk": 15000,
+    "search": 10000,
+    "complete": 5000,
+    "list": 5000,
+    "default": 3000
+}
+
+REQUEST_DEADLINE_EXCEEDED = REGISTRY.counter(
+    "request_deadline_exceeded_total", "Requests answered with 504 because their deadline passed, by route",
+    ("method", "route"))
+
+def parse_deadlines(value: Optional[str]) -> Dict[str, Optional[int]]:
+    """Parse "search=2000,list=1000" (milliseconds per group, 0 for none) over the defaults"""
+    deadlines = dict(DEFAULT_DEADLINES_MS)
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        group, _, milliseconds = item.partition("=")
+        group = group.strip()
+        if group not in deadlines:
+            raise ValueError(f"Unknown deadline group '{group}', expected one of: {', '.join(deadlines)}")
+        deadlines[group] = int(milliseconds) or None
+    return deadlines
+
+def _header_budget_ms(scope) -> Optional[int]:
+    for name, value in scope.get("headers", ()):
+        if name == DEADLINE_HEADER:
+            try:
+                budget = int(value)
+            except ValueError:
+                return None
+            return budget if budget > 0 else None
+    return None
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each /api/ request a deadline the database layer enforces
+
+    The budget comes from the X-Request-Timeout-Ms header (capped at DEADLINE_MAX_MS) or the
+    route group's default; streaming routes never get one. get_pg_cursor() turns what is left
+    into SET LOCAL statement_timeout and get_mongo_collection() into maxTimeMS. Once the
+    deadline has passed no further statement is sent and the request gets 504.
+    """
+
+    def __init__(self, app, deadlines: Optional[Dict[str, Optional[int]]] = None,
+                 classify: Callable[[str, str], Optional[str]] = route_group,
+                 max_ms: int = DEADLINE_MAX_MS):
+        self.app = app
+        self.deadlines = deadlines or parse_deadlines(os.getenv("DEADLINE_DEFAULTS"))
+        self.classify = classify
+        self.max_ms = max_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = self.classify(scope["method"], scope["path"])
+        default_ms = self.deadlines.get(group)
+        if default_ms is None or group == "streaming":
+            await self.app(scope, receive, send)
+            return
+
+        budget_ms = min(_header_budget_ms(scope) or default_ms, self.max_ms)
+        started = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                started[0] = True
+            await send(message)
+
+        try:
+            with deadline(budget_ms / 1000):
+                await self.app(scope, receive, send_wrapper)
+        except DeadlineExceeded:
+            REQUEST_DEADLINE_EXCEEDED.inc(scope["method"], route_label(scope))
+            if started[0]:
+                raise
+            await self._timeout(send, budget_ms)
+
+    async def _timeout(self, send, budget_ms: int):
+        body = json.dumps({"detail": f"Request deadline of {budget_ms} ms exceeded"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
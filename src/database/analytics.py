@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from .database import create_pg_connection
+from ..monitoring.metrics import REGISTRY
+
+# Churn dashboards read pre-aggregated segments: the churn_segments materialized view
+# (sql/schema_design.sql) for PostgreSQL and a cached aggregation for MongoDB
+CHURN_DIMENSIONS = ("contract_type", "payment_method", "tenure_bucket", "internet_service")
+# Upper tenure (months) of each bucket; longer tenures are "73+". The view's CASE uses the same buckets
+TENURE_BUCKETS = ((12, "0-12"), (24, "13-24"), (48, "25-48"), (72, "49-72"))
+TENURE_OVERFLOW = "73+"
+
+# Background refresh of the view; set ANALYTICS_REFRESH_ENABLED=false to refresh only through the admin route
+ANALYTICS_REFRESH_ENABLED = os.getenv("ANALYTICS_REFRESH_ENABLED", "true").lower() == "true"
+# Seconds between checks for writes to the source tables (refreshes only happen when there were some)
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", "60"))
+# Refresh at least this often even when no writes were seen (statistics counters can be reset)
+ANALYTICS_MAX_AGE = float(os.getenv("ANALYTICS_MAX_AGE", "3600"))
+# Seconds a MongoDB churn aggregation is served from the per-process cache
+MONGO_ANALYTICS_TTL = float(os.getenv("MONGO_ANALYTICS_TTL", "60"))
+
+# Only one worker refreshes at a time; the others skip their turn
+_REFRESH_LOCK_KEY = 0x636875726E  # "churn"
+
+# Tuples written to the source tables, the same expression the view records as source_writes
+SOURCE_WRITES_QUERY = """
+    SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)::bigint
+    FROM pg_stat_user_tables
+    WHERE schemaname = current_schema() AND relname IN ('customers', 'contracts', 'services')
+"""
+
+ANALYTICS_REFRESHES = REGISTRY.counter(
+    "analytics_refreshes_total", "Materialized view refreshes by view and result (refreshed, skipped, failed)",
+    ("view", "result"))
+ANALYTICS_REFRESH_DURATION = REGISTRY.gauge(
+    "analytics_refresh_duration_seconds", "Duration of the last materialized view refresh", ("view",))
+
+def churn_response(rows: List[Dict[str, Any]], refreshed_at: Optional[datetime]) -> Dict[str, Any]:
+    """ChurnAnalytics fields from (dimension, segment, contracts, churned, avg_monthly_charges) rows"""
+    segments: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        segments.setdefault(row["dimension"], []).append({
+            "segment": row["segment"],
+            "contracts": row["contracts"],
+            "churned": row["churned"],
+            "churn_rate": round(row["churned"] / row["contracts"], 4) if row["contracts"] else 0.0,
+            "avg_monthly_charges": None if row["avg_monthly_charges"] is None else round(float(row["avg_monthly_charges"]), 2)
+        })
+    age = (datetime.now(timezone.utc) - refreshed_at).total_seconds() if refreshed_at else None
+    return {"segments": segments, "refreshed_at": refreshed_at, "age_seconds": None if age is None else round(age, 3)}
+
+# MongoDB
+def _tenure_bucket_expression() -> Dict[str, Any]:
+    branches = [{"case": {"$not": [{"$isNumber": "$tenure"}]}, "then": "Unknown"}]
+    branches += [{"case": {"$lte": ["$tenure", upper]}, "then": label} for upper, label in TENURE_BUCKETS]
+    return {"$switch": {"branches": branches, "default": TENURE_OVERFLOW}}
+
+def churn_pipeline() -> List[Dict[str, Any]]:
+    """Churn segments of every dimension in one pass over profiles (customers with contract and service embedded)"""
+    def segments(key: Any) -> List[Dict[str, Any]]:
+        return [
+            {"$group": {
+                "_id": key,
+                "contracts": {"$sum": 1},
+                "churned": {"$sum": {"$cond": [{"$eq": ["$contract.Churn", True]}, 1, 0]}},
+                "avg_monthly_charges": {"$avg": "$contract.MonthlyCharges"}
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+    return [
+        {"$match": {"contract": {"$exists": True}}},
+        {"$facet": {
+            "contract_type": segments({"$ifNull": ["$contract.Contract", "Unknown"]}),
+            "payment_method": segments({"$ifNull": ["$contract.PaymentMethod", "Unknown"]}),
+            "tenure_bucket": segments(_tenure_bucket_expression()),
+            "internet_service": segments({"$ifNull": ["$service.InternetService", "Unknown"]})
+        }}
+    ]
+
+class TTLCache:
+    """One cached value per process, recomputed by one caller at a time once it expires
+
+    While a caller recomputes, the others get the expired value instead of waiting for the
+    aggregation; they only wait when there is no value at all (first use, after clear()).
+    """
+
+    def __init__(self, ttl: float = MONGO_ANALYTICS_TTL):
+        self.ttl = ttl
+        self._value = None
+        self._computed_at: Optional[float] = None
+        # Bumped by clear(), so a computation that started before it is not stored
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+
+    def get(self, compute: Callable[[], Any]):
+        """(value, computed_at as a UTC datetime)"""
+        while True:
+            with self._lock:
+                if self._computed_at is not None and time.time() - self._computed_at < self.ttl:
+                    return self._current()
+                stale = self._computed_at is not None
+            if self._compute_lock.acquire(blocking=not stale):
+                try:
+                    return self._recompute(compute)
+                finally:
+                    self._compute_lock.release()
+            # Another caller is recomputing; hand out the expired value meanwhile
+            with self._lock:
+                if self._computed_at is not None:
+                    return self._current()
+
+    def clear(self):
+        with self._lock:
+            self._value, self._computed_at = None, None
+            self._generation += 1
+
+    def _recompute(self, compute: Callable[[], Any]):
+        with self._lock:
+            # Computed by the caller we waited for
+            if self._computed_at is not None and time.time() - self._computed_at < self.ttl:
+                return self._current()
+            generation = self._generation
+        value = compute()
+        computed_at = time.time()
+        with self._lock:
+            if generation == self._generation:
+                self._value, self._computed_at = value, computed_at
+        return value, datetime.fromtimestamp(computed_at, timezone.utc)
+
+    def _current(self):
+        return self._value, datetime.fromtimestamp(self._computed_at, timezone.utc)
+
+MONGO_CHURN_CACHE = TTLCache()
+
+# PostgreSQL
+class MaterializedViewRefresher:
+    """Background thread refreshing a materialized view concurrently after writes to its source tables
+
+    Every interval it compares the source tables' write counters (pg_stat_user_tables) with
+    the counter the view recorded at its last refresh (source_writes column), so writes from
+    any worker or client trigger a refresh, and nothing is refreshed while the data is idle.
+    Runs on its own connection, without the API's statement timeouts.
+    """
+
+    def __init__(self, view: str, interval: float = ANALYTICS_REFRESH_INTERVAL, max_age: float = ANALYTICS_MAX_AGE):
+        self.view = view
+        self.interval = interval
+        self.max_age = max_age
+        self._connection = None
+        # The background thread and the admin route share the connection
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"refresh-{self.view}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.close()
+
+    def close(self):
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                ANALYTICS_REFRESHES.inc(self.view, "failed")
+                print(f"Refresh of {self.view} failed: {e}")
+                self.close()
+            if self._stop.wait(self.interval):
+                return
+
+    def refresh(self, force: bool = False) -> bool:
+        """Refresh if the source tables changed (or the view is too old, or force); True if it refreshed"""
+        with self._lock:
+            return self._refresh(force)
+
+    def _refresh(self, force: bool) -> bool:
+        if self._connection is None or self._connection.closed:
+            self._connection = create_pg_connection()
+            self._connection.autocommit = True
+        with self._connection.cursor() as cursor:
+            cursor.execute(SOURCE_WRITES_QUERY)
+            writes = cursor.fetchone()[0]
+            cursor.execute(f"""
+                SELECT c.relispopulated,
+                    (SELECT max(source_writes) FROM {self.view} WHERE c.relispopulated),
+                    (SELECT extract(epoch FROM now() - max(refreshed_at)) FROM {self.view} WHERE c.relispopulated)
+                FROM pg_class c WHERE c.oid = %s::regclass
+            """, (self.view,))
+            populated, recorded_writes, age = cursor.fetchone()
+            if populated and not force and writes == recorded_writes and age is not None and age < self.max_age:
+                ANALYTICS_REFRESHES.inc(self.view, "skipped")
+                return False
+
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (_REFRESH_LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                # Another worker is refreshing right now
+                ANALYTICS_REFRESHES.inc(self.view, "skipped")
+                return False
+            try:
+                started = time.perf_counter()
+                # Readers keep seeing the previous contents during a concurrent refresh; it needs
+                # the view's unique index and a populated view
+                cursor.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if populated else ''}{self.view}")
+                ANALYTICS_REFRESH_DURATION.set(time.perf_counter() - started, self.view)
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (_REFRESH_LOCK_KEY,))
+        ANALYTICS_REFRESHES.inc(self.view, "refreshed")
+        return True
+
+CHURN_VIEW_REFRESHER = MaterializedViewRefresher("churn_segments")
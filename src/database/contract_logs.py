@@ -0,0 +1,256 @@
+import logging
+import os
+import re
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+from .database import create_pg_connection
+from ..monitoring.metrics import REGISTRY
+
+# contract_logs (written by the billing_update_log trigger) is range-partitioned by month on
+# updated_at (sql/schema_design.sql). The maintainer creates partitions ahead of time, rolls
+# the log up per customer and day into contract_log_daily and retires old partitions
+CONTRACT_LOG_MAINTENANCE_ENABLED = os.getenv("CONTRACT_LOG_MAINTENANCE_ENABLED", "true").lower() == "true"
+# Seconds between maintenance runs
+CONTRACT_LOG_MAINTENANCE_INTERVAL = float(os.getenv("CONTRACT_LOG_MAINTENANCE_INTERVAL", "3600"))
+# Monthly partitions kept created beyond the current month
+CONTRACT_LOG_PARTITIONS_AHEAD = int(os.getenv("CONTRACT_LOG_PARTITIONS_AHEAD", "3"))
+# Whole months of raw log kept before the current one; older partitions are rolled up first,
+# then dropped, or detached (left as standalone tables to archive) with "detach"
+CONTRACT_LOG_RETENTION_MONTHS = int(os.getenv("CONTRACT_LOG_RETENTION_MONTHS", "12"))
+CONTRACT_LOG_RETENTION_ACTION = os.getenv("CONTRACT_LOG_RETENTION_ACTION", "drop").lower()
+
+PARENT_TABLE = "contract_logs"
+DEFAULT_PARTITION = "contract_logs_default"
+PARTITION_NAME = re.compile(r"^contract_logs_p(\d{4})(\d{2})$")
+
+logger = logging.getLogger(__name__)
+
+# Only one worker maintains at a time; the others skip their turn
+_MAINTENANCE_LOCK_KEY = 0x636C6F6773  # "clogs"
+
+# Rollup of [start, end) (day-aligned, so every day is recomputed from all of its rows)
+ROLLUP_QUERY = """
+    INSERT INTO contract_log_daily AS daily
+        (customer_id, day, updates, first_old_total, last_new_total, min_new_total, max_new_total)
+    SELECT customer_id, updated_at::date, count(*),
+        (array_agg(old_total ORDER BY updated_at, log_id))[1],
+        (array_agg(new_total ORDER BY updated_at DESC, log_id DESC))[1],
+        min(new_total), max(new_total)
+    FROM contract_logs
+    WHERE updated_at >= %(start)s AND updated_at < %(end)s AND customer_id IS NOT NULL
+    GROUP BY customer_id, updated_at::date
+    ON CONFLICT (customer_id, day) DO UPDATE SET
+        updates = EXCLUDED.updates, first_old_total = EXCLUDED.first_old_total,
+        last_new_total = EXCLUDED.last_new_total, min_new_total = EXCLUDED.min_new_total,
+        max_new_total = EXCLUDED.max_new_total
+"""
+
+CONTRACT_LOG_MAINTENANCE = REGISTRY.counter(
+    "contract_log_maintenance_total", "Contract log maintenance runs by result (completed, skipped, failed)", ("result",))
+CONTRACT_LOG_PARTITION_CHANGES = REGISTRY.counter(
+    "contract_log_partition_changes_total", "Contract log partitions by action (created, dropped, detached)", ("action",))
+CONTRACT_LOG_DEFAULT_ROWS = REGISTRY.gauge(
+    "contract_log_default_rows", "Rows left in the default contract_logs partition after the last maintenance run")
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before) month's"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"contract_logs_p{month:%Y%m}"
+
+def attached_partitions(cursor) -> Dict[date, str]:
+    """Month -> name of the monthly partitions attached to contract_logs (the default partition left out)"""
+    cursor.execute("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (PARENT_TABLE,))
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def create_partition(cursor, month: date) -> str:
+    """Create the partition of a month, moving its rows out of the default partition first
+
+    PostgreSQL refuses to create a partition while the default one holds rows of its range,
+    so they go through a temporary table in the same transaction.
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE updated_at >= %(start)s AND updated_at < %(end)s)",
+                   bounds)
+    stranded = cursor.fetchone()[0]
+    if stranded:
+        cursor.execute(f"CREATE TEMP TABLE contract_logs_moved (LIKE {PARENT_TABLE}) ON COMMIT DROP")
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE updated_at >= %(start)s AND updated_at < %(end)s RETURNING *
+            )
+            INSERT INTO contract_logs_moved SELECT * FROM moved
+        """, bounds)
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                   f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')")
+    if stranded:
+        cursor.execute(f"INSERT INTO {PARENT_TABLE} SELECT * FROM contract_logs_moved")
+    CONTRACT_LOG_PARTITION_CHANGES.inc("created")
+    return name
+
+def roll_up(cursor, start: date, end: date) -> int:
+    """Recompute the daily rollups of [start, end) one month at a time; returns the days covered"""
+    chunk = start
+    while chunk < end:
+        chunk_end = min(add_months(chunk.replace(day=1), 1), end)
+        cursor.execute(ROLLUP_QUERY, {"start": chunk, "end": chunk_end})
+        chunk = chunk_end
+    return max((end - start).days, 0)
+
+class ContractLogMaintainer:
+    """Background thread keeping the contract_logs partitions ahead, rolled up and within retention
+
+    Each run, on its own connection (no API statement timeouts):
+    1. creates the partitions of the current month and the next `months_ahead`, and of
+       every other month with rows in the default partition (which moves them out);
+    2. recomputes the daily rollups from the latest rolled-up day up to today;
+    3. rolls up, then drops or detaches, partitions older than `retention_months`.
+    Every step commits on its own, so a failure leaves the finished steps in place. Rows
+    still in the default partition at the end (written during the run) are reported in
+    contract_log_default_rows and logged.
+    """
+
+    def __init__(self, interval: float = CONTRACT_LOG_MAINTENANCE_INTERVAL,
+                 months_ahead: int = CONTRACT_LOG_PARTITIONS_AHEAD,
+                 retention_months: int = CONTRACT_LOG_RETENTION_MONTHS,
+                 retention_action: str = CONTRACT_LOG_RETENTION_ACTION):
+        if retention_action not in ("drop", "detach"):
+            raise ValueError(f"Unknown contract log retention action: {retention_action}")
+        self.interval = interval
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.retention_action = retention_action
+        self._connection = None
+        # The background thread and the admin route share the connection
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="contract-log-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.close()
+
+    def close(self):
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+    def _run(self):
+        while True:
+            try:
+                self.maintain()
+            except Exception as e:
+                CONTRACT_LOG_MAINTENANCE.inc("failed")
+                print(f"Contract log maintenance failed: {e}")
+                self.close()
+            if self._stop.wait(self.interval):
+                return
+
+    def maintain(self) -> Dict[str, Any]:
+        """Run one maintenance pass; returns what it did (skipped when another worker is running one)"""
+        with self._lock:
+            return self._maintain()
+
+    def _maintain(self) -> Dict[str, Any]:
+        if self._connection is None or self._connection.closed:
+            self._connection = create_pg_connection()
+        connection = self._connection
+        report = {"skipped": False, "created": [], "rolled_up_days": 0, "retired": [], "default_rows": 0}
+        with connection.cursor() as cursor:
+            # Session-level lock: held across the step commits below
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (_MAINTENANCE_LOCK_KEY,))
+            locked = cursor.fetchone()[0]
+            connection.commit()
+            if not locked:
+                CONTRACT_LOG_MAINTENANCE.inc("skipped")
+                return {**report, "skipped": True}
+            try:
+                self._steps(cursor, report)
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (_MAINTENANCE_LOCK_KEY,))
+                connection.commit()
+        CONTRACT_LOG_MAINTENANCE.inc("completed")
+        return report
+
+    def _steps(self, cursor, report: Dict[str, Any]):
+        connection = self._connection
+        # The database's clock, which is what the trigger stamps updated_at with
+        cursor.execute("SELECT LOCALTIMESTAMP::date")
+        today = cursor.fetchone()[0]
+        current = today.replace(day=1)
+        partitions = attached_partitions(cursor)
+
+        # Months the default partition caught rows of (written while the month had no
+        # partition, or backfilled); past the retention cutoff they are retired below
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', updated_at)::date FROM {DEFAULT_PARTITION}")
+        stranded = [row[0] for row in cursor.fetchall()]
+        upcoming = [add_months(current, offset) for offset in range(self.months_ahead + 1)]
+        for month in sorted(set(upcoming + stranded)):
+            if month not in partitions:
+                partitions[month] = create_partition(cursor, month)
+                connection.commit()
+                report["created"].append(partitions[month])
+
+        # Recompute from the last rolled-up day (it may have been partial), or from the
+        # oldest partition on the first run
+        cursor.execute("SELECT max(day) FROM contract_log_daily")
+        last_day = cursor.fetchone()[0]
+        if last_day is not None:
+            start = min(last_day, today - timedelta(days=1))
+        else:
+            start = min(partitions, default=current)
+        report["rolled_up_days"] = roll_up(cursor, start, today + timedelta(days=1))
+        connection.commit()
+
+        cutoff = add_months(current, -self.retention_months)
+        for month in sorted(month for month in partitions if month < cutoff):
+            name = partitions[month]
+            # Rollups of a retired month are complete whatever the rollup watermark was
+            roll_up(cursor, month, add_months(month, 1))
+            if self.retention_action == "drop":
+                cursor.execute(f"DROP TABLE {name}")
+                CONTRACT_LOG_PARTITION_CHANGES.inc("dropped")
+            else:
+                cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+                CONTRACT_LOG_PARTITION_CHANGES.inc("detached")
+            connection.commit()
+            report["retired"].append(name)
+
+        # Normally empty now; rows here were written while this run was moving their month
+        cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        report["default_rows"] = cursor.fetchone()[0]
+        connection.commit()
+        CONTRACT_LOG_DEFAULT_ROWS.set(report["default_rows"])
+        if report["default_rows"]:
+            logger.warning("%d contract_logs rows left in %s after maintenance", report["default_rows"], DEFAULT_PARTITION)
+
+CONTRACT_LOG_MAINTAINER = ContractLogMaintainer()
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from .database import get_mongo_collection, get_pg_cursor
+
+# Count modes of the list and search routes: none, estimated (planner statistics or
+# collection metadata, constant time) or exact (COUNT(*) / count_documents, cached)
+COUNT_MODES = ("none", "estimated", "exact")
+# Seconds an exact count is reused for the same table/collection and filters
+EXACT_COUNT_TTL = float(os.getenv("EXACT_COUNT_TTL", "30"))
+# Cached exact counts kept per process
+_MAX_CACHED_COUNTS = 1024
+
+# Live tuples scaled to the table's current size, the way the planner does it (reltuples is
+# as of the last VACUUM/ANALYZE); NULL for a table that was never analyzed
+PG_TABLE_ESTIMATE = """
+    SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+        ELSE (c.reltuples / c.relpages * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+    END AS estimate
+    FROM pg_class c WHERE c.oid = %s::regclass
+"""
+
+class ExactCountCache:
+    """Exact counts by key, reused for a TTL; callers racing on an expired key may both count"""
+
+    def __init__(self, ttl: float = EXACT_COUNT_TTL, max_entries: int = _MAX_CACHED_COUNTS):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts: Dict[Hashable, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        count = compute()
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                self._counts = {k: v for k, v in self._counts.items() if v[1] > now}
+                if len(self._counts) >= self.max_entries:
+                    self._counts.clear()
+            self._counts[key] = (count, now + self.ttl)
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+EXACT_COUNTS = ExactCountCache()
+
+def _key(*parts: Any) -> str:
+    return json.dumps(parts, sort_keys=True, default=str)
+
+def _explain_rows(cursor, query: str, params: Optional[Dict[str, Any]]) -> int:
+    """Planner's row estimate for a query (no execution)"""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+    return int(cursor.fetchone()["QUERY PLAN"][0]["Plan"]["Plan Rows"])
+
+def count_pg(query: str, params: Optional[Dict[str, Any]] = None, mode: str = "estimated",
+             table: Optional[str] = None) -> Tuple[int, bool]:
+    """(count, estimated) of the rows a "SELECT 1 FROM ..." query returns
+
+    With table (an unfiltered query over it), the estimate comes from pg_class statistics;
+    otherwise from the planner's estimate for the query.
+    """
+    if mode == "exact":
+        def compute() -> int:
+            with get_pg_cursor() as cursor:
+                cursor.execute(f"SELECT count(*) AS count FROM ({query}) matches", params)
+                return cursor.fetchone()["count"]
+        return EXACT_COUNTS.get(_key("postgresql", query, params), compute), False
+
+    with get_pg_cursor() as cursor:
+        estimate = None
+        if table is not None:
+            cursor.execute(PG_TABLE_ESTIMATE, (table,))
+            estimate = cursor.fetchone()["estimate"]
+        if estimate is None:
+            estimate = _explain_rows(cursor, query, params)
+    return int(estimate), True
+
+def count_mongo(collection_name: str, criteria: Optional[Dict[str, Any]] = None,
+                mode: str = "estimated") -> Tuple[Optional[int], bool]:
+    """(count, estimated) of the documents matching criteria
+
+    estimated_document_count (collection metadata) answers unfiltered estimates. MongoDB has
+    no cheap estimate for a filter, so a filtered estimate is (None, True) rather than a
+    count_documents scan the caller did not ask for.
+    """
+    if mode == "estimated":
+        if criteria:
+            return None, True
+        with get_mongo_collection(collection_name) as collection:
+            return collection.estimated_document_count(), True
+
+    def compute() -> int:
+        with get_mongo_collection(collection_name) as collection:
+            return collection.count_documents(criteria or {})
+    return EXACT_COUNTS.get(_key("mongodb", collection_name, criteria), compute), False
@@ -1,8 +1,106 @@
-from typing import List, Optional, Dict, Any
+import os
+import re
+from typing import List, Optional, Dict, Any, Tuple
 from .database import get_mongo_collection
-from ..models.models import CustomerMongo, ContractMongo, ServiceMongo
-from bson import ObjectId
-import pymongo
+from ..models.models import CustomerMongo, ContractMongo, ServiceMongo, MongoBulkOperation, MongoBulkOperationResult, MongoBulkResult, CustomerSearchFilters, ChurnAnalytics
+from ..monitoring.metrics import instrument_crud
+from .single_flight import coalesce_reads
+from .counts import count_mongo
+from .analytics import MONGO_CHURN_CACHE, churn_pipeline, churn_response
+from .customer_profiles import CUSTOMER_PROFILES_ENABLED, PROFILE_COLLECTION, profile_pipeline, embedded_document, embedded_fields, sync_profile, sync_profiles
+from .raw_bson import ID_AS_STRING, encode_json, encode_json_one, raw_collection, read_pipeline
+
+def _page_criteria(criteria: Dict[str, Any], after: Optional[str]) -> Dict[str, Any]:
+    """Criteria limited to documents after the given _id (range pagination on the _id index)"""
+    if not after:
+        return criteria
+    from bson import ObjectId
+    return {**criteria, "_id": {"$gt": ObjectId(after)}}
+
+def _projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Inclusion projection for the requested fields (_id is always returned, it is the page cursor)"""
+    return {field: 1 for field in fields} if fields else None
+
+# Facet counts of the faceted search: name -> field of the joined customer document
+SEARCH_FACETS = {
+    "contract_type": "$contract.Contract",
+    "payment_method": "$contract.PaymentMethod",
+    "internet_service": "$service.InternetService"
+}
+
+def name_search_query(q: str, mode: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], List[Tuple[str, Any]]]:
+    """Filter, projection and sort of a customer name search
+
+    prefix is an anchored, case-sensitive regex (a range on the customer_name index);
+    substring a case-insensitive regex checked against the index keys in name order;
+    similar a $text search on the customer_name text index (whole words), ranked by textScore.
+    """
+    by_name = [("customer_name", 1), ("_id", 1)]
+    if mode == "prefix":
+        return {"customer_name": {"$regex": "^" + re.escape(q)}}, None, by_name
+    if mode == "substring":
+        return {"customer_name": {"$regex": re.escape(q), "$options": "i"}}, None, by_name
+    if mode == "similar":
+        score = {"$meta": "textScore"}
+        return {"$text": {"$search": q}}, {"score": score}, [("score", score)]
+    raise ValueError(f"Unknown name search mode: {mode}")
+
+def _range(low: Optional[float], high: Optional[float]) -> Optional[Dict[str, float]]:
+    condition = {}
+    if low is not None:
+        condition["$gte"] = low
+    if high is not None:
+        condition["$lte"] = high
+    return condition or None
+
+def _faceted_search_pipeline(filters: CustomerSearchFilters, skip: int, limit: int, after: Optional[str]) -> List[Dict[str, Any]]:
+    """Customers joined with their contract and service, filtered, then counted and paged in one $facet"""
+    customer, contract, service = {}, {}, {}
+    for criteria, field, value in (
+        (customer, "gender", filters.gender),
+        (customer, "SeniorCitizen", filters.senior_citizen),
+        (customer, "Partner", filters.partner),
+        (customer, "Dependents", filters.dependents),
+        (customer, "tenure", _range(filters.tenure_min, filters.tenure_max)),
+        (contract, "Contract", filters.contract_type),
+        (contract, "PaymentMethod", filters.payment_method),
+        (contract, "PaperlessBilling", filters.paperless_billing),
+        (contract, "MonthlyCharges", _range(filters.monthly_charges_min, filters.monthly_charges_max)),
+        (contract, "TotalCharges", _range(filters.total_charges_min, filters.total_charges_max)),
+        (contract, "Churn", filters.churn),
+        (service, "InternetService", filters.internet_service)
+    ):
+        if value is not None:
+            criteria[field] = value
+    
+    pipeline = [{"$match": customer}]
+    for name, collection_name, criteria in (("contract", "contracts", contract), ("service", "services", service)):
+        # Join on customerID with the filters inside the lookup (customerID_search index);
+        # customers whose contract/service does not match drop out before the next join
+        pipeline.append({"$lookup": {
+            "from": collection_name, "localField": "customerID", "foreignField": "customerID",
+            "pipeline": [{"$match": criteria}, {"$limit": 1}, {"$project": {"_id": 0, "customerID": 0}}],
+            "as": name
+        }})
+        if criteria:
+            pipeline.append({"$match": {name: {"$ne": []}}})
+        pipeline.append({"$addFields": {name: {"$arrayElemAt": [f"${name}", 0]}}})
+    
+    results = [{"$sort": {"_id": 1}}]
+    if after:
+        from bson import ObjectId
+        results.insert(0, {"$match": {"_id": {"$gt": ObjectId(after)}}})
+    if skip:
+        results.append({"$skip": skip})
+    results += [{"$limit": limit}, ID_AS_STRING]
+    facets = {"total": [{"$count": "count"}], "results": results}
+    for name, field in SEARCH_FACETS.items():
+        facets[name] = [{"$group": {"_id": field, "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+    pipeline.append({"$facet": facets})
+    return pipeline
+
+# Operations per bulk_write call; larger batches are sent in several unordered chunks
+MONGO_BULK_CHUNK_SIZE = int(os.getenv("MONGO_BULK_CHUNK_SIZE", "1000"))
 
 # MongoDB CRUD Operations
 class MongoCRUD:
@@ -15,7 +113,8 @@ class MongoCRUD:
             customer_dict = customer.dict()
             result = collection.insert_one(customer_dict)
             customer_dict["_id"] = str(result.inserted_id)
-            return customer_dict
+        sync_profiles("create_customer", [customer.customerID])
+        return customer_dict
     
     @staticmethod
     def get_customer_mongo(customer_id: str) -> Optional[Dict[str, Any]]:
@@ -27,19 +126,26 @@ class MongoCRUD:
             return result
     
     @staticmethod
-    def get_customers_mongo(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all customers with pagination"""
+    def get_many_customers_mongo(customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get customers by a list of customerIDs in one query, in request order (None for missing IDs)"""
         with get_mongo_collection("customers") as collection:
-            results = collection.find().skip(skip).limit(limit)
-            customers = []
+            results = collection.find({"customerID": {"$in": list(set(customer_ids))}})
+            found = {}
             for result in results:
                 result["_id"] = str(result["_id"])
-                customers.append(result)
-            return customers
+                found[result["customerID"]] = result
+            return [found.get(customer_id) for customer_id in customer_ids]
+    
+    @staticmethod
+    def get_customers_mongo(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get all customers in _id order with pagination (after: _id of the previous page's last document)"""
+        return MongoCRUD._find("customers", {}, skip, limit, after, fields)
     
     @staticmethod
     def update_customer_mongo(customer_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a customer in MongoDB"""
+        from pymongo import ReturnDocument
         with get_mongo_collection("customers") as collection:
             # Remove None values
             update_data = {k: v for k, v in update_data.items() if v is not None}
@@ -49,18 +155,21 @@ class MongoCRUD:
             result = collection.find_one_and_update(
                 {"customerID": customer_id},
                 {"$set": update_data},
-                return_document=pymongo.ReturnDocument.AFTER
+                return_document=ReturnDocument.AFTER
             )
-            if result:
-                result["_id"] = str(result["_id"])
-            return result
+        if result:
+            result["_id"] = str(result["_id"])
+            sync_profile("update_customer", customer_id, {"$set": update_data})
+        return result
     
     @staticmethod
     def delete_customer_mongo(customer_id: str) -> bool:
         """Delete a customer from MongoDB"""
         with get_mongo_collection("customers") as collection:
-            result = collection.delete_one({"customerID": customer_id})
-            return result.deleted_count > 0
+            deleted = collection.delete_one({"customerID": customer_id}).deleted_count > 0
+        if deleted:
+            sync_profile("delete_customer", customer_id, None)
+        return deleted
     
     # Contract Operations
     @staticmethod
@@ -70,7 +179,8 @@ class MongoCRUD:
             contract_dict = contract.dict()
             result = collection.insert_one(contract_dict)
             contract_dict["_id"] = str(result.inserted_id)
-            return contract_dict
+        sync_profile("create_contract", contract.customerID, {"$set": {"contract": embedded_document(contract_dict)}})
+        return contract_dict
     
     @staticmethod
     def get_contract_mongo(customer_id: str) -> Optional[Dict[str, Any]]:
@@ -82,19 +192,26 @@ class MongoCRUD:
             return result
     
     @staticmethod
-    def get_contracts_mongo(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all contracts with pagination"""
+    def get_many_contracts_mongo(customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get contracts by a list of customerIDs in one query, in request order (None for missing IDs)"""
         with get_mongo_collection("contracts") as collection:
-            results = collection.find().skip(skip).limit(limit)
-            contracts = []
+            results = collection.find({"customerID": {"$in": list(set(customer_ids))}})
+            found = {}
             for result in results:
                 result["_id"] = str(result["_id"])
-                contracts.append(result)
-            return contracts
+                found[result["customerID"]] = result
+            return [found.get(customer_id) for customer_id in customer_ids]
+    
+    @staticmethod
+    def get_contracts_mongo(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get all contracts in _id order with pagination (after: _id of the previous page's last document)"""
+        return MongoCRUD._find("contracts", {}, skip, limit, after, fields)
     
     @staticmethod
     def update_contract_mongo(customer_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a contract in MongoDB"""
+        from pymongo import ReturnDocument
         with get_mongo_collection("contracts") as collection:
             # Remove None values
             update_data = {k: v for k, v in update_data.items() if v is not None}
@@ -104,18 +221,21 @@ class MongoCRUD:
             result = collection.find_one_and_update(
                 {"customerID": customer_id},
                 {"$set": update_data},
-                return_document=pymongo.ReturnDocument.AFTER
+                return_document=ReturnDocument.AFTER
             )
-            if result:
-                result["_id"] = str(result["_id"])
-            return result
+        if result:
+            result["_id"] = str(result["_id"])
+            sync_profile("update_contract", customer_id, {"$set": embedded_fields("contract", update_data)})
+        return result
     
     @staticmethod
     def delete_contract_mongo(customer_id: str) -> bool:
         """Delete a contract from MongoDB"""
         with get_mongo_collection("contracts") as collection:
-            result = collection.delete_one({"customerID": customer_id})
-            return result.deleted_count > 0
+            deleted = collection.delete_one({"customerID": customer_id}).deleted_count > 0
+        if deleted:
+            sync_profile("delete_contract", customer_id, {"$unset": {"contract": ""}})
+        return deleted
     
     # Service Operations
     @staticmethod
@@ -125,7 +245,8 @@ class MongoCRUD:
             service_dict = service.dict()
             result = collection.insert_one(service_dict)
             service_dict["_id"] = str(result.inserted_id)
-            return service_dict
+        sync_profile("create_service", service.customerID, {"$set": {"service": embedded_document(service_dict)}})
+        return service_dict
     
     @staticmethod
     def get_service_mongo(customer_id: str) -> Optional[Dict[str, Any]]:
@@ -137,19 +258,26 @@ class MongoCRUD:
             return result
     
     @staticmethod
-    def get_services_mongo(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all services with pagination"""
+    def get_many_services_mongo(customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get services by a list of customerIDs in one query, in request order (None for missing IDs)"""
         with get_mongo_collection("services") as collection:
-            results = collection.find().skip(skip).limit(limit)
-            services = []
+            results = collection.find({"customerID": {"$in": list(set(customer_ids))}})
+            found = {}
             for result in results:
                 result["_id"] = str(result["_id"])
-                services.append(result)
-            return services
+                found[result["customerID"]] = result
+            return [found.get(customer_id) for customer_id in customer_ids]
+    
+    @staticmethod
+    def get_services_mongo(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get all services in _id order with pagination (after: _id of the previous page's last document)"""
+        return MongoCRUD._find("services", {}, skip, limit, after, fields)
     
     @staticmethod
     def update_service_mongo(customer_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a service in MongoDB"""
+        from pymongo import ReturnDocument
         with get_mongo_collection("services") as collection:
             # Remove None values
             update_data = {k: v for k, v in update_data.items() if v is not None}
@@ -159,18 +287,21 @@ class MongoCRUD:
             result = collection.find_one_and_update(
                 {"customerID": customer_id},
                 {"$set": update_data},
-                return_document=pymongo.ReturnDocument.AFTER
+                return_document=ReturnDocument.AFTER
             )
-            if result:
-                result["_id"] = str(result["_id"])
-            return result
+        if result:
+            result["_id"] = str(result["_id"])
+            sync_profile("update_service", customer_id, {"$set": embedded_fields("service", update_data)})
+        return result
     
     @staticmethod
     def delete_service_mongo(customer_id: str) -> bool:
         """Delete a service from MongoDB"""
         with get_mongo_collection("services") as collection:
-            result = collection.delete_one({"customerID": customer_id})
-            return result.deleted_count > 0
+            deleted = collection.delete_one({"customerID": customer_id}).deleted_count > 0
+        if deleted:
+            sync_profile("delete_service", customer_id, {"$unset": {"service": ""}})
+        return deleted
     
     # Utility Operations
     @staticmethod
@@ -187,12 +318,226 @@ class MongoCRUD:
         }
     
     @staticmethod
-    def search_customers_by_criteria(criteria: Dict[str, Any], skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-        """Search customers by various criteria"""
+    def search_customers_by_criteria(criteria: Dict[str, Any], skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                     fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Search customers by various criteria, in _id order with pagination"""
+        return MongoCRUD._find("customers", criteria, skip, limit, after, fields)
+    
+    @staticmethod
+    def count_documents_mongo(collection_name: str, criteria: Optional[Dict[str, Any]] = None,
+                              mode: str = "estimated") -> Tuple[Optional[int], bool]:
+        """Number of documents matching criteria and whether it is an estimate (None for a filtered estimate; exact counts are cached briefly)"""
+        return count_mongo(collection_name, criteria, mode)
+    
+    @staticmethod
+    def search_customers_by_name(q: str, mode: str = "substring", limit: int = 20) -> List[Dict[str, Any]]:
+        """Search customers by partial name (prefix, substring or text similarity)"""
+        criteria, projection, sort = name_search_query(q, mode)
+        with get_mongo_collection("customers") as collection:
+            documents = []
+            for result in collection.find(criteria, projection).sort(sort).limit(limit):
+                result["_id"] = str(result["_id"])
+                documents.append(result)
+            return documents
+    
+    @staticmethod
+    def get_churn_segments_mongo(dimension: Optional[str] = None) -> ChurnAnalytics:
+        """Churn segments aggregated from the customer profiles, cached for MONGO_ANALYTICS_TTL seconds"""
+        rows, computed_at = MONGO_CHURN_CACHE.get(MongoCRUD._churn_rows)
+        if dimension is not None:
+            rows = [row for row in rows if row["dimension"] == dimension]
+        return ChurnAnalytics(**churn_response(rows, computed_at))
+    
+    @staticmethod
+    def _churn_rows() -> List[Dict[str, Any]]:
+        # Without profile syncing the profiles may be stale, so build them on the fly from the source collections
+        if CUSTOMER_PROFILES_ENABLED:
+            collection_name, pipeline = PROFILE_COLLECTION, churn_pipeline()
+        else:
+            collection_name, pipeline = "customers", profile_pipeline() + churn_pipeline()
+        with get_mongo_collection(collection_name) as collection:
+            # $facet always produces exactly one document
+            result = next(collection.aggregate(pipeline, allowDiskUse=True))
+        return [
+            {"dimension": dimension, "segment": str(segment["_id"]), "contracts": segment["contracts"],
+             "churned": segment["churned"], "avg_monthly_charges": segment["avg_monthly_charges"]}
+            for dimension, segments in result.items() for segment in segments
+        ]
+    
+    @staticmethod
+    def search_customers_faceted(filters: CustomerSearchFilters, skip: int = 0, limit: int = 100,
+                                 after: Optional[str] = None) -> Dict[str, Any]:
+        """Search customers on customer, contract and service fields; total and facet counts come from the same aggregation"""
         with get_mongo_collection("customers") as collection:
-            results = collection.find(criteria).skip(skip).limit(limit)
-            customers = []
+            # $facet always produces exactly one document
+            result = next(collection.aggregate(_faceted_search_pipeline(filters, skip, limit, after)))
+        return {
+            "total": result["total"][0]["count"] if result["total"] else 0,
+            "facets": {
+                name: [{"value": bucket["_id"], "count": bucket["count"]} for bucket in result[name]]
+                for name in SEARCH_FACETS
+            },
+            "results": result["results"]
+        }
+    
+    @staticmethod
+    def _find(collection_name: str, criteria: Dict[str, Any], skip: int = 0, limit: int = 100,
+              after: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with get_mongo_collection(collection_name) as collection:
+            results = collection.find(_page_criteria(criteria, after), _projection(fields)).sort("_id", 1).skip(skip).limit(limit)
+            documents = []
             for result in results:
                 result["_id"] = str(result["_id"])
-                customers.append(result)
-            return customers
+                documents.append(result)
+            return documents
+
+    @staticmethod
+    def get_customer_profile_mongo(customer_id: str) -> Optional[Dict[str, Any]]:
+        """Get a customer with its contract and service embedded from the customer_profiles read model"""
+        with get_mongo_collection(PROFILE_COLLECTION) as collection:
+            result = collection.find_one({"customerID": customer_id})
+            if result:
+                result["_id"] = str(result["_id"])
+            return result
+    
+    # Raw JSON Reads (BSON from the server encoded to JSON bytes without per-document Python work)
+    @staticmethod
+    def get_customer_mongo_json(customer_id: str) -> Optional[bytes]:
+        """Get a customer by customerID as JSON bytes"""
+        return MongoCRUD._find_one_json("customers", {"customerID": customer_id})
+    
+    @staticmethod
+    def get_customer_profile_mongo_json(customer_id: str) -> Optional[bytes]:
+        """Get a customer profile (contract and service embedded) as JSON bytes"""
+        return MongoCRUD._find_one_json(PROFILE_COLLECTION, {"customerID": customer_id})
+    
+    @staticmethod
+    def get_customers_mongo_json(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> bytes:
+        """Get all customers in _id order with pagination as a JSON array"""
+        return MongoCRUD._find_json("customers", {}, skip, limit, after, fields)
+    
+    @staticmethod
+    def get_contract_mongo_json(customer_id: str) -> Optional[bytes]:
+        """Get a contract by customerID as JSON bytes"""
+        return MongoCRUD._find_one_json("contracts", {"customerID": customer_id})
+    
+    @staticmethod
+    def get_contracts_mongo_json(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> bytes:
+        """Get all contracts in _id order with pagination as a JSON array"""
+        return MongoCRUD._find_json("contracts", {}, skip, limit, after, fields)
+    
+    @staticmethod
+    def get_service_mongo_json(customer_id: str) -> Optional[bytes]:
+        """Get a service by customerID as JSON bytes"""
+        return MongoCRUD._find_one_json("services", {"customerID": customer_id})
+    
+    @staticmethod
+    def get_services_mongo_json(skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                            fields: Optional[List[str]] = None) -> bytes:
+        """Get all services in _id order with pagination as a JSON array"""
+        return MongoCRUD._find_json("services", {}, skip, limit, after, fields)
+    
+    @staticmethod
+    def search_customers_by_criteria_json(criteria: Dict[str, Any], skip: int = 0, limit: int = 100, after: Optional[str] = None,
+                                          fields: Optional[List[str]] = None) -> bytes:
+        """Search customers by various criteria, in _id order with pagination, as a JSON array"""
+        return MongoCRUD._find_json("customers", criteria, skip, limit, after, fields)
+    
+    @staticmethod
+    def _find_json(collection_name: str, criteria: Dict[str, Any], skip: int = 0, limit: Optional[int] = None,
+                   after: Optional[str] = None, fields: Optional[List[str]] = None) -> bytes:
+        pipeline = read_pipeline(_page_criteria(criteria, after), skip, limit, sort_by_id=True, projection=_projection(fields))
+        with get_mongo_collection(collection_name) as collection:
+            return encode_json(list(raw_collection(collection).aggregate(pipeline)))
+    
+    @staticmethod
+    def _find_one_json(collection_name: str, criteria: Dict[str, Any]) -> Optional[bytes]:
+        with get_mongo_collection(collection_name) as collection:
+            documents = list(raw_collection(collection).aggregate(read_pipeline(criteria, limit=1)))
+            return encode_json_one(documents[0]) if documents else None
+    
+    # Bulk Operations
+    @staticmethod
+    def bulk_write_customers_mongo(operations: List[MongoBulkOperation]) -> MongoBulkResult:
+        """Run mixed customer inserts, updates and deletes as chunked unordered bulk writes"""
+        return MongoCRUD._bulk_write("customers", CustomerMongo, operations)
+    
+    @staticmethod
+    def bulk_write_contracts_mongo(operations: List[MongoBulkOperation]) -> MongoBulkResult:
+        """Run mixed contract inserts, updates and deletes as chunked unordered bulk writes"""
+        return MongoCRUD._bulk_write("contracts", ContractMongo, operations)
+    
+    @staticmethod
+    def bulk_write_services_mongo(operations: List[MongoBulkOperation]) -> MongoBulkResult:
+        """Run mixed service inserts, updates and deletes as chunked unordered bulk writes"""
+        return MongoCRUD._bulk_write("services", ServiceMongo, operations)
+    
+    @staticmethod
+    def _bulk_write(collection_name: str, model, operations: List[MongoBulkOperation]) -> MongoBulkResult:
+        """Validate every operation up front, then send them in chunks; failed operations do not stop the rest"""
+        from pymongo.errors import BulkWriteError
+        summary = MongoBulkResult(results=[
+            MongoBulkOperationResult(index=index, op=operation.op, ok=True)
+            for index, operation in enumerate(operations)
+        ])
+        requests = [MongoCRUD._bulk_request(model, operation, result) for operation, result in zip(operations, summary.results)]
+        with get_mongo_collection(collection_name) as collection:
+            for start in range(0, len(requests), MONGO_BULK_CHUNK_SIZE):
+                try:
+                    raw = collection.bulk_write(requests[start:start + MONGO_BULK_CHUNK_SIZE], ordered=False).bulk_api_result
+                except BulkWriteError as e:
+                    raw = e.details
+                summary.inserted_count += raw.get("nInserted", 0)
+                summary.matched_count += raw.get("nMatched", 0)
+                summary.modified_count += raw.get("nModified", 0)
+                summary.deleted_count += raw.get("nRemoved", 0)
+                summary.upserted_count += raw.get("nUpserted", 0)
+                for upserted in raw.get("upserted", []):
+                    index = start + upserted["index"]
+                    summary.upserted_ids[index] = summary.results[index].id = str(upserted["_id"])
+                for error in raw.get("writeErrors", []):
+                    result = summary.results[start + error["index"]]
+                    result.ok = False
+                    result.id = None
+                    result.error = error.get("errmsg")
+        summary.error_count = sum(not result.ok for result in summary.results)
+        sync_profiles("bulk_write", [
+            operation.document["customerID"] if operation.op == "insert" else operation.customerID
+            for operation, result in zip(operations, summary.results) if result.ok
+        ])
+        return summary
+    
+    @staticmethod
+    def _bulk_request(model, operation: MongoBulkOperation, result: MongoBulkOperationResult):
+        """pymongo write model for one operation; raises ValueError naming the operation when it is invalid"""
+        from bson import ObjectId
+        from pymongo import DeleteOne, InsertOne, UpdateOne
+        index = result.index
+        if operation.op == "insert":
+            if not operation.document:
+                raise ValueError(f"Operation {index}: insert needs a document")
+            try:
+                document = model(**operation.document).dict()
+            except ValueError as e:
+                raise ValueError(f"Operation {index}: {e}")
+            # Assigned here so the response can report it without reading the document back
+            document["_id"] = ObjectId()
+            result.id = str(document["_id"])
+            return InsertOne(document)
+        if not operation.customerID:
+            raise ValueError(f"Operation {index}: {operation.op} needs a customerID")
+        if operation.op == "delete":
+            return DeleteOne({"customerID": operation.customerID})
+        # Remove None values
+        update_data = {k: v for k, v in (operation.document or {}).items() if v is not None}
+        if not update_data:
+            raise ValueError(f"Operation {index}: update needs at least one field to set")
+        return UpdateOne({"customerID": operation.customerID}, {"$set": update_data}, upsert=operation.upsert)
+
+# Record per-method database time
+instrument_crud(MongoCRUD, "mongodb")
+
+# Share identical concurrent reads (applied last so shared calls skip the timing above)
+coalesce_reads(MongoCRUD, "mongodb")
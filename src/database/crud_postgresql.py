@@ -1,6 +1,219 @@
-from typing import List, Optional
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from .analytics import churn_response
+from .counts import count_pg
 from .database import get_pg_cursor
-from ..models.models import Customer, CustomerCreate, CustomerUpdate, Contract, ContractCreate, ContractUpdate, Service, ServiceCreate, ServiceUpdate
+from ..models.models import Customer, CustomerCreate, CustomerUpdate, Contract, ContractCreate, ContractUpdate, Service, ServiceCreate, ServiceUpdate, CustomerComplete, CustomerCompleteCreate, CustomerSearchFilters, CustomerSearchHit, CustomerSearchPage, CustomerNameMatch, ChurnAnalytics, ContractLog, ContractLogDaily
+from ..monitoring.metrics import instrument_crud
+from .single_flight import coalesce_reads
+
+# Customer with its contracts and services aggregated as JSON arrays, in one round trip
+CUSTOMER_COMPLETE_QUERY = """
+    SELECT c.*,
+        COALESCE((SELECT json_agg(ct ORDER BY ct.contract_id) FROM contracts ct WHERE ct.customer_id = c.customer_id), '[]') AS contracts,
+        COALESCE((SELECT json_agg(s ORDER BY s.service_id) FROM services s WHERE s.customer_id = c.customer_id), '[]') AS services
+    FROM customers c
+    WHERE c.customer_id = ANY(%s)
+"""
+
+# Customer, contract and service rows inserted together with data-modifying CTEs.
+# Customer IDs are drawn from the sequence up front so the contract and service
+# inserts can reference them within the same statement.
+CUSTOMER_COMPLETE_INSERT = """
+    WITH input AS (
+        SELECT nextval(pg_get_serial_sequence('customers', 'customer_id')) AS customer_id, r.*
+        FROM jsonb_to_recordset(%s::jsonb) AS r(
+            ord INT, customer_name VARCHAR, gender VARCHAR, senior_citizen BOOLEAN, partner BOOLEAN,
+            dependents BOOLEAN, tenure INT, phone_service BOOLEAN,
+            contract_type VARCHAR, paperless_billing BOOLEAN, payment_method VARCHAR,
+            monthly_charges NUMERIC, total_charges NUMERIC, churn BOOLEAN,
+            internet_service VARCHAR, online_security VARCHAR, online_backup VARCHAR, device_protection VARCHAR,
+            tech_support VARCHAR, streaming_tv VARCHAR, streaming_movies VARCHAR
+        )
+    ),
+    new_customers AS (
+        INSERT INTO customers (customer_id, customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service)
+        SELECT customer_id, customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service FROM input
+        RETURNING *
+    ),
+    new_contracts AS (
+        INSERT INTO contracts (customer_id, contract_type, paperless_billing, payment_method, monthly_charges, total_charges, churn)
+        SELECT customer_id, contract_type, paperless_billing, payment_method, monthly_charges, total_charges, churn FROM input
+        RETURNING *
+    ),
+    new_services AS (
+        INSERT INTO services (customer_id, internet_service, online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies)
+        SELECT customer_id, internet_service, online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies FROM input
+        RETURNING *
+    )
+    SELECT c.*,
+        COALESCE((SELECT json_agg(ct) FROM new_contracts ct WHERE ct.customer_id = c.customer_id), '[]') AS contracts,
+        COALESCE((SELECT json_agg(s) FROM new_services s WHERE s.customer_id = c.customer_id), '[]') AS services
+    FROM new_customers c
+    JOIN input i ON i.customer_id = c.customer_id
+    ORDER BY i.ord
+"""
+
+# Contracts joined with their customer and first (matching) service. Filters, sort and keyset
+# condition are filled in by build_search_query; all values are bound parameters
+CUSTOMER_SEARCH_FROM = """
+    FROM contracts ct
+    JOIN customers c ON c.customer_id = ct.customer_id
+    {service_join}
+    WHERE {where}
+"""
+SEARCH_SERVICE_JOIN = """{join} LATERAL (
+        SELECT internet_service FROM services
+        WHERE services.customer_id = ct.customer_id{service_filter}
+        ORDER BY service_id LIMIT 1
+    ) s ON TRUE"""
+CUSTOMER_SEARCH_QUERY = """
+    SELECT c.*, ct.contract_id, ct.contract_type, ct.payment_method, ct.paperless_billing,
+        ct.monthly_charges, ct.total_charges, ct.churn, s.internet_service""" + CUSTOMER_SEARCH_FROM + """    ORDER BY {order}
+    LIMIT %(limit)s
+"""
+
+# Search sort keys -> column. Every sort ends with contract_id, so (sort value, contract_id)
+# identifies a row and serves as the keyset cursor
+SEARCH_SORTS = {
+    "contract_id": "ct.contract_id",
+    "tenure": "c.tenure",
+    "monthly_charges": "ct.monthly_charges",
+    "total_charges": "ct.total_charges"
+}
+
+# Search filters: (column, operator, CustomerSearchFilters field)
+SEARCH_FILTERS = (
+    ("c.gender", "=", "gender"),
+    ("c.senior_citizen", "=", "senior_citizen"),
+    ("c.partner", "=", "partner"),
+    ("c.dependents", "=", "dependents"),
+    ("c.tenure", ">=", "tenure_min"),
+    ("c.tenure", "<=", "tenure_max"),
+    ("ct.contract_type", "=", "contract_type"),
+    ("ct.payment_method", "=", "payment_method"),
+    ("ct.paperless_billing", "=", "paperless_billing"),
+    ("ct.monthly_charges", ">=", "monthly_charges_min"),
+    ("ct.monthly_charges", "<=", "monthly_charges_max"),
+    ("ct.total_charges", ">=", "total_charges_min"),
+    ("ct.total_charges", "<=", "total_charges_max"),
+    ("ct.churn", "=", "churn")
+)
+
+def encode_search_cursor(sort: str, descending: bool, value: Any, contract_id: int) -> str:
+    """Opaque keyset cursor for the row after which the next page starts"""
+    payload = json.dumps([("-" if descending else "") + sort, value, contract_id], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_search_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+    """(sort value, contract_id) of a cursor; ValueError if malformed or made for another sort"""
+    try:
+        cursor_sort, value, contract_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid search cursor")
+    if cursor_sort != ("-" if descending else "") + sort or not isinstance(contract_id, int):
+        raise ValueError("Search cursor does not belong to this sort order")
+    return value, contract_id
+
+def _search_conditions(filters: CustomerSearchFilters, params: Dict[str, Any]) -> List[str]:
+    """WHERE conditions of the search filters (values added to params)"""
+    conditions = []
+    for filter_column, operator, name in SEARCH_FILTERS:
+        value = getattr(filters, name)
+        if value is not None:
+            conditions.append(f"{filter_column} {operator} %({name})s")
+            params[name] = value
+    return conditions
+
+def _search_service_join(filters: CustomerSearchFilters, params: Dict[str, Any], select_service: bool = True) -> str:
+    """Join to the customer's first (matching) service; left out when neither filtered nor selected"""
+    if filters.internet_service is None:
+        return SEARCH_SERVICE_JOIN.format(join="LEFT JOIN", service_filter="") if select_service else ""
+    # Internet service filter turns the lateral join into an inner join (customers without a matching service drop out)
+    params["internet_service"] = filters.internet_service
+    return SEARCH_SERVICE_JOIN.format(join="JOIN", service_filter=" AND internet_service = %(internet_service)s")
+
+def build_search_query(filters: CustomerSearchFilters, sort: str = "contract_id", descending: bool = False,
+                       limit: int = 100, after: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """Parameterized customer search: SQL and its parameters
+
+    Rows whose sort value is NULL are left out when sorting by that column (keyset
+    comparisons cannot step over NULLs).
+    """
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    column = SEARCH_SORTS[sort]
+    params: Dict[str, Any] = {"limit": limit}
+    conditions = _search_conditions(filters, params)
+    if column != "ct.contract_id":
+        conditions.append(f"{column} IS NOT NULL")
+    
+    direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+    if after:
+        value, params["after_id"] = decode_search_cursor(after, sort, descending)
+        if column == "ct.contract_id":
+            conditions.append(f"ct.contract_id {comparison} %(after_id)s")
+        else:
+            params["after_value"] = value
+            conditions.append(f"({column}, ct.contract_id) {comparison} (%(after_value)s, %(after_id)s)")
+    
+    order = f"ct.contract_id {direction}" if column == "ct.contract_id" else f"{column} {direction}, ct.contract_id {direction}"
+    query = CUSTOMER_SEARCH_QUERY.format(
+        service_join=_search_service_join(filters, params),
+        where=" AND ".join(conditions) or "TRUE", order=order
+    )
+    return query, params
+
+def build_search_count_query(filters: CustomerSearchFilters) -> Tuple[str, Dict[str, Any]]:
+    """Rows of every page of a search ("SELECT 1 FROM ..."), for counting: SQL and its parameters"""
+    params: Dict[str, Any] = {}
+    conditions = _search_conditions(filters, params)
+    query = "SELECT 1" + CUSTOMER_SEARCH_FROM.format(
+        service_join=_search_service_join(filters, params, select_service=False),
+        where=" AND ".join(conditions) or "TRUE"
+    )
+    return query, params
+
+# Customer name search. prefix walks the lower(customer_name) btree (C collation, so LIKE
+# prefixes are index ranges) in name order and stops at the limit; substring and similar
+# use the trigram GIN index and rank all matches by similarity
+NAME_SEARCH_QUERIES = {
+    "prefix": """
+        SELECT *, similarity(customer_name, %(q)s) AS score
+        FROM customers
+        WHERE lower(customer_name) COLLATE "C" LIKE lower(%(pattern)s)
+        ORDER BY lower(customer_name) COLLATE "C", customer_id
+        LIMIT %(limit)s
+    """,
+    "substring": """
+        SELECT *, similarity(customer_name, %(q)s) AS score
+        FROM customers
+        WHERE customer_name ILIKE %(pattern)s
+        ORDER BY score DESC, customer_id
+        LIMIT %(limit)s
+    """,
+    "similar": """
+        SELECT *, similarity(customer_name, %(q)s) AS score
+        FROM customers
+        WHERE customer_name %% %(q)s
+        ORDER BY score DESC, customer_id
+        LIMIT %(limit)s
+    """
+}
+
+def _like_escape(text: str) -> str:
+    """Text matched literally inside a LIKE pattern (backslash is the default escape)"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def build_name_search_query(q: str, mode: str = "substring", limit: int = 20) -> Tuple[str, Dict[str, Any]]:
+    """Parameterized customer name search: SQL and its parameters"""
+    if mode not in NAME_SEARCH_QUERIES:
+        raise ValueError(f"Unknown name search mode: {mode}")
+    pattern = _like_escape(q) + "%"
+    if mode == "substring":
+        pattern = "%" + pattern
+    return NAME_SEARCH_QUERIES[mode], {"q": q, "pattern": pattern, "limit": limit}
 
 # Customer CRUD Operations
 class CustomerCRUD:
@@ -17,6 +230,26 @@ class CustomerCRUD:
             result = cursor.fetchone()
             return Customer(**result)
     
+    @staticmethod
+    def create_customer_complete(customer: CustomerCompleteCreate) -> CustomerComplete:
+        """Create a customer with its contract and service in one statement and transaction"""
+        return CustomerCRUD.create_many_customers_complete([customer])[0]
+    
+    @staticmethod
+    def create_many_customers_complete(customers: List[CustomerCompleteCreate]) -> List[CustomerComplete]:
+        """Create many customers with their contracts and services in one statement and transaction"""
+        rows = []
+        for position, customer in enumerate(customers):
+            row = customer.dict(exclude={"contract", "service"})
+            row.update(customer.contract.dict())
+            row.update(customer.service.dict())
+            row["ord"] = position
+            rows.append(row)
+        
+        with get_pg_cursor() as cursor:
+            cursor.execute(CUSTOMER_COMPLETE_INSERT, (json.dumps(rows),))
+            return [CustomerComplete(**row) for row in cursor.fetchall()]
+    
     @staticmethod
     def get_customer(customer_id: int) -> Optional[Customer]:
         """Get a customer by ID"""
@@ -25,6 +258,27 @@ class CustomerCRUD:
             result = cursor.fetchone()
             return Customer(**result) if result else None
     
+    @staticmethod
+    def get_many_customers(customer_ids: List[int]) -> List[Optional[Customer]]:
+        """Get customers by a list of IDs in one query, in request order (None for missing IDs)"""
+        with get_pg_cursor() as cursor:
+            cursor.execute("SELECT * FROM customers WHERE customer_id = ANY(%s)", (list(set(customer_ids)),))
+            found = {row["customer_id"]: Customer(**row) for row in cursor.fetchall()}
+            return [found.get(customer_id) for customer_id in customer_ids]
+    
+    @staticmethod
+    def get_customer_complete(customer_id: int) -> Optional[CustomerComplete]:
+        """Get a customer with its contracts and services in one query"""
+        return CustomerCRUD.get_many_customers_complete([customer_id])[0]
+    
+    @staticmethod
+    def get_many_customers_complete(customer_ids: List[int]) -> List[Optional[CustomerComplete]]:
+        """Get many customers with their contracts and services in one query, in request order"""
+        with get_pg_cursor() as cursor:
+            cursor.execute(CUSTOMER_COMPLETE_QUERY, (list(set(customer_ids)),))
+            found = {row["customer_id"]: CustomerComplete(**row) for row in cursor.fetchall()}
+            return [found.get(customer_id) for customer_id in customer_ids]
+    
     @staticmethod
     def get_customers(skip: int = 0, limit: int = 100) -> List[Customer]:
         """Get all customers with pagination"""
@@ -33,6 +287,45 @@ class CustomerCRUD:
             results = cursor.fetchall()
             return [Customer(**row) for row in results]
     
+    @staticmethod
+    def count_customers(mode: str = "estimated") -> Tuple[int, bool]:
+        """Number of customers and whether it is a planner estimate (exact counts are cached briefly)"""
+        return count_pg("SELECT 1 FROM customers", mode=mode, table="customers")
+    
+    @staticmethod
+    def count_search_customers(filters: CustomerSearchFilters, mode: str = "estimated") -> Tuple[int, bool]:
+        """Number of search hits over all pages and whether it is a planner estimate"""
+        query, params = build_search_count_query(filters)
+        return count_pg(query, params, mode=mode)
+    
+    @staticmethod
+    def search_customers(filters: CustomerSearchFilters, sort: str = "contract_id", descending: bool = False,
+                         limit: int = 100, after: Optional[str] = None) -> CustomerSearchPage:
+        """Search contracts with their customers by customer, contract and service fields, keyset-paginated"""
+        query, params = build_search_query(filters, sort=sort, descending=descending, limit=limit, after=after)
+        with get_pg_cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        next_cursor = None
+        if len(rows) == limit:
+            # Cursor keeps the database value (Decimal as its exact string) so the next page compares as NUMERIC
+            last = rows[-1]
+            next_cursor = encode_search_cursor(sort, descending, last[sort], last["contract_id"])
+        return CustomerSearchPage(results=[CustomerSearchHit(**row) for row in rows], next_cursor=next_cursor)
+    
+    @staticmethod
+    def search_customers_by_name(q: str, mode: str = "substring", limit: int = 20,
+                                 threshold: float = 0.3) -> List[CustomerNameMatch]:
+        """Search customers by partial name (prefix, substring or trigram similarity above threshold)"""
+        query, params = build_name_search_query(q, mode=mode, limit=limit)
+        with get_pg_cursor() as cursor:
+            if mode == "similar":
+                # Threshold of the % operator for this transaction only
+                cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(threshold),))
+            cursor.execute(query, params)
+            return [CustomerNameMatch(**row) for row in cursor.fetchall()]
+    
     @staticmethod
     def update_customer(customer_id: int, customer_update: CustomerUpdate) -> Optional[Customer]:
         """Update a customer"""
@@ -82,6 +375,14 @@ class ContractCRUD:
             result = cursor.fetchone()
             return Contract(**result) if result else None
     
+    @staticmethod
+    def get_many_contracts(contract_ids: List[int]) -> List[Optional[Contract]]:
+        """Get contracts by a list of IDs in one query, in request order (None for missing IDs)"""
+        with get_pg_cursor() as cursor:
+            cursor.execute("SELECT * FROM contracts WHERE contract_id = ANY(%s)", (list(set(contract_ids)),))
+            found = {row["contract_id"]: Contract(**row) for row in cursor.fetchall()}
+            return [found.get(contract_id) for contract_id in contract_ids]
+    
     @staticmethod
     def get_contracts(skip: int = 0, limit: int = 100) -> List[Contract]:
         """Get all contracts with pagination"""
@@ -90,6 +391,11 @@ class ContractCRUD:
             results = cursor.fetchall()
             return [Contract(**row) for row in results]
     
+    @staticmethod
+    def count_contracts(mode: str = "estimated") -> Tuple[int, bool]:
+        """Number of contracts and whether it is a planner estimate (exact counts are cached briefly)"""
+        return count_pg("SELECT 1 FROM contracts", mode=mode, table="contracts")
+    
     @staticmethod
     def get_contracts_by_customer(customer_id: int) -> List[Contract]:
         """Get contracts by customer ID"""
@@ -147,6 +453,14 @@ class ServiceCRUD:
             result = cursor.fetchone()
             return Service(**result) if result else None
     
+    @staticmethod
+    def get_many_services(service_ids: List[int]) -> List[Optional[Service]]:
+        """Get services by a list of IDs in one query, in request order (None for missing IDs)"""
+        with get_pg_cursor() as cursor:
+            cursor.execute("SELECT * FROM services WHERE service_id = ANY(%s)", (list(set(service_ids)),))
+            found = {row["service_id"]: Service(**row) for row in cursor.fetchall()}
+            return [found.get(service_id) for service_id in service_ids]
+    
     @staticmethod
     def get_services(skip: int = 0, limit: int = 100) -> List[Service]:
         """Get all services with pagination"""
@@ -155,6 +469,11 @@ class ServiceCRUD:
             results = cursor.fetchall()
             return [Service(**row) for row in results]
     
+    @staticmethod
+    def count_services(mode: str = "estimated") -> Tuple[int, bool]:
+        """Number of services and whether it is a planner estimate (exact counts are cached briefly)"""
+        return count_pg("SELECT 1 FROM services", mode=mode, table="services")
+    
     @staticmethod
     def get_services_by_customer(customer_id: int) -> List[Service]:
         """Get services by customer ID"""
@@ -188,3 +507,65 @@ class ServiceCRUD:
         with get_pg_cursor() as cursor:
             cursor.execute("DELETE FROM services WHERE service_id = %s", (service_id,))
             return cursor.rowcount > 0
+
+# Analytics (pre-aggregated in materialized views)
+class AnalyticsCRUD:
+    
+    @staticmethod
+    def get_churn_segments(dimension: Optional[str] = None) -> ChurnAnalytics:
+        """Churn segments from the churn_segments materialized view (all dimensions, or one)"""
+        with get_pg_cursor() as cursor:
+            cursor.execute("""
+                SELECT dimension, segment, contracts, churned, avg_monthly_charges, refreshed_at
+                FROM churn_segments
+                WHERE %(dimension)s::text IS NULL OR dimension = %(dimension)s
+                ORDER BY dimension, segment
+            """, {"dimension": dimension})
+            rows = cursor.fetchall()
+        refreshed_at = max((row["refreshed_at"] for row in rows), default=None)
+        return ChurnAnalytics(**churn_response(rows, refreshed_at))
+
+class ContractLogCRUD:
+    
+    @staticmethod
+    def get_contract_logs(customer_id: int, days: int = 30, limit: int = 100) -> List[ContractLog]:
+        """Billing changes of a customer over the last `days` days, newest first
+
+        The cutoff is a stable expression, so partitions older than it are pruned when the
+        query starts and only the recent partitions' customer index is read.
+        """
+        with get_pg_cursor() as cursor:
+            cursor.execute("""
+                SELECT log_id, customer_id, old_total, new_total, updated_at
+                FROM contract_logs
+                WHERE customer_id = %(customer_id)s AND updated_at >= LOCALTIMESTAMP - make_interval(days => %(days)s)
+                ORDER BY updated_at DESC
+                LIMIT %(limit)s
+            """, {"customer_id": customer_id, "days": days, "limit": limit})
+            return [ContractLog(**row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_contract_log_rollups(customer_id: int, days: int = 365) -> List[ContractLogDaily]:
+        """Daily billing change summaries of a customer (kept after the raw log is dropped), newest first"""
+        with get_pg_cursor() as cursor:
+            cursor.execute("""
+                SELECT customer_id, day, updates, first_old_total, last_new_total, min_new_total, max_new_total
+                FROM contract_log_daily
+                WHERE customer_id = %(customer_id)s AND day >= CURRENT_DATE - %(days)s
+                ORDER BY day DESC
+            """, {"customer_id": customer_id, "days": days})
+            return [ContractLogDaily(**row) for row in cursor.fetchall()]
+
+# Record per-method database time
+instrument_crud(CustomerCRUD, "postgresql")
+instrument_crud(ContractCRUD, "postgresql")
+instrument_crud(ServiceCRUD, "postgresql")
+instrument_crud(AnalyticsCRUD, "postgresql")
+instrument_crud(ContractLogCRUD, "postgresql")
+
+# Share identical concurrent reads (applied last so shared calls skip the timing above)
+coalesce_reads(CustomerCRUD, "postgresql")
+coalesce_reads(ContractCRUD, "postgresql")
+coalesce_reads(ServiceCRUD, "postgresql")
+coalesce_reads(AnalyticsCRUD, "postgresql")
+coalesce_reads(ContractLogCRUD, "postgresql")
@@ -0,0 +1,202 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from .database import get_mongo_collection
+from .deadline import DeadlineExceeded
+from ..monitoring.metrics import REGISTRY
+
+# MongoCRUD writes keep the profiles in sync by default; set CUSTOMER_PROFILES_ENABLED=false to stop
+CUSTOMER_PROFILES_ENABLED = os.getenv("CUSTOMER_PROFILES_ENABLED", "true").lower() == "true"
+
+# One document per customer: the customer's fields, with its contract and service embedded
+PROFILE_COLLECTION = "customer_profiles"
+# customerIDs per rebuild round trip
+REBUILD_BATCH_SIZE = 1000
+# customerIDs whose failed sync is kept for a retry; beyond this only the verifier repairs them
+PROFILE_RETRY_MAX = int(os.getenv("PROFILE_RETRY_MAX", "10000"))
+
+logger = logging.getLogger(__name__)
+
+# Last stage of a rebuild: upsert the computed profiles (needs the unique customerID index)
+MERGE_INTO_PROFILES = {"$merge": {
+    "into": PROFILE_COLLECTION, "on": "customerID", "whenMatched": "replace", "whenNotMatched": "insert"
+}}
+
+PROFILE_SYNC_ERRORS = REGISTRY.counter(
+    "customer_profile_sync_errors_total",
+    "Customer profile updates that failed after the source write succeeded (repair with the verifier)",
+    ("operation",))
+PROFILE_SYNC_PENDING = REGISTRY.gauge(
+    "customer_profile_sync_pending", "Customers whose profile sync failed and waits for a retry in this process")
+PROFILE_REPAIRS = REGISTRY.counter(
+    "customer_profile_repairs_total", "Profiles rebuilt after a failed sync (retry) or for drift (verifier)",
+    ("source",))
+
+# Failed syncs, rebuilt by the next sync that succeeds (or the verifier's repair)
+_pending = set()
+_pending_lock = threading.Lock()
+
+def profile_pipeline(customer_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Aggregation over customers producing the expected profile of each (all customers without ids)"""
+    pipeline = [{"$match": {"customerID": {"$in": customer_ids}}}] if customer_ids is not None else []
+    for name, collection_name in (("contract", "contracts"), ("service", "services")):
+        pipeline.append({"$lookup": {
+            "from": collection_name, "localField": "customerID", "foreignField": "customerID",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 0, "customerID": 0}}],
+            "as": name
+        }})
+        # Missing contract/service leaves the field out
+        pipeline.append({"$addFields": {name: {"$arrayElemAt": [f"${name}", 0]}}})
+    pipeline.append({"$project": {"_id": 0}})
+    return pipeline
+
+def rebuild_profiles(customer_ids: Optional[Iterable[str]] = None) -> None:
+    """Recompute profiles on the server ($merge on customerID) and drop profiles of deleted customers
+
+    Without customer_ids every profile is rebuilt (setup script, verifier repair).
+    """
+    batches = [None] if customer_ids is None else _batches(list(set(customer_ids)))
+    for batch in batches:
+        with get_mongo_collection("customers") as customers:
+            customers.aggregate(profile_pipeline(batch) + [MERGE_INTO_PROFILES])
+        with get_mongo_collection(PROFILE_COLLECTION) as profiles:
+            orphans = [profile["_id"] for profile in profiles.aggregate(_orphan_pipeline(batch))]
+            if orphans:
+                profiles.delete_many({"_id": {"$in": orphans}})
+
+def _batches(customer_ids: List[str]) -> List[List[str]]:
+    return [customer_ids[start:start + REBUILD_BATCH_SIZE] for start in range(0, len(customer_ids), REBUILD_BATCH_SIZE)]
+
+def _orphan_pipeline(customer_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Profiles whose customer no longer exists"""
+    pipeline = [{"$match": {"customerID": {"$in": customer_ids}}}] if customer_ids is not None else []
+    return pipeline + [
+        {"$lookup": {
+            "from": "customers", "localField": "customerID", "foreignField": "customerID",
+            "pipeline": [{"$limit": 1}, {"$project": {"_id": 1}}], "as": "customer"
+        }},
+        {"$match": {"customer": []}},
+        {"$project": {"_id": 1}}
+    ]
+
+# Called by MongoCRUD after a successful write to the source collections; failures are
+# logged, counted and queued for a retry, not raised (the source write stands)
+def sync_profile(operation: str, customer_id: str, update: Optional[Dict[str, Any]] = None):
+    """Targeted update of one profile (update None deletes it)"""
+    if not CUSTOMER_PROFILES_ENABLED:
+        return
+    from pymongo.errors import PyMongoError
+    try:
+        with get_mongo_collection(PROFILE_COLLECTION) as profiles:
+            if update is None:
+                profiles.delete_one({"customerID": customer_id})
+            else:
+                profiles.update_one({"customerID": customer_id}, update)
+    except (PyMongoError, DeadlineExceeded) as e:
+        _sync_failed(operation, [customer_id], e)
+        return
+    _retry_pending()
+
+def sync_profiles(operation: str, customer_ids: Iterable[str]):
+    """Rebuild whole profiles (new customers, which may already have a contract/service, and bulk writes)"""
+    if not CUSTOMER_PROFILES_ENABLED:
+        return
+    from pymongo.errors import PyMongoError
+    customer_ids = list(customer_ids)
+    try:
+        rebuild_profiles(customer_ids)
+    except (PyMongoError, DeadlineExceeded) as e:
+        _sync_failed(operation, customer_ids, e)
+        return
+    _retry_pending()
+
+def pending_profiles() -> List[str]:
+    """customerIDs whose profile sync failed and has not been retried yet"""
+    with _pending_lock:
+        return sorted(_pending)
+
+def _sync_failed(operation: str, customer_ids: List[str], error: Exception):
+    PROFILE_SYNC_ERRORS.inc(operation)
+    with _pending_lock:
+        room = max(PROFILE_RETRY_MAX - len(_pending), 0)
+        _pending.update(customer_ids[:room])
+        PROFILE_SYNC_PENDING.set(len(_pending))
+    if room < len(customer_ids):
+        logger.error("Customer profile sync failed (%s, %d customers); retry queue full, %d left for the verifier: %s",
+                     operation, len(customer_ids), len(customer_ids) - room, error)
+    else:
+        logger.error("Customer profile sync failed (%s, %d customers), queued for retry: %s",
+                     operation, len(customer_ids), error)
+
+def _forget_pending(customer_ids: Iterable[str]):
+    with _pending_lock:
+        _pending.difference_update(customer_ids)
+        PROFILE_SYNC_PENDING.set(len(_pending))
+
+def _retry_pending():
+    """Rebuild one batch of profiles whose sync failed earlier, now that Mongo answers again"""
+    with _pending_lock:
+        if not _pending:
+            return
+        batch = list(_pending)[:REBUILD_BATCH_SIZE]
+    from pymongo.errors import PyMongoError
+    try:
+        rebuild_profiles(batch)
+    except (PyMongoError, DeadlineExceeded) as e:
+        logger.warning("Customer profile retry failed, %d customers still pending: %s", len(pending_profiles()), e)
+        return
+    _forget_pending(batch)
+    PROFILE_REPAIRS.inc("retry", amount=len(batch))
+    logger.info("Rebuilt %d customer profiles whose sync had failed", len(batch))
+
+def embedded_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Contract/service document as embedded in a profile (without its _id and customerID)"""
+    return {key: value for key, value in document.items() if key not in ("_id", "customerID")}
+
+def embedded_fields(prefix: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+    """$set document for fields of an embedded contract/service ("contract.Churn": ...)"""
+    return {f"{prefix}.{key}": value for key, value in embedded_document(fields).items()}
+
+# Drift verification
+def verify_profiles(repair: bool = False, sample_size: int = 20) -> Dict[str, Any]:
+    """Compare every profile with what the source collections say it should be
+
+    Both sides are streamed in customerID order and merge-joined, so memory stays flat.
+    With repair, stale and missing profiles are rebuilt and orphaned ones deleted; repairs
+    are logged and counted in customer_profile_repairs_total{source="verifier"}.
+    """
+    report = {"checked": 0, "missing": 0, "stale": 0, "orphaned": 0, "samples": {"missing": [], "stale": [], "orphaned": []}}
+    drifted = []
+    pending = pending_profiles()
+    with get_mongo_collection("customers") as customers, get_mongo_collection(PROFILE_COLLECTION) as profiles:
+        expected_docs = customers.aggregate([{"$sort": {"customerID": 1}}] + profile_pipeline(), allowDiskUse=True)
+        actual_docs = profiles.find({}, {"_id": 0}).sort("customerID", 1)
+        expected, actual = next(expected_docs, None), next(actual_docs, None)
+        while expected is not None or actual is not None:
+            if actual is None or (expected is not None and expected["customerID"] < actual["customerID"]):
+                kind, customer_id, expected = "missing", expected["customerID"], next(expected_docs, None)
+            elif expected is None or actual["customerID"] < expected["customerID"]:
+                kind, customer_id, actual = "orphaned", actual["customerID"], next(actual_docs, None)
+            else:
+                kind = "stale" if expected != actual else None
+                customer_id = expected["customerID"]
+                expected, actual = next(expected_docs, None), next(actual_docs, None)
+            report["checked"] += 1
+            if kind is None:
+                continue
+            report[kind] += 1
+            if len(report["samples"][kind]) < sample_size:
+                report["samples"][kind].append(customer_id)
+            drifted.append(customer_id)
+    report["pending_retry"] = len(pending)
+    if repair and drifted:
+        rebuild_profiles(drifted)
+        PROFILE_REPAIRS.inc("verifier", amount=len(drifted))
+        logger.warning("Repaired %d drifted customer profiles (%d missing, %d stale, %d orphaned)",
+                       len(drifted), report["missing"], report["stale"], report["orphaned"])
+    if repair:
+        # Failed syncs from before the scan were either drifted (and rebuilt above) or in order already
+        _forget_pending(pending)
+    report["repaired"] = len(drifted) if repair else 0
+    return report
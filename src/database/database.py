@@ -1,36 +1,119 @@
 import os
-from dotenv import load_dotenv
-import psycopg2
-from pymongo import MongoClient
+import threading
+import time
 from contextlib import contextmanager
 from typing import Optional
+from ..monitoring.metrics import DB_POOL_WAIT
+from .deadline import DeadlineExceeded, check_deadline, remaining
 
-# Load environment variables
-load_dotenv()
+# Database drivers (psycopg2, pymongo) and python-dotenv are imported on first use,
+# so importing the API or a CLI does not pay for drivers it may never touch
 
 # Global connection variables
 _pg_connection = None
+_pg_pool = None
+_pg_pool_slots = None
 _mongo_client = None
 _mongo_db = None
+_mongo_slow_command_listener = None
+_env_loaded = False
+
+def load_env():
+    """Load .env into the environment once (variables already set take precedence)"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def pg_connection_params() -> dict:
+    """psycopg2.connect keyword arguments from the environment"""
+    load_env()
+    return {
+        "dbname": os.getenv("PG_DB"),
+        "user": os.getenv("PG_USER"),
+        "password": os.getenv("PG_PASSWORD"),
+        "host": os.getenv("PG_HOST"),
+        "port": os.getenv("PG_PORT")
+    }
+
+def create_pg_connection(**options):
+    """Open a new PostgreSQL connection (for long-running work such as exports); options go to psycopg2.connect"""
+    import psycopg2
+    return psycopg2.connect(**pg_connection_params(), **options)
+
+def init_pg_pool(minconn: Optional[int] = None, maxconn: Optional[int] = None):
+    """Create this process's connection pool; call after fork (the app lifespan does, once per worker)
+
+    Until a pool exists, get_pg_cursor() falls back to the single shared connection,
+    which keeps scripts and tests working without any setup.
+    """
+    global _pg_pool, _pg_pool_slots
+    if _pg_pool is not None:
+        return _pg_pool
+    import psycopg2
+    from .pg_instrumentation import LazyConnectionPool
+    minconn = int(os.getenv("PG_POOL_MIN", "2")) if minconn is None else minconn
+    maxconn = int(os.getenv("PG_POOL_MAX", "10")) if maxconn is None else maxconn
+    # Connections are opened on demand so a database outage does not stop the worker from starting
+    _pg_pool = LazyConnectionPool(minconn, maxconn, **pg_connection_params())
+    # ThreadedConnectionPool raises when exhausted; the semaphore makes callers wait for a free connection
+    _pg_pool_slots = threading.BoundedSemaphore(maxconn)
+    warm = []
+    try:
+        for _ in range(minconn):
+            warm.append(_pg_pool.getconn())
+    except psycopg2.OperationalError as e:
+        print(f"PostgreSQL pool warm-up failed: {e}")
+    for conn in warm:
+        _pg_pool.putconn(conn)
+    return _pg_pool
+
+def close_pg_pool():
+    """Close every pooled connection"""
+    global _pg_pool, _pg_pool_slots
+    if _pg_pool is not None:
+        _pg_pool.closeall()
+        _pg_pool = None
+        _pg_pool_slots = None
+
+def _checkout_pg_connection():
+    """Take a connection from the pool, waiting up to PG_POOL_TIMEOUT seconds (or the deadline) for one to be released"""
+    timeout = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+    left = remaining()
+    if not _pg_pool_slots.acquire(timeout=timeout if left is None else min(timeout, left)):
+        if left is not None and left < timeout:
+            raise DeadlineExceeded("Request deadline exceeded waiting for a PostgreSQL connection")
+        from psycopg2.pool import PoolError
+        raise PoolError("Timed out waiting for a PostgreSQL connection")
+    try:
+        return _pg_pool.getconn()
+    except Exception:
+        _pg_pool_slots.release()
+        raise
+
+def _checkin_pg_connection(pool, slots, conn):
+    try:
+        pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        slots.release()
 
 def get_pg_connection():
     """Get PostgreSQL connection (singleton pattern)"""
     global _pg_connection
     if _pg_connection is None or _pg_connection.closed:
-        _pg_connection = psycopg2.connect(
-            dbname=os.getenv("PG_DB"),
-            user=os.getenv("PG_USER"),
-            password=os.getenv("PG_PASSWORD"),
-            host=os.getenv("PG_HOST"),
-            port=os.getenv("PG_PORT")
-        )
+        _pg_connection = create_pg_connection()
     return _pg_connection
 
 def get_mongo_client():
     """Get MongoDB client (singleton pattern)"""
-    global _mongo_client
+    global _mongo_client, _mongo_slow_command_listener
     if _mongo_client is None:
-        _mongo_client = MongoClient(os.getenv("MONGO_URI"))
+        from pymongo import MongoClient
+        from .mongo_instrumentation import MongoPoolWaitListener, MongoSlowCommandListener
+        load_env()
+        _mongo_slow_command_listener = MongoSlowCommandListener()
+        _mongo_client = MongoClient(os.getenv("MONGO_URI"), event_listeners=[MongoPoolWaitListener(), _mongo_slow_command_listener])
     return _mongo_client
 
 def get_mongo_db():
@@ -43,22 +126,63 @@ def get_mongo_db():
 
 @contextmanager
 def get_pg_cursor():
-    """Context manager for PostgreSQL cursor"""
-    conn = get_pg_connection()
-    cursor = conn.cursor()
+    """Context manager for PostgreSQL cursor (rows are returned as dicts)
+
+    Under a request deadline the transaction gets SET LOCAL statement_timeout for the
+    time that is left, and a statement cancelled by it raises DeadlineExceeded.
+    """
+    from .pg_instrumentation import InstrumentedCursor
+    check_deadline()
+    started = time.perf_counter()
+    pool, slots = _pg_pool, _pg_pool_slots
+    conn = _checkout_pg_connection() if pool is not None else get_pg_connection()
+    DB_POOL_WAIT.observe(time.perf_counter() - started, "postgresql")
     try:
-        yield cursor
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor)
+        try:
+            left = check_deadline()
+            if left is not None:
+                # 0 would disable the timeout, so never go below 1 ms
+                cursor.execute("SET LOCAL statement_timeout = %s", (max(int(left * 1000), 1),))
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            if not conn.closed:
+                conn.rollback()
+            # 57014 = query_canceled, raised when statement_timeout fires
+            if getattr(e, "pgcode", None) == "57014" and remaining() is not None:
+                raise DeadlineExceeded("Request deadline exceeded during a PostgreSQL statement") from e
+            raise e
+        finally:
+            cursor.close()
     finally:
-        cursor.close()
+        if pool is not None:
+            _checkin_pg_connection(pool, slots, conn)
 
+@contextmanager
 def get_mongo_collection(collection_name: str):
-    """Get MongoDB collection"""
+    """Context manager for MongoDB collection (slow commands are explained on exit)
+
+    Under a request deadline every command inside the block is sent with maxTimeMS for the
+    time that is left (pymongo.timeout), and a timed-out command raises DeadlineExceeded.
+    """
+    left = check_deadline()
     db = get_mongo_db()
-    return db[collection_name]
+    try:
+        if left is None:
+            yield db[collection_name]
+        else:
+            import pymongo
+            from pymongo.errors import PyMongoError
+            try:
+                with pymongo.timeout(left):
+                    yield db[collection_name]
+            except PyMongoError as e:
+                if e.timeout:
+                    raise DeadlineExceeded("Request deadline exceeded during a MongoDB operation") from e
+                raise
+    finally:
+        _mongo_slow_command_listener.record_pending(db)
 
 def test_pg_connection() -> bool:
     """Test PostgreSQL connection"""
@@ -91,6 +215,8 @@ def close_connections():
         _pg_connection.close()
         _pg_connection = None
     
+    close_pg_pool()
+    
     if _mongo_client:
         _mongo_client.close()
         _mongo_client = None
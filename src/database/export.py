@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+from .database import create_pg_connection, get_mongo_collection
+
+# Exportable tables/collections and the PostgreSQL key used for a stable order
+EXPORT_TABLES = {
+    "customers": "customer_id",
+    "contracts": "contract_id",
+    "services": "service_id"
+}
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+def check_export_request(table: str, format: str):
+    """Validate an export request before any data is streamed"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown table '{table}', expected one of: {', '.join(EXPORT_TABLES)}")
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+def export_filename(table: str, format: str, compress: bool) -> str:
+    """File name for an export (gzip only applies to the text formats)"""
+    extension = "parquet" if format == "parquet" else format
+    if compress and format != "parquet":
+        extension += ".gz"
+    return f"{table}.{extension}"
+
+# Row sources
+def iter_pg_batches(table: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Stream a PostgreSQL table in batches through a server-side (named) cursor"""
+    from psycopg2.extras import RealDictCursor
+    order_by = EXPORT_TABLES[table]
+    # Dedicated connection so a long export does not hold the shared API connection
+    conn = create_pg_connection()
+    try:
+        with conn.cursor(name=f"export_{table}", cursor_factory=RealDictCursor) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(f"SELECT * FROM {table} ORDER BY {order_by}")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        conn.rollback()
+    finally:
+        conn.close()
+
+def iter_mongo_batches(collection_name: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Stream a MongoDB collection in batches through a batched cursor"""
+    with get_mongo_collection(collection_name) as collection:
+        batch = []
+        for document in collection.find().sort("_id", 1).batch_size(batch_size):
+            document["_id"] = str(document["_id"])
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+# Encoders
+def _json_default(value: Any) -> Any:
+    """JSON fallback for database types"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _encode_ndjson(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode("utf-8")
+
+def _batch_fields(batch: List[Dict[str, Any]]) -> List[str]:
+    """Every field of a batch's rows, in first-seen order"""
+    return list(dict.fromkeys(field for row in batch for field in row))
+
+class _Columns:
+    """Columns of a CSV/Parquet export, fixed by the first batch
+
+    Both formats write their header/schema before the rest of the data is read, so
+    the columns are the union of the first batch's fields. PostgreSQL rows always share
+    their table's columns. MongoDB documents may not: a missing field is empty/null, but
+    a field that only appears after the first batch fails the export rather than
+    silently dropping data (the client sees the stream break off).
+    """
+
+    def __init__(self, batch: List[Dict[str, Any]], format: str):
+        self.fields = _batch_fields(batch)
+        self.format = format
+        self._known = set(self.fields)
+
+    def check(self, batch: List[Dict[str, Any]]):
+        unknown = set()
+        for row in batch:
+            unknown.update(row.keys() - self._known)
+        if unknown:
+            message = (f"{self.format} export stopped: fields missing from the first batch: {', '.join(sorted(unknown))} "
+                       "(raise batch_size or export NDJSON)")
+            logger.error(message)
+            raise ValueError(message)
+
+def _encode_csv(batches: Iterator[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = columns = None
+    for batch in batches:
+        if writer is None:
+            columns = _Columns(batch, "CSV")
+            writer = csv.DictWriter(buffer, fieldnames=columns.fields, extrasaction="ignore")
+            writer.writeheader()
+        else:
+            columns.check(batch)
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file object whose written bytes can be drained between row groups"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _encode_parquet(batches: Iterator[List[Dict[str, Any]]], compression: str) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _DrainableSink()
+    writer = columns = None
+    for batch in batches:
+        if writer is None:
+            columns = _Columns(batch, "Parquet")
+            # from_pylist would take the column names from the first row alone
+            table = pa.Table.from_pydict({field: [row.get(field) for row in batch] for field in columns.fields})
+            writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+        else:
+            columns.check(batch)
+            table = pa.Table.from_pylist(batch, schema=writer.schema)
+        # One row group per batch keeps memory bounded by the batch size
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def encode_batches(batches: Iterator[List[Dict[str, Any]]], format: str, compress: bool = False) -> Iterator[bytes]:
+    """Encode row batches as NDJSON, CSV or Parquet chunks, optionally compressed"""
+    if format == "parquet":
+        return _encode_parquet(batches, compression="gzip" if compress else "snappy")
+    chunks = _encode_ndjson(batches) if format == "ndjson" else _encode_csv(batches)
+    return _gzip(chunks) if compress else chunks
+
+def export_table(store: str, table: str, format: str = "ndjson", compress: bool = False,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Stream a full table/collection from 'postgresql' or 'mongodb' as encoded chunks"""
+    check_export_request(table, format)
+    if store == "postgresql":
+        batches = iter_pg_batches(table, batch_size)
+    elif store == "mongodb":
+        batches = iter_mongo_batches(table, batch_size)
+    else:
+        raise ValueError(f"Unknown store '{store}', expected 'postgresql' or 'mongodb'")
+    return encode_batches(batches, format, compress)
@@ -0,0 +1,303 @@
+import asyncio
+import csv
+import io
+import json
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List
+from .customer_profiles import sync_profiles
+from .database import create_pg_connection, get_mongo_collection
+
+# pandas is imported on first use; it would otherwise dominate the API's startup time
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Telco dataset columns accepted by the ingest endpoint (extra columns are ignored)
+CUSTOMER_COLUMNS = ['customerID', 'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure', 'PhoneService']
+CONTRACT_COLUMNS = ['Contract', 'PaperlessBilling', 'PaymentMethod', 'MonthlyCharges', 'TotalCharges', 'Churn']
+SERVICE_COLUMNS = ['InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies']
+TELCO_COLUMNS = CUSTOMER_COLUMNS + CONTRACT_COLUMNS + SERVICE_COLUMNS
+
+BOOLEAN_COLUMNS = ['SeniorCitizen', 'Partner', 'Dependents', 'PhoneService', 'PaperlessBilling', 'Churn']
+NUMERIC_COLUMNS = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+INGEST_TARGETS = ("postgresql", "mongodb", "both")
+INGEST_FORMATS = ("ndjson", "csv")
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_LINE_BYTES = 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+
+_TRUE_VALUES = {"yes", "true", "1", "1.0"}
+_FALSE_VALUES = {"no", "false", "0", "0.0"}
+
+# Staging table matching the PostgreSQL columns; rows are COPYed in per chunk
+STAGING_COLUMNS = [
+    "customer_name", "gender", "senior_citizen", "partner", "dependents", "tenure", "phone_service",
+    "contract_type", "paperless_billing", "payment_method", "monthly_charges", "total_charges", "churn",
+    "internet_service", "online_security", "online_backup", "device_protection", "tech_support",
+    "streaming_tv", "streaming_movies"
+]
+
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS ingest_staging (
+        customer_name VARCHAR, gender VARCHAR, senior_citizen BOOLEAN, partner BOOLEAN, dependents BOOLEAN,
+        tenure INT, phone_service BOOLEAN,
+        contract_type VARCHAR, paperless_billing BOOLEAN, payment_method VARCHAR,
+        monthly_charges NUMERIC, total_charges NUMERIC, churn BOOLEAN,
+        internet_service VARCHAR, online_security VARCHAR, online_backup VARCHAR, device_protection VARCHAR,
+        tech_support VARCHAR, streaming_tv VARCHAR, streaming_movies VARCHAR
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Same shape as the composite create in crud_postgresql, reading from the staging table
+STAGING_INSERT = """
+    WITH input AS (
+        SELECT nextval(pg_get_serial_sequence('customers', 'customer_id')) AS customer_id, s.*
+        FROM ingest_staging s
+    ),
+    new_customers AS (
+        INSERT INTO customers (customer_id, customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service)
+        SELECT customer_id, customer_name, gender, senior_citizen, partner, dependents, tenure, phone_service FROM input
+        RETURNING customer_id
+    ),
+    new_contracts AS (
+        INSERT INTO contracts (customer_id, contract_type, paperless_billing, payment_method, monthly_charges, total_charges, churn)
+        SELECT customer_id, contract_type, paperless_billing, payment_method, monthly_charges, total_charges, churn FROM input
+        RETURNING contract_id
+    ),
+    new_services AS (
+        INSERT INTO services (customer_id, internet_service, online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies)
+        SELECT customer_id, internet_service, online_security, online_backup, device_protection, tech_support, streaming_tv, streaming_movies FROM input
+        RETURNING service_id
+    )
+    SELECT (SELECT count(*) FROM new_customers) AS customers,
+           (SELECT count(*) FROM new_contracts) AS contracts,
+           (SELECT count(*) FROM new_services) AS services
+"""
+
+# Parsing
+async def iter_records(body: AsyncIterator[bytes], format: str) -> AsyncIterator[Dict[str, Any]]:
+    """Incrementally parse an NDJSON or CSV byte stream into records (one line at a time)"""
+    buffer = b""
+    header = None
+    async for chunk in body:
+        buffer += chunk
+        if b"\n" not in buffer:
+            if len(buffer) > MAX_LINE_BYTES:
+                raise ValueError(f"Line exceeds {MAX_LINE_BYTES} bytes")
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            record, header = _parse_line(line, format, header)
+            if record is not None:
+                yield record
+    if buffer.strip():
+        record, header = _parse_line(buffer, format, header)
+        if record is not None:
+            yield record
+
+def _parse_line(line: bytes, format: str, header: List[str]):
+    """Parse one line; for CSV the first non-empty line is the header"""
+    text = line.decode("utf-8-sig").strip()
+    if not text:
+        return None, header
+    if format == "ndjson":
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            return {"__error__": f"Invalid JSON: {e}"}, header
+        return record if isinstance(record, dict) else {"__error__": "Expected a JSON object"}, header
+    values = next(csv.reader([text]))
+    if header is None:
+        return None, [value.strip() for value in values]
+    if len(values) != len(header):
+        return {"__error__": f"Expected {len(header)} columns, got {len(values)}"}, header
+    return dict(zip(header, values)), header
+
+# Validation
+def _to_bool(series: "pd.Series"):
+    """Vectorized Yes/No, true/false, 1/0 conversion; returns (values, valid mask)"""
+    text = series.astype(str).str.strip().str.lower()
+    is_true = text.isin(_TRUE_VALUES)
+    return is_true, is_true | text.isin(_FALSE_VALUES)
+
+def validate_chunk(records: List[Dict[str, Any]], first_row: int):
+    """Validate and normalize a chunk of Telco records in one vectorized pass
+
+    Returns the valid rows as a DataFrame and a list of {"row", "error"} entries.
+    """
+    import pandas as pd
+    frame = pd.DataFrame.from_records(records).reindex(columns=TELCO_COLUMNS + ["__error__"])
+    frame.index = range(first_row, first_row + len(frame))
+    errors = pd.Series("", index=frame.index)
+
+    parse_failed = frame["__error__"].notna()
+    errors[parse_failed] = frame.loc[parse_failed, "__error__"]
+
+    missing = frame[TELCO_COLUMNS].isna() | (frame[TELCO_COLUMNS].astype(str).apply(lambda column: column.str.strip()) == "")
+    for column in TELCO_COLUMNS:
+        errors[(errors == "") & missing[column]] = f"Missing {column}"
+
+    for column in NUMERIC_COLUMNS:
+        values = pd.to_numeric(frame[column], errors="coerce")
+        errors[(errors == "") & values.isna()] = f"Invalid number in {column}"
+        frame[column] = values
+
+    for column in BOOLEAN_COLUMNS:
+        values, valid = _to_bool(frame[column])
+        errors[(errors == "") & ~valid] = f"Invalid boolean in {column}"
+        frame[column] = values
+
+    invalid = errors != ""
+    rejected = [{"row": int(row), "error": error} for row, error in errors[invalid].items()]
+    valid = frame.loc[~invalid, TELCO_COLUMNS].copy()
+    valid["tenure"] = valid["tenure"].astype(int)
+    for column in ['customerID', 'gender'] + SERVICE_COLUMNS + ['Contract', 'PaymentMethod']:
+        valid[column] = valid[column].astype(str).str.strip()
+    return valid, rejected
+
+# Loaders
+class PostgresChunkLoader:
+    """COPY validated chunks into a staging table and insert them with one statement per chunk"""
+
+    def __init__(self):
+        self.conn = create_pg_connection()
+        with self.conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_TABLE)
+        self.conn.commit()
+
+    def load(self, frame: "pd.DataFrame") -> Dict[str, int]:
+        import pandas as pd
+        staging = pd.DataFrame({
+            "customer_name": "Customer_" + frame["customerID"],
+            "gender": frame["gender"],
+            "senior_citizen": frame["SeniorCitizen"],
+            "partner": frame["Partner"],
+            "dependents": frame["Dependents"],
+            "tenure": frame["tenure"],
+            "phone_service": frame["PhoneService"],
+            "contract_type": frame["Contract"],
+            "paperless_billing": frame["PaperlessBilling"],
+            "payment_method": frame["PaymentMethod"],
+            "monthly_charges": frame["MonthlyCharges"],
+            "total_charges": frame["TotalCharges"],
+            "churn": frame["Churn"],
+            "internet_service": frame["InternetService"],
+            "online_security": frame["OnlineSecurity"],
+            "online_backup": frame["OnlineBackup"],
+            "device_protection": frame["DeviceProtection"],
+            "tech_support": frame["TechSupport"],
+            "streaming_tv": frame["StreamingTV"],
+            "streaming_movies": frame["StreamingMovies"]
+        }, columns=STAGING_COLUMNS)
+        buffer = io.StringIO()
+        staging.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY ingest_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+                cursor.execute(STAGING_INSERT)
+                customers, contracts, services = cursor.fetchone()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return {"customers": customers, "contracts": contracts, "services": services}
+
+    def close(self):
+        self.conn.close()
+
+class MongoChunkLoader:
+    """Write validated chunks to the MongoDB collections with unordered bulk inserts, then rebuild their profiles"""
+
+    def load(self, frame: "pd.DataFrame") -> Dict[str, int]:
+        from pymongo.errors import BulkWriteError
+        frame = frame.assign(customer_name="Customer_" + frame["customerID"])
+        documents = {
+            "customers": frame[['customerID', 'customer_name'] + CUSTOMER_COLUMNS[1:]].to_dict("records"),
+            "contracts": frame[['customerID'] + CONTRACT_COLUMNS].to_dict("records"),
+            "services": frame[['customerID'] + SERVICE_COLUMNS].to_dict("records")
+        }
+        inserted = {}
+        for collection_name, docs in documents.items():
+            with get_mongo_collection(collection_name) as collection:
+                try:
+                    inserted[collection_name] = len(collection.insert_many(docs, ordered=False).inserted_ids)
+                except BulkWriteError as e:
+                    inserted[collection_name] = e.details.get("nInserted", 0)
+        # Every customer of the chunk: a duplicate customer may still have had its contract or service inserted
+        sync_profiles("ingest", frame["customerID"].tolist())
+        return inserted
+
+    def close(self):
+        pass
+
+async def ingest_stream(body: AsyncIterator[bytes], format: str = "ndjson", target: str = "both",
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Parse, validate and load a streamed upload chunk by chunk
+
+    The body is only read while no chunk is being written, so a slow database
+    slows the upload down (backpressure) instead of buffering it in memory.
+    """
+    if format not in INGEST_FORMATS:
+        raise ValueError(f"Unknown format '{format}', expected one of: {', '.join(INGEST_FORMATS)}")
+    if target not in INGEST_TARGETS:
+        raise ValueError(f"Unknown target '{target}', expected one of: {', '.join(INGEST_TARGETS)}")
+
+    started = time.perf_counter()
+    loaders = {}
+    if target in ("postgresql", "both"):
+        loaders["postgresql"] = await asyncio.to_thread(PostgresChunkLoader)
+    if target in ("mongodb", "both"):
+        loaders["mongodb"] = MongoChunkLoader()
+
+    report = {
+        "rows_received": 0,
+        "rows_valid": 0,
+        "rows_rejected": 0,
+        "chunks": 0,
+        "inserted": {name: {"customers": 0, "contracts": 0, "services": 0} for name in loaders},
+        "errors": [],
+        "failed_chunks": []
+    }
+
+    async def flush(records):
+        first_row = report["rows_received"] - len(records) + 1
+        # pandas coercion of a whole chunk is CPU work; like the writes it runs in a thread
+        frame, rejected = await asyncio.to_thread(validate_chunk, records, first_row)
+        report["chunks"] += 1
+        report["rows_valid"] += len(frame)
+        report["rows_rejected"] += len(rejected)
+        report["errors"].extend(rejected[:MAX_REPORTED_ERRORS - len(report["errors"])])
+        if frame.empty:
+            return
+        for name, loader in loaders.items():
+            try:
+                counts = await asyncio.to_thread(loader.load, frame)
+            except Exception as e:
+                # The chunk is rolled back; report it and keep going with the next one
+                report["failed_chunks"].append({
+                    "target": name,
+                    "rows": [first_row, first_row + len(records) - 1],
+                    "error": str(e)
+                })
+                continue
+            for collection_name, count in counts.items():
+                report["inserted"][name][collection_name] += count
+
+    try:
+        records = []
+        async for record in iter_records(body, format):
+            records.append(record)
+            report["rows_received"] += 1
+            if len(records) >= chunk_size:
+                await flush(records)
+                records = []
+        if records:
+            await flush(records)
+    finally:
+        for loader in loaders.values():
+            await asyncio.to_thread(loader.close)
+
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return report
@@ -0,0 +1,39 @@
+from typing import Dict, List, Tuple
+
+# collection -> [(keys, options)]; created by scripts/setup_databases.py (create_indexes is idempotent)
+MONGO_INDEXES: Dict[str, List[Tuple[list, dict]]] = {
+    "customers": [
+        # get/update/delete/lookup by customerID
+        ([("customerID", 1)], {"name": "customerID_1"}),
+        # Search criteria as equality prefix, then the _id range and sort used for pagination.
+        # Searches on other subsets of these low-cardinality fields walk the _id index and
+        # filter, which stays cheap because most documents match
+        ([("gender", 1), ("SeniorCitizen", 1), ("Partner", 1), ("_id", 1)], {"name": "search_criteria__id"}),
+        # Faceted search: the same equality fields, then the tenure range
+        ([("gender", 1), ("SeniorCitizen", 1), ("Partner", 1), ("tenure", 1)], {"name": "search_criteria_tenure"}),
+        # Name search: prefix ranges and substring key scans in name order, word matches by text score
+        ([("customer_name", 1), ("_id", 1)], {"name": "customer_name__id"}),
+        ([("customer_name", "text")], {"name": "customer_name_text"})
+    ],
+    "contracts": [
+        # Lookups by customerID; the faceted search joins on customerID and filters the
+        # equality fields from the same index entries
+        ([("customerID", 1), ("Contract", 1), ("PaymentMethod", 1), ("Churn", 1)], {"name": "customerID_search"})
+    ],
+    "services": [
+        ([("customerID", 1), ("InternetService", 1)], {"name": "customerID_search"})
+    ],
+    # Read model; $merge on customerID needs the unique index
+    "customer_profiles": [
+        ([("customerID", 1)], {"name": "customerID_1", "unique": True})
+    ]
+}
+
+def ensure_mongo_indexes(db) -> Dict[str, List[str]]:
+    """Create the indexes the CRUD queries rely on; returns the index names per collection"""
+    from pymongo import IndexModel
+    created = {}
+    for collection_name, indexes in MONGO_INDEXES.items():
+        models = [IndexModel(keys, **options) for keys, options in indexes]
+        created[collection_name] = db[collection_name].create_indexes(models)
+    return created
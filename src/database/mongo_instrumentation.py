@@ -0,0 +1,98 @@
+import threading
+from pymongo import monitoring
+from ..monitoring.metrics import DB_POOL_WAIT
+from ..monitoring.slow_queries import SLOW_QUERIES, SLOW_QUERY_EXPLAIN_ANALYZE, is_slow, mongo_filter_shape
+
+# Mongo commands whose slow executions get an explain() plan
+_MONGO_EXPLAINABLE = ("find", "aggregate", "count", "distinct")
+# Driver/session fields that explain() does not accept
+_MONGO_COMMAND_METADATA = ("lsid", "txnNumber", "$clusterTime", "$db", "$readPreference", "apiVersion")
+# Slow commands queued per thread until the accessor exits (bounded for commands issued outside it)
+_MONGO_MAX_PENDING = 100
+
+class MongoSlowCommandListener(monitoring.CommandListener):
+    """Time every MongoDB command and queue slow ones for explain() in get_mongo_collection()"""
+
+    def __init__(self):
+        self._started = {}
+        self._local = threading.local()
+
+    def pending(self) -> list:
+        if not hasattr(self._local, "pending"):
+            self._local.pending = []
+        return self._local.pending
+
+    def started(self, event):
+        self._started[(event.request_id, event.connection_id)] = (event.command_name, event.command)
+
+    def succeeded(self, event):
+        started = self._started.pop((event.request_id, event.connection_id), None)
+        if started is None or getattr(self._local, "explaining", False):
+            return
+        duration_ms = event.duration_micros / 1000
+        pending = self.pending()
+        if is_slow(duration_ms) and len(pending) < _MONGO_MAX_PENDING:
+            pending.append((started[0], started[1], duration_ms))
+
+    def failed(self, event):
+        self._started.pop((event.request_id, event.connection_id), None)
+
+    def record_pending(self, db):
+        """Explain and record the slow commands issued by this thread"""
+        pending = self.pending()
+        if not pending:
+            return
+        self._local.pending = []
+        self._local.explaining = True
+        try:
+            for command_name, command, duration_ms in pending:
+                self._record(db, command_name, command, duration_ms)
+        finally:
+            self._local.explaining = False
+
+    def _record(self, db, command_name, command, duration_ms):
+        collection = command.get(command_name)
+        query = {key: value for key, value in command.items() if key not in _MONGO_COMMAND_METADATA}
+        shape = mongo_filter_shape(query.get("filter", query.get("pipeline", query.get("query", {}))))
+        plan, error = None, None
+        if command_name in _MONGO_EXPLAINABLE:
+            verbosity = "executionStats" if SLOW_QUERY_EXPLAIN_ANALYZE else "queryPlanner"
+            try:
+                plan = db.command("explain", query, verbosity=verbosity)
+                plan = plan.get("queryPlanner", plan) if not SLOW_QUERY_EXPLAIN_ANALYZE else plan
+            except Exception as e:
+                error = str(e)
+        SLOW_QUERIES.record(
+            "mongodb", duration_ms, command_name, shape,
+            plan=_json_safe(plan), collection=collection, error=error
+        )
+
+def _json_safe(value):
+    """Convert BSON-specific values in an explain() plan to JSON-friendly ones"""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class MongoPoolWaitListener(monitoring.ConnectionPoolListener):
+    """Record how long MongoDB operations wait to check out a pooled connection"""
+
+    def connection_checked_out(self, event):
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            DB_POOL_WAIT.observe(duration, "mongodb")
+
+    # Other pool events are not recorded
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+    def connection_checked_in(self, event): pass
@@ -0,0 +1,56 @@
+import time
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from .deadline import check_deadline
+from ..monitoring.slow_queries import SLOW_QUERIES, SLOW_QUERY_EXPLAIN_ANALYZE, is_slow, normalize_sql, value_shape
+
+class LazyConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that opens connections on demand and keeps up to minconn of them idle"""
+
+    def __init__(self, minconn: int, maxconn: int, *args, **kwargs):
+        # The parent opens minconn connections eagerly, which fails when the database is down
+        super().__init__(0, maxconn, *args, **kwargs)
+        self.minconn = minconn
+
+# Statements that can be EXPLAINed (utility statements such as CREATE/COPY cannot)
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that times every statement and captures slow ones with their plan
+
+    No statement is sent once the request deadline has passed.
+    """
+
+    def execute(self, query, vars=None):
+        check_deadline()
+        started = time.perf_counter()
+        result = super().execute(query, vars)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if is_slow(duration_ms):
+            self._record_slow_query(query, vars, duration_ms)
+        return result
+
+    def _record_slow_query(self, query, vars, duration_ms):
+        sql = query.decode() if isinstance(query, bytes) else str(query)
+        plan, error = None, None
+        statement = sql.lstrip().lower()
+        if statement.startswith(_EXPLAINABLE):
+            # EXPLAIN ANALYZE re-executes the statement, so only do it for reads
+            analyze = SLOW_QUERY_EXPLAIN_ANALYZE and statement.startswith("select")
+            options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+            # Savepoint so a failing EXPLAIN does not abort the caller's transaction
+            savepoint = not self.connection.autocommit
+            with self.connection.cursor() as explain_cursor:
+                try:
+                    if savepoint:
+                        explain_cursor.execute("SAVEPOINT slow_query_explain")
+                    explain_cursor.execute(f"EXPLAIN ({options}) {sql}", vars)
+                    plan = explain_cursor.fetchone()[0]
+                    if savepoint:
+                        explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+                except psycopg2.Error as e:
+                    error = str(e).strip()
+                    if savepoint:
+                        explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        SLOW_QUERIES.record("postgresql", duration_ms, normalize_sql(sql), value_shape(vars), plan=plan, error=error)
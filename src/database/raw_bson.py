@@ -0,0 +1,49 @@
+import os
+from typing import Any, Dict, List, Optional
+
+# GET routes answer straight from raw BSON by default; set MONGO_RAW_READS=false to go through dicts.
+# The pipelines below convert _id with $toString, which needs MongoDB 4.0 or newer
+MONGO_RAW_READS = os.getenv("MONGO_RAW_READS", "true").lower() == "true"
+
+# Converts _id to its hex string on the server, so documents need no fix-up in Python
+ID_AS_STRING = {"$addFields": {"_id": {"$toString": "$_id"}}}
+
+def raw_collection(collection):
+    """Same collection, returning RawBSONDocument (undecoded bytes) instead of dicts"""
+    from bson.codec_options import CodecOptions
+    from bson.raw_bson import RawBSONDocument
+    return collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+
+def read_pipeline(criteria: Dict[str, Any], skip: int = 0, limit: Optional[int] = None, sort_by_id: bool = False,
+                  projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+    """Aggregation equivalent of find(criteria, projection).sort("_id").skip(skip).limit(limit) with _id as a string"""
+    pipeline = [{"$match": criteria}]
+    if sort_by_id:
+        pipeline.append({"$sort": {"_id": 1}})
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit:
+        pipeline.append({"$limit": limit})
+    if projection:
+        pipeline.append({"$project": projection})
+    pipeline.append(ID_AS_STRING)
+    return pipeline
+
+def encode_json(documents) -> bytes:
+    """Encode raw documents as a JSON array with one BSON decode and one JSON encode, both native
+
+    decode_all still builds a dict per document (in C). What the raw path skips is the
+    Python-level work around that: the per-document _id rewrite and the response model
+    validation and encoding FastAPI runs on the dict path. pydantic-core is the encoder
+    FastAPI itself uses, so the bytes match the dict path (datetimes as ISO strings, other
+    BSON types such as ObjectId through str()).
+    """
+    from bson import decode_all
+    from pydantic_core import to_json
+    return to_json(decode_all(b"".join(document.raw for document in documents)), fallback=str)
+
+def encode_json_one(document) -> Optional[bytes]:
+    """Encode a single raw document as a JSON object (None stays None)"""
+    if document is None:
+        return None
+    return encode_json([document])[1:-1]
@@ -0,0 +1,37 @@
+import os
+from typing import List
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sql", "schema_design.sql")
+
+def split_sql(sql: str) -> List[str]:
+    """Statements of a SQL script, split on semicolons outside $$-quoted function bodies
+
+    Comment lines and psql meta-commands (\\c) are dropped, so every statement starts with
+    its keyword.
+    """
+    statements, current, in_body = [], [], False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not in_body and (stripped.startswith("--") or stripped.startswith("\\")):
+            continue
+        for index, piece in enumerate(line.split("$$")):
+            if index:
+                current.append("$$")
+                in_body = not in_body
+            if in_body:
+                current.append(piece)
+                continue
+            *finished, rest = piece.split(";")
+            for part in finished:
+                current.append(part)
+                statements.append("".join(current))
+                current = []
+            current.append(rest)
+        current.append("\n")
+    statements.append("".join(current))
+    return [statement.strip() for statement in statements if statement.strip()]
+
+def schema_statements(path: str = SCHEMA_FILE) -> List[str]:
+    """Statements of sql/schema_design.sql"""
+    with open(path) as file:
+        return split_sql(file.read())
@@ -0,0 +1,157 @@
+import copy
+import os
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+from ..monitoring.metrics import REGISTRY
+from .deadline import DeadlineExceeded
+
+# Identical concurrent reads share one database call; set SINGLE_FLIGHT_ENABLED=false to disable
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+# How long a finished call's result is still handed to identical calls, in milliseconds
+SINGLE_FLIGHT_WINDOW_MS = float(os.getenv("SINGLE_FLIGHT_WINDOW_MS", "20"))
+
+READ_PREFIXES = ("get_", "search_", "count_")
+WRITE_PREFIXES = ("create_", "update_", "delete_", "bulk_")
+
+# Finished calls are swept once the table grows past this many keys
+_SWEEP_THRESHOLD = 256
+# One group per store, so a write through any CRUD class of a store invalidates all its reads
+_FLIGHTS: Dict[str, "SingleFlight"] = {}
+
+DB_READ_CALLS = REGISTRY.counter(
+    "db_read_calls_total", "Read calls through the single-flight layer by store and operation",
+    ("store", "operation"))
+DB_READ_COALESCED = REGISTRY.counter(
+    "db_read_coalesced_total", "Read calls answered from another identical call (no database round trip)",
+    ("store", "operation"))
+
+class _Call:
+    __slots__ = ("generation", "done", "finished_at", "result", "error")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of call arguments (lists and dicts included); raises TypeError otherwise"""
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if hasattr(value, "dict") and callable(value.dict):
+        return (type(value).__name__, _freeze(value.dict()))
+    hash(value)
+    return value
+
+class SingleFlight:
+    """Thread-safe call deduplication: identical calls share one execution and its result
+
+    A call joins an identical call that is still running, or takes the result of one
+    that finished less than `window` seconds ago. Errors are shared with callers that
+    were waiting but are never reused afterwards. The caller that ran the call gets its
+    result as is; callers that share it get deep copies, so mutating a shared result does
+    not leak into other requests.
+    """
+
+    def __init__(self, window: float = SINGLE_FLIGHT_WINDOW_MS / 1000):
+        self.window = window
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        # Bumped by every write; calls from an older generation may predate the write
+        self._generation = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]):
+        """Run fn() or share an identical call's outcome; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and not self._reusable(call, time.monotonic()):
+                call = None
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call(self._generation)
+                if len(self._calls) > _SWEEP_THRESHOLD:
+                    self._sweep()
+
+        if not leader:
+            call.done.wait()
+            # The leader's deadline is its own; a waiter runs the call again under its own deadline
+            if isinstance(call.error, DeadlineExceeded):
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            call.finished_at = time.monotonic()
+            if call.error is not None or self.window <= 0:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def forget(self):
+        """Stop sharing every earlier call so the next read goes to the database (called after writes)"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, call in self._calls.items() if call.done.is_set()]:
+                del self._calls[key]
+
+    def _reusable(self, call: _Call, now: float) -> bool:
+        if call.generation != self._generation:
+            return False
+        if not call.done.is_set():
+            return True
+        return call.error is None and now - call.finished_at <= self.window
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key in [key for key, call in self._calls.items() if not self._reusable(call, now)]:
+            del self._calls[key]
+
+def coalesce_reads(cls, store: str, flight: Optional[SingleFlight] = None):
+    """Route a CRUD class's read methods through a single-flight group; writes clear shared results"""
+    if not SINGLE_FLIGHT_ENABLED:
+        return cls
+    flight = flight or _FLIGHTS.setdefault(store, SingleFlight())
+    for name, attribute in list(vars(cls).items()):
+        if not isinstance(attribute, staticmethod):
+            continue
+        if name.startswith(READ_PREFIXES):
+            setattr(cls, name, staticmethod(_coalesced(attribute.__func__, flight, store, name)))
+        elif name.startswith(WRITE_PREFIXES):
+            setattr(cls, name, staticmethod(_invalidating(attribute.__func__, flight)))
+    return cls
+
+def _coalesced(func: Callable, flight: SingleFlight, store: str, operation: str) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        DB_READ_CALLS.inc(store, operation)
+        try:
+            key = (operation, _freeze(args), _freeze(kwargs))
+        except TypeError:
+            return func(*args, **kwargs)
+        result, shared = flight.do(key, lambda: func(*args, **kwargs))
+        if shared:
+            DB_READ_COALESCED.inc(store, operation)
+        return result
+    return wrapper
+
+def _invalidating(func: Callable, flight: SingleFlight) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            flight.forget()
+    return wrapper
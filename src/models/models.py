@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+from datetime import date, datetime
 
 # Customer Models
 class CustomerBase(BaseModel):
@@ -86,6 +86,18 @@ class Service(ServiceBase):
     class Config:
         from_attributes = True
 
+# Composite Models
+class CustomerComplete(Customer):
+    contracts: List[Contract] = []
+    services: List[Service] = []
+
+class CustomerCompleteCreate(CustomerCreate):
+    contract: ContractBase
+    service: ServiceBase
+
+class CustomerCompleteBatchCreate(BaseModel):
+    customers: List[CustomerCompleteCreate] = Field(..., min_length=1, max_length=1000)
+
 # MongoDB Models (using dict structure)
 class CustomerMongo(BaseModel):
     customerID: str
@@ -116,6 +128,143 @@ class ServiceMongo(BaseModel):
     StreamingTV: str
     StreamingMovies: str
 
+# MongoDB Bulk Write Models
+class MongoBulkOperation(BaseModel):
+    op: Literal["insert", "update", "delete"]
+    # Target of update/delete (inserts take it from the document)
+    customerID: Optional[str] = None
+    # Full document for insert, fields to $set for update
+    document: Optional[Dict[str, Any]] = None
+    # Update only: insert the document when no customerID matches
+    upsert: bool = False
+
+class MongoBulkRequest(BaseModel):
+    operations: List[MongoBulkOperation] = Field(..., min_length=1, max_length=10000)
+
+class MongoBulkOperationResult(BaseModel):
+    index: int
+    op: str
+    ok: bool
+    # _id of the inserted or upserted document
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class MongoBulkResult(BaseModel):
+    inserted_count: int = 0
+    matched_count: int = 0
+    modified_count: int = 0
+    deleted_count: int = 0
+    upserted_count: int = 0
+    # Operation index -> _id of the upserted document
+    upserted_ids: Dict[int, str] = {}
+    error_count: int = 0
+    results: List[MongoBulkOperationResult] = []
+
+# Customer Search Models (PostgreSQL search and MongoDB faceted search)
+class CustomerSearchFilters(BaseModel):
+    # Customer fields
+    gender: Optional[str] = None
+    senior_citizen: Optional[bool] = None
+    partner: Optional[bool] = None
+    dependents: Optional[bool] = None
+    tenure_min: Optional[int] = None
+    tenure_max: Optional[int] = None
+    # Contract fields
+    contract_type: Optional[str] = None
+    payment_method: Optional[str] = None
+    paperless_billing: Optional[bool] = None
+    monthly_charges_min: Optional[float] = None
+    monthly_charges_max: Optional[float] = None
+    total_charges_min: Optional[float] = None
+    total_charges_max: Optional[float] = None
+    churn: Optional[bool] = None
+    # Service fields
+    internet_service: Optional[str] = None
+
+# PostgreSQL search: one hit per matching contract, with its customer and internet service
+class CustomerSearchHit(BaseModel):
+    customer_id: int
+    customer_name: Optional[str] = None
+    gender: Optional[str] = None
+    senior_citizen: Optional[bool] = None
+    partner: Optional[bool] = None
+    dependents: Optional[bool] = None
+    tenure: Optional[int] = None
+    phone_service: Optional[bool] = None
+    contract_id: int
+    contract_type: Optional[str] = None
+    payment_method: Optional[str] = None
+    paperless_billing: Optional[bool] = None
+    monthly_charges: Optional[float] = None
+    total_charges: Optional[float] = None
+    churn: Optional[bool] = None
+    internet_service: Optional[str] = None
+
+class CustomerSearchPage(BaseModel):
+    results: List[CustomerSearchHit]
+    # Pass as `after` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+# Customer name search: pg_trgm similarity of the name to the query (0-1)
+class CustomerNameMatch(Customer):
+    score: float
+
+# MongoDB Faceted Search Models
+class FacetCount(BaseModel):
+    value: Any
+    count: int
+
+class MongoFacetedSearchResult(BaseModel):
+    total: int
+    facets: Dict[str, List[FacetCount]]
+    # Customers with their contract and service embedded
+    results: List[Dict[str, Any]]
+
+# Churn Analytics Models
+class ChurnSegment(BaseModel):
+    segment: str
+    contracts: int
+    churned: int
+    churn_rate: float
+    avg_monthly_charges: Optional[float] = None
+
+class ChurnAnalytics(BaseModel):
+    # Dimension (contract_type, payment_method, tenure_bucket, internet_service) -> segments
+    segments: Dict[str, List[ChurnSegment]]
+    # When the numbers were computed (view refresh or Mongo aggregation) and how long ago
+    refreshed_at: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+
+# Contract Log Models
+class ContractLog(BaseModel):
+    log_id: int
+    customer_id: int
+    old_total: Optional[float] = None
+    new_total: Optional[float] = None
+    updated_at: datetime
+
+class ContractLogDaily(BaseModel):
+    customer_id: int
+    day: date
+    updates: int
+    # Total before the day's first change and after its last one
+    first_old_total: Optional[float] = None
+    last_new_total: Optional[float] = None
+    min_new_total: Optional[float] = None
+    max_new_total: Optional[float] = None
+
+# Lookup Models
+class LookupRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class MongoLookupRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class LookupResult(BaseModel):
+    id: Any
+    found: bool
+    data: Optional[dict] = None
+
 # Response Models
 class APIResponse(BaseModel):
     message: str
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from ..database.database import create_pg_connection, get_mongo_client
+from .metrics import REGISTRY
+
+# Seconds between background probes
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+# Upper bound for a single probe (connect + query), in seconds
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+# A snapshot older than this is reported as stale (the prober is stuck or stopped)
+HEALTH_STALE_AFTER = float(os.getenv("HEALTH_STALE_AFTER", str(HEALTH_CHECK_INTERVAL * 3)))
+
+HEALTH_CHECK_UP = REGISTRY.gauge(
+    "health_check_up", "1 if the last background probe of a dependency succeeded", ("check",))
+HEALTH_CHECK_LATENCY = REGISTRY.gauge(
+    "health_check_latency_seconds", "Latency of the last background probe of a dependency", ("check",))
+
+class PostgresProbe:
+    """SELECT 1 on a dedicated connection, so probes never queue behind (or block) API queries"""
+
+    def __init__(self, timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.timeout = timeout
+        self._connection = None
+
+    def __call__(self):
+        import psycopg2
+        try:
+            if self._connection is None or self._connection.closed:
+                self._connection = create_pg_connection(
+                    connect_timeout=max(int(self.timeout), 1),
+                    options=f"-c statement_timeout={int(self.timeout * 1000)}"
+                )
+                self._connection.autocommit = True
+            with self._connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        except psycopg2.Error:
+            self.close()
+            raise
+
+    def close(self):
+        if self._connection is not None and not self._connection.closed:
+            self._connection.close()
+        self._connection = None
+
+def mongo_probe(timeout: float = HEALTH_CHECK_TIMEOUT):
+    """ping through the shared client, bounded by the probe timeout"""
+    import pymongo
+    with pymongo.timeout(timeout):
+        get_mongo_client().admin.command("ping")
+
+class HealthProber:
+    """Background thread probing each dependency on an interval and caching the results"""
+
+    def __init__(self, checks: Dict[str, Callable[[], Any]], interval: float = HEALTH_CHECK_INTERVAL,
+                 stale_after: float = HEALTH_STALE_AFTER):
+        self.checks = checks
+        self.interval = interval
+        self.stale_after = stale_after
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + HEALTH_CHECK_TIMEOUT)
+            self._thread = None
+        for check in self.checks.values():
+            if hasattr(check, "close"):
+                check.close()
+
+    def _run(self):
+        while True:
+            self.probe()
+            if self._stop.wait(self.interval):
+                return
+
+    def probe(self):
+        """Run every check once and replace the cached results"""
+        results = {}
+        for name, check in self.checks.items():
+            previous = self._results.get(name, {})
+            started = time.perf_counter()
+            try:
+                check()
+                error = None
+            except Exception as e:
+                error = str(e).strip() or type(e).__name__
+            latency = time.perf_counter() - started
+            results[name] = {
+                "status": "connected" if error is None else "disconnected",
+                "latency_ms": round(latency * 1000, 3),
+                "error": error,
+                "consecutive_failures": 0 if error is None else previous.get("consecutive_failures", 0) + 1
+            }
+            HEALTH_CHECK_UP.set(1 if error is None else 0, name)
+            HEALTH_CHECK_LATENCY.set(latency, name)
+        with self._lock:
+            self._results = results
+            self._checked_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cached results; probes inline once if there is no background thread and no results yet"""
+        if self._checked_at is None and not self.running:
+            self.probe()
+        with self._lock:
+            results, checked_at = dict(self._results), self._checked_at
+        if checked_at is None:
+            # The background thread is still running its first probe
+            return {"overall": "starting", "checked_at": None, "age_seconds": None, "stale": False, "checks": {}}
+        age = time.time() - checked_at
+        stale = age > self.stale_after
+        healthy = not stale and all(result["status"] == "connected" for result in results.values())
+        return {
+            "overall": "healthy" if healthy else "unhealthy",
+            "checked_at": checked_at,
+            "age_seconds": round(age, 3),
+            "stale": stale,
+            "checks": results
+        }
+
+HEALTH_PROBER = HealthProber({"postgresql": PostgresProbe(), "mongodb": mongo_probe})
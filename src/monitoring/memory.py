@@ -0,0 +1,139 @@
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Stack depth recorded per allocation when tracing is started without an explicit value
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "25"))
+# Number of snapshots kept in memory (oldest are dropped first); snapshots can be large
+MEMORY_MAX_SNAPSHOTS = int(os.getenv("MEMORY_MAX_SNAPSHOTS", "10"))
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Allocations made by the tracer itself and the import machinery are noise
+_NOISE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux /proc), or None where unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def max_rss_bytes() -> int:
+    """Peak resident set size of the process"""
+    # ru_maxrss is kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _statistic(stat, group_by: str) -> Dict[str, Any]:
+    frames = [{"file": frame.filename, "line": frame.lineno} for frame in stat.traceback]
+    entry = {"size_bytes": stat.size, "count": stat.count}
+    if group_by == "traceback":
+        entry["traceback"] = frames
+    else:
+        entry.update(frames[0] if group_by == "lineno" else {"file": frames[0]["file"]})
+    return entry
+
+def _difference(stat, group_by: str) -> Dict[str, Any]:
+    entry = _statistic(stat, group_by)
+    entry.update({"size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff})
+    return entry
+
+class MemoryTracker:
+    """Start/stop tracemalloc and keep a bounded set of named snapshots
+
+    Tracing and snapshots belong to this process; with several workers every description
+    carries the pid of the worker it came from.
+    """
+
+    def __init__(self, max_snapshots: int = MEMORY_MAX_SNAPSHOTS):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = MEMORY_TRACE_FRAMES):
+        if tracemalloc.is_tracing():
+            raise ValueError("Allocation tracing is already running")
+        tracemalloc.start(frames)
+
+    def stop(self):
+        """Stop tracing; snapshots already taken are kept so they can still be compared"""
+        if not tracemalloc.is_tracing():
+            raise ValueError("Allocation tracing is not running")
+        tracemalloc.stop()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "pid": os.getpid(),
+            "tracing": self.tracing,
+            "traceback_frames": tracemalloc.get_traceback_limit() if self.tracing else None,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "rss_bytes": rss_bytes(),
+            "max_rss_bytes": max_rss_bytes(),
+            "snapshots": self.snapshots()
+        }
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise ValueError("Allocation tracing is not running")
+        return tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+
+    def take_snapshot(self, name: Optional[str] = None) -> Dict[str, Any]:
+        snapshot = self._snapshot()
+        name = name or time.strftime("%Y%m%dT%H%M%S")
+        # Totals are summed once here; status() and listings only read them
+        description = {
+            "name": name,
+            "pid": os.getpid(),
+            "taken_at": time.time(),
+            "traced_bytes": sum(trace.size for trace in snapshot.traces),
+            "traces": len(snapshot.traces)
+        }
+        with self._lock:
+            self._snapshots.pop(name, None)
+            self._snapshots[name] = (description, snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return dict(description)
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(description) for description, _ in self._snapshots.values()]
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    def get(self, name: str) -> tracemalloc.Snapshot:
+        with self._lock:
+            if name not in self._snapshots:
+                raise KeyError(name)
+            return self._snapshots[name][1]
+
+    def top(self, group_by: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+        """Largest live allocations right now, grouped by line, file or traceback"""
+        stats = self._snapshot().statistics(group_by)
+        return [_statistic(stat, group_by) for stat in stats[:limit]]
+
+    def diff(self, base: str, target: str, group_by: str = "lineno", limit: int = 20) -> List[Dict[str, Any]]:
+        """Call sites whose live allocations grew (or shrank) the most between two snapshots"""
+        stats = self.get(target).compare_to(self.get(base), group_by)
+        return [_difference(stat, group_by) for stat in stats[:limit]]
+
+MEMORY_TRACKER = MemoryTracker()
@@ -0,0 +1,281 @@
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Default latency buckets in seconds (Prometheus client defaults)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+ALLOCATION_BUCKETS = (10000, 100000, 1000000, 5000000, 10000000, 50000000, 100000000, 500000000)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class for a labelled metric; values are keyed by label value tuples"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Tuple) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(label) for label in labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self, const_labels: Dict[str, str] = None) -> List[str]:
+        """Text-format lines; const_labels are added to every sample"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        const_labels = const_labels or {}
+        names = self.labelnames + tuple(const_labels)
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in sorted(items):
+            lines.extend(self._render_sample(names, labels + tuple(const_labels.values()), value))
+        return lines
+
+    def _render_sample(self, names: Tuple[str, ...], labels: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(names, labels)} {_format_value(value)}"]
+
+class Counter(Metric):
+    """Monotonically increasing counter"""
+    type_name = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    type_name = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Histogram(Metric):
+    """Cumulative histogram with fixed upper bounds"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _render_sample(self, names: Tuple[str, ...], labels: Tuple, state) -> List[str]:
+        counts, total, count = state[0][:], state[1], state[2]
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = _format_labels(names, labels, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        label_str = _format_labels(names, labels)
+        lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def render(self, const_labels: Dict[str, str] = None) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render(const_labels))
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# HTTP metrics
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method, route and status", ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being served")
+HTTP_REQUEST_SIZE = REGISTRY.histogram(
+    "http_request_size_bytes", "HTTP request body size by route", ("route",), buckets=SIZE_BUCKETS)
+HTTP_RESPONSE_SIZE = REGISTRY.histogram(
+    "http_response_size_bytes", "HTTP response body size by route", ("route",), buckets=SIZE_BUCKETS)
+HTTP_REQUEST_PEAK_ALLOCATION = REGISTRY.histogram(
+    "http_request_peak_allocation_bytes",
+    "Peak Python heap growth while serving a request, by route (only while allocation tracing is on)",
+    ("route",), buckets=ALLOCATION_BUCKETS)
+
+# Database metrics
+DB_OPERATION_DURATION = REGISTRY.histogram(
+    "db_operation_duration_seconds", "Time spent in CRUD methods by store and operation",
+    ("store", "operation"), buckets=DB_LATENCY_BUCKETS)
+DB_OPERATION_ERRORS = REGISTRY.counter(
+    "db_operation_errors_total", "CRUD method failures by store and operation", ("store", "operation"))
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a database connection by store",
+    ("store",), buckets=DB_LATENCY_BUCKETS)
+
+def instrument_crud(cls, store: str):
+    """Wrap every public static method of a CRUD class so its duration is recorded"""
+    for name, attribute in list(vars(cls).items()):
+        if name.startswith("_") or not isinstance(attribute, staticmethod):
+            continue
+        setattr(cls, name, staticmethod(_timed(attribute.__func__, store, name)))
+    return cls
+
+def _timed(func: Callable, store: str, operation: str) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            DB_OPERATION_ERRORS.inc(store, operation)
+            raise
+        finally:
+            DB_OPERATION_DURATION.observe(time.perf_counter() - started, store, operation)
+    return wrapper
+
+# Middleware
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status, payload sizes and in-flight requests
+
+    While tracemalloc is tracing it also records how far the traced heap peaked above its level at
+    the start of the request. Peaks are process-wide, so concurrent requests inflate each other's
+    numbers; the histogram is meant for spotting copy-heavy routes, not exact accounting.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+        request_size = [0]
+        response_size = [0]
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size[0] += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size[0] += len(message.get("body", b""))
+            await send(message)
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = route_label(scope)
+            if tracing and tracemalloc.is_tracing():
+                HTTP_REQUEST_PEAK_ALLOCATION.observe(max(tracemalloc.get_traced_memory()[1] - baseline, 0), route)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, status[0])
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method, route, status[0])
+            # Chunked uploads carry no Content-Length, so count the body as the app reads it;
+            # the header still covers a body the route never read
+            HTTP_REQUEST_SIZE.observe(max(request_size[0], _content_length(scope)), route)
+            HTTP_RESPONSE_SIZE.observe(response_size[0], route)
+
+def route_label(scope) -> str:
+    """Route template (e.g. /api/postgresql/customers/{customer_id}) to keep label cardinality bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _content_length(scope) -> int:
+    for name, value in scope.get("headers", ()):
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
@@ -0,0 +1,260 @@
+import cProfile
+import inspect
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+from fastapi.routing import APIRoute
+
+# Profiling is opt-in; when disabled the middleware is not installed at all
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fraction of requests profiled without the header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Client addresses allowed to request a profile with the X-Profile header
+PROFILE_ALLOWED_CLIENTS = {client.strip() for client in os.getenv("PROFILE_ALLOWED_CLIENTS", "127.0.0.1").split(",") if client.strip()}
+# Output directory and the number of profiles kept there (oldest are deleted first)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "telco-api-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+# "collapsed" (sampled stacks, flamegraph.pl/speedscope ready) or "pstats" (cProfile)
+PROFILE_DEFAULT_MODE = os.getenv("PROFILE_MODE", "collapsed")
+# Stack sampling interval for collapsed profiles, in seconds
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+PROFILE_MODES = ("collapsed", "pstats")
+PROFILE_EXTENSIONS = {"collapsed": ".collapsed", "pstats": ".pstats"}
+
+class StackSampler:
+    """Periodically sample the stacks of a set of threads and count collapsed stacks ("a;b;c")"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def add_thread(self, thread_id: int):
+        self.thread_ids = self.thread_ids | {thread_id}
+
+    def remove_thread(self, thread_id: int):
+        self.thread_ids = self.thread_ids - {thread_id}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self.thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+class ProfileStore:
+    """Directory of profile files bounded by count"""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = os.path.abspath(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.directory, os.path.basename(name))
+
+    def new_name(self, method: str, path: str, mode: str) -> str:
+        route = path.strip("/").replace("/", "_") or "root"
+        return f"{time.strftime('%Y%m%dT%H%M%S')}_{method.lower()}_{route[:60]}_{uuid.uuid4().hex[:8]}{PROFILE_EXTENSIONS[mode]}"
+
+    def save_collapsed(self, name: str, stacks: Counter):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path_for(name), "w") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        self._prune()
+
+    def save_pstats(self, name: str, profilers: List[cProfile.Profile]):
+        os.makedirs(self.directory, exist_ok=True)
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(self.path_for(name))
+        self._prune()
+
+    def list(self) -> List[Dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(tuple(PROFILE_EXTENSIONS.values())):
+                stat = os.stat(self.path_for(name))
+                entries.append({"name": name, "size_bytes": stat.st_size, "created_at": stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry["created_at"], reverse=True)
+
+    def _prune(self):
+        with self._lock:
+            for entry in self.list()[self.max_files:]:
+                try:
+                    os.remove(self.path_for(entry["name"]))
+                except FileNotFoundError:
+                    pass
+
+PROFILE_STORE = ProfileStore()
+
+class ProfileSession:
+    """Profile of one request: the event loop thread plus the worker threads running its handler"""
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.profilers = []
+        self.sampler = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.mode == "pstats":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            self.profilers.append(profiler)
+        else:
+            self.sampler = StackSampler(threading.get_ident())
+            self.sampler.start()
+
+    def stop(self):
+        if self.mode == "pstats":
+            self.profilers[0].disable()
+        else:
+            self.sampler.stop()
+
+    def save(self, store: ProfileStore, name: str):
+        if self.mode == "pstats":
+            store.save_pstats(name, self.profilers)
+        else:
+            store.save_collapsed(name, self.sampler.stacks)
+
+    @contextmanager
+    def attach(self):
+        """Profile the calling worker thread until the block exits"""
+        thread_id = threading.get_ident()
+        if self.sampler is not None:
+            self.sampler.add_thread(thread_id)
+            try:
+                yield
+            finally:
+                self.sampler.remove_thread(thread_id)
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler per process, and it already sees every thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self.profilers.append(profiler)
+
+# Session of the request being profiled; copied into the threadpool with the rest of the context
+_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+def profiled_thread(func: Callable) -> Callable:
+    """Wrap a sync route handler so the worker thread running it joins the request's profile"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return func(*args, **kwargs)
+        with session.attach():
+            return func(*args, **kwargs)
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose sync endpoints are profiled in the threadpool thread that runs them"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = profiled_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling opted-in requests (X-Profile header from an allowed client, or sampling)
+
+    Only one request is profiled at a time. cProfile and the stack sampler observe the event
+    loop thread and, through ProfiledRoute, the worker thread running a sync handler; other
+    requests' work on the event loop thread still shows up in the profile.
+    """
+
+    def __init__(self, app, store: ProfileStore = PROFILE_STORE, sample_rate: float = PROFILE_SAMPLE_RATE,
+                 allowed_clients=PROFILE_ALLOWED_CLIENTS, default_mode: str = PROFILE_DEFAULT_MODE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self.allowed_clients = set(allowed_clients)
+        self.default_mode = default_mode
+        self._busy = threading.Lock()
+
+    def requested_mode(self, scope) -> Optional[str]:
+        """Profile mode for this request, or None if it should not be profiled"""
+        header = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                header = value.decode("latin-1").strip().lower()
+                break
+        if header and header not in ("0", "false"):
+            client = scope.get("client")
+            if client and client[0] in self.allowed_clients:
+                return header if header in PROFILE_MODES else self.default_mode
+            return None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.default_mode
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode = self.requested_mode(scope)
+        if mode is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        name = self.store.new_name(scope["method"], scope["path"], mode)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        session = ProfileSession(mode)
+        token = _session.set(session)
+        try:
+            session.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                session.stop()
+                session.save(self.store, name)
+        finally:
+            _session.reset(token)
+            self._busy.release()
@@ -0,0 +1,84 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Statements slower than this are captured with their plan
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# Number of slow queries kept in memory (oldest are dropped first)
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+# Re-run slow PostgreSQL SELECTs with EXPLAIN ANALYZE / use Mongo executionStats
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "false").lower() == "true"
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace inline literals so equivalent statements group together"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def value_shape(value: Any) -> Any:
+    """Describe a parameter by type (and size for collections) without keeping its value"""
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        if items and not isinstance(items[0], (dict, list, tuple)):
+            return f"{type(value).__name__}[{len(items)} x {type(items[0]).__name__}]"
+        return [value_shape(item) for item in items[:10]]
+    return type(value).__name__
+
+def mongo_filter_shape(value: Any) -> Any:
+    """Replace the values in a Mongo filter/pipeline with their types, keeping operators and fields"""
+    if isinstance(value, dict):
+        return {key: mongo_filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [mongo_filter_shape(item) for item in value]
+    return type(value).__name__
+
+class SlowQueryLog:
+    """Thread-safe bounded ring buffer of slow statements"""
+
+    def __init__(self, maxlen: int = SLOW_QUERY_LOG_SIZE):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, store: str, duration_ms: float, query: Any, params_shape: Any,
+               plan: Any = None, collection: Optional[str] = None, error: Optional[str] = None):
+        entry = {
+            "store": store,
+            "timestamp": time.time(),
+            "duration_ms": round(duration_ms, 3),
+            "collection": collection,
+            "query": query,
+            "params_shape": params_shape,
+            "plan": plan,
+            "explain_error": error
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.total += 1
+
+    def entries(self, store: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent entries first, optionally filtered by store"""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        if store:
+            entries = [entry for entry in entries if entry["store"] == store]
+        return entries[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+SLOW_QUERIES = SlowQueryLog()
+
+def is_slow(duration_ms: float) -> bool:
+    return duration_ms >= SLOW_QUERY_THRESHOLD_MS
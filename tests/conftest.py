@@ -0,0 +1,2 @@
+def pytest_configure(config):
+    config.addinivalue_line("markers", "database: needs a PostgreSQL server (PG_* settings); skipped without one")
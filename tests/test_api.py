@@ -6,6 +6,7 @@ This script tests all CRUD operations for both PostgreSQL and MongoDB
 
 import requests
 import json
+import os
 import time
 from typing import Dict, Any
 
@@ -274,6 +275,407 @@ def test_mongodb_crud():
         print(f"  ❌ MongoDB test error: {e}")
         return False
 
+def test_batch_lookups():
+    """Test batched multi-get endpoints for PostgreSQL and MongoDB"""
+    print("\n📦 Testing Batched Lookups...")
+    
+    try:
+        # PostgreSQL lookup keeps request order and flags missing IDs
+        print("  Looking up PostgreSQL customers...")
+        ids = [1, 999999999, 1]
+        response = requests.post(f"{BASE_URL}/api/postgresql/customers/lookup", json={"ids": ids})
+        if response.status_code == 200:
+            results = response.json()
+            if [r["id"] for r in results] == ids and not results[1]["found"]:
+                print(f"  ✅ Lookup returned {len(results)} results in request order")
+            else:
+                print("  ❌ Lookup results out of order or missing ID not flagged")
+                return False
+        else:
+            print(f"  ❌ Failed to look up customers: {response.status_code}")
+            return False
+        
+        # MongoDB lookup
+        print("  Looking up MongoDB customers...")
+        ids = ["TEST_MISSING_ID"]
+        response = requests.post(f"{BASE_URL}/api/mongodb/customers/lookup", json={"ids": ids})
+        if response.status_code == 200 and response.json()[0]["found"] is False:
+            print("  ✅ Missing MongoDB customer flagged as not found")
+        else:
+            print(f"  ❌ Failed to look up MongoDB customers: {response.status_code}")
+            return False
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Batched lookup test error: {e}")
+        return False
+
+def test_postgresql_search():
+    """Test PostgreSQL customer search with sorting and keyset pagination"""
+    print("\n🔎 Testing PostgreSQL Search...")
+    
+    try:
+        params = {"contract_type": "Month-to-month", "sort": "-monthly_charges", "limit": 5}
+        response = requests.get(f"{BASE_URL}/api/postgresql/customers/search", params=params)
+        if response.status_code != 200:
+            print(f"  ❌ Search failed: {response.status_code}")
+            return False
+        first = response.json()
+        charges = [hit["monthly_charges"] for hit in first["results"]]
+        if any(hit["contract_type"] != "Month-to-month" for hit in first["results"]) or charges != sorted(charges, reverse=True):
+            print("  ❌ Search results not filtered or not sorted")
+            return False
+        print(f"  ✅ Search returned {len(first['results'])} sorted results")
+        
+        # Next page continues after the last hit of the first one
+        if first["next_cursor"]:
+            response = requests.get(f"{BASE_URL}/api/postgresql/customers/search",
+                                    params={**params, "after": first["next_cursor"]})
+            second = response.json()
+            seen = {hit["contract_id"] for hit in first["results"]}
+            if response.status_code != 200 or any(hit["contract_id"] in seen for hit in second["results"]) or \
+                    any(hit["monthly_charges"] > charges[-1] for hit in second["results"]):
+                print("  ❌ Second page overlaps or is out of order")
+                return False
+            print(f"  ✅ Second page returned {len(second['results'])} results")
+        
+        # Cursor from another sort order is rejected
+        if first["next_cursor"]:
+            response = requests.get(f"{BASE_URL}/api/postgresql/customers/search",
+                                    params={"sort": "tenure", "after": first["next_cursor"]})
+            if response.status_code != 400:
+                print(f"  ❌ Mismatched cursor not rejected: {response.status_code}")
+                return False
+            print("  ✅ Mismatched cursor rejected")
+        
+        # Exact total count in headers, body unchanged
+        response = requests.get(f"{BASE_URL}/api/postgresql/customers/search", params={**params, "count": "exact"})
+        total = response.headers.get("X-Total-Count")
+        if response.status_code != 200 or total is None or int(total) < len(first["results"]) or \
+                response.headers.get("X-Total-Count-Estimated") != "false":
+            print(f"  ❌ Exact count missing or wrong: {total}")
+            return False
+        print(f"  ✅ Search matches {total} contracts in total")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Search test error: {e}")
+        return False
+
+def test_composite_create():
+    """Test creating a customer with its contract and service in one statement"""
+    print("\n🧩 Testing Composite Create...")
+    
+    name = f"Composite Test {int(time.time() * 1000)}"
+    customer_data = {
+        "customer_name": name,
+        "gender": "Male",
+        "senior_citizen": False,
+        "partner": False,
+        "dependents": True,
+        "tenure": 3,
+        "phone_service": True,
+        "contract": {
+            "contract_type": "One year",
+            "paperless_billing": False,
+            "payment_method": "Mailed check",
+            "monthly_charges": 42.10,
+            "total_charges": 126.30,
+            "churn": False
+        },
+        "service": {
+            "internet_service": "DSL",
+            "online_security": "No",
+            "online_backup": "Yes",
+            "device_protection": "No",
+            "tech_support": "No",
+            "streaming_tv": "No",
+            "streaming_movies": "No"
+        }
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/postgresql/customers/complete", json=customer_data)
+        if response.status_code != 200:
+            print(f"  ❌ Composite create failed: {response.status_code}")
+            return False
+        created = response.json()
+        customer_id = created["customer_id"]
+        if len(created["contracts"]) != 1 or len(created["services"]) != 1 or \
+                created["contracts"][0]["customer_id"] != customer_id or \
+                created["services"][0]["customer_id"] != customer_id:
+            print("  ❌ Contract or service missing or not linked to the customer")
+            return False
+        print(f"  ✅ Customer {customer_id} created with its contract and service")
+        requests.delete(f"{BASE_URL}/api/postgresql/customers/{customer_id}")
+        
+        # A batch with one invalid row creates nothing (the service value is too long for its column)
+        print("  Creating a batch with an invalid row...")
+        invalid = {**customer_data, "service": {**customer_data["service"], "internet_service": "x" * 60}}
+        response = requests.post(f"{BASE_URL}/api/postgresql/customers/complete/batch",
+                                 json={"customers": [customer_data, invalid]})
+        if response.status_code != 400:
+            print(f"  ❌ Invalid batch not rejected: {response.status_code}")
+            return False
+        response = requests.get(f"{BASE_URL}/api/postgresql/customers/search/name",
+                                params={"q": name, "mode": "prefix"})
+        if response.status_code != 200 or response.json():
+            print("  ❌ Rejected batch left rows behind")
+            return False
+        print("  ✅ Rejected batch rolled back entirely")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Composite create test error: {e}")
+        return False
+
+def test_mongodb_bulk_write():
+    """Test mixed MongoDB bulk writes and their per-operation results"""
+    print("\n📚 Testing MongoDB Bulk Writes...")
+    
+    customer = {
+        "customerID": "TEST_BULK_001",
+        "customer_name": "Test Bulk Customer",
+        "gender": "Female",
+        "SeniorCitizen": False,
+        "Partner": True,
+        "Dependents": False,
+        "tenure": 5,
+        "PhoneService": True
+    }
+    operations = [
+        {"op": "insert", "document": customer},
+        {"op": "update", "customerID": "TEST_BULK_001", "document": {"tenure": 6}},
+        {"op": "update", "customerID": "TEST_BULK_002", "document": {**customer, "customerID": "TEST_BULK_002"}, "upsert": True},
+        {"op": "delete", "customerID": "TEST_BULK_002"}
+    ]
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/mongodb/customers/bulk", json={"operations": operations})
+        if response.status_code != 200:
+            print(f"  ❌ Bulk write failed: {response.status_code}")
+            return False
+        result = response.json()
+        results = result["results"]
+        if [r["index"] for r in results] != [0, 1, 2, 3] or not all(r["ok"] for r in results) or \
+                not results[0]["id"] or results[2]["id"] != result["upserted_ids"].get("2"):
+            print(f"  ❌ Per-operation results wrong: {results}")
+            return False
+        if (result["inserted_count"], result["upserted_count"], result["deleted_count"], result["error_count"]) != (1, 1, 1, 0):
+            print(f"  ❌ Bulk write totals wrong: {result}")
+            return False
+        print(f"  ✅ {len(results)} operations applied, inserted _id {results[0]['id']}")
+        
+        response = requests.get(f"{BASE_URL}/api/mongodb/customers/TEST_BULK_001")
+        if response.status_code != 200 or response.json()["tenure"] != 6:
+            print("  ❌ Update in the same batch not applied")
+            return False
+        print("  ✅ Update in the same batch applied")
+        
+        # An invalid operation rejects the whole request before anything is written
+        response = requests.post(f"{BASE_URL}/api/mongodb/customers/bulk", json={"operations": [
+            {"op": "delete", "customerID": "TEST_BULK_001"},
+            {"op": "update", "document": {"tenure": 7}}
+        ]})
+        if response.status_code != 400 or "Operation 1" not in response.json()["detail"]:
+            print(f"  ❌ Invalid operation not rejected: {response.status_code}")
+            return False
+        if requests.get(f"{BASE_URL}/api/mongodb/customers/TEST_BULK_001").status_code != 200:
+            print("  ❌ Rejected request still deleted the customer")
+            return False
+        print("  ✅ Invalid operation rejected before any write")
+        
+        requests.post(f"{BASE_URL}/api/mongodb/customers/bulk",
+                      json={"operations": [{"op": "delete", "customerID": "TEST_BULK_001"}]})
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Bulk write test error: {e}")
+        return False
+
+def test_mongodb_faceted_search():
+    """Test MongoDB faceted search totals and facet counts"""
+    print("\n🧮 Testing MongoDB Faceted Search...")
+    
+    try:
+        params = {"gender": "Female", "contract_type": "Month-to-month", "limit": 5}
+        response = requests.get(f"{BASE_URL}/api/mongodb/customers/search/facets", params=params)
+        if response.status_code != 200:
+            print(f"  ❌ Faceted search failed: {response.status_code}")
+            return False
+        first = response.json()
+        total = first["total"]
+        if len(first["results"]) > min(total, 5):
+            print("  ❌ More results than the total or the limit")
+            return False
+        # Every match falls in exactly one bucket of each facet
+        for name, buckets in first["facets"].items():
+            if sum(bucket["count"] for bucket in buckets) != total:
+                print(f"  ❌ {name} facet counts do not add up to the total {total}")
+                return False
+        if [bucket["value"] for bucket in first["facets"]["contract_type"]] not in ([], ["Month-to-month"]):
+            print("  ❌ Contract type facet not limited by the contract type filter")
+            return False
+        if any(hit["gender"] != "Female" or hit["contract"]["Contract"] != "Month-to-month" for hit in first["results"]):
+            print("  ❌ Results do not match the filters")
+            return False
+        print(f"  ✅ {total} matches, facet counts add up")
+        
+        # The total covers every match, not just the page
+        if first["results"]:
+            response = requests.get(f"{BASE_URL}/api/mongodb/customers/search/facets",
+                                    params={**params, "after": first["results"][-1]["_id"]})
+            second = response.json()
+            seen = {hit["_id"] for hit in first["results"]}
+            if response.status_code != 200 or second["total"] != total or \
+                    any(hit["_id"] in seen for hit in second["results"]):
+                print("  ❌ Next page changed the total or repeated results")
+                return False
+            print(f"  ✅ Next page returned {len(second['results'])} new results with the same total")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Faceted search test error: {e}")
+        return False
+
+def test_total_counts():
+    """Test count=none|estimated|exact on the list routes"""
+    print("\n🔢 Testing Total Counts...")
+    
+    try:
+        for path in ("/api/postgresql/customers/", "/api/mongodb/customers/"):
+            response = requests.get(f"{BASE_URL}{path}", params={"limit": 5})
+            if response.status_code != 200 or "X-Total-Count" in response.headers:
+                print(f"  ❌ {path} counted without being asked: {response.status_code}")
+                return False
+            totals = {}
+            for mode in ("estimated", "exact"):
+                response = requests.get(f"{BASE_URL}{path}", params={"limit": 5, "count": mode})
+                total = response.headers.get("X-Total-Count")
+                estimated = response.headers.get("X-Total-Count-Estimated")
+                if response.status_code != 200 or total is None or estimated != ("true" if mode == "estimated" else "false"):
+                    print(f"  ❌ {path} count={mode} headers wrong: {total}, {estimated}")
+                    return False
+                if int(total) < len(response.json()):
+                    print(f"  ❌ {path} count={mode} is below the page size")
+                    return False
+                totals[mode] = int(total)
+            print(f"  ✅ {path} estimated {totals['estimated']}, exact {totals['exact']}")
+        
+        # MongoDB has no estimate for a filter, so no header rather than a hidden full count
+        params = {"gender": "Male", "limit": 5}
+        response = requests.get(f"{BASE_URL}/api/mongodb/customers/search/", params={**params, "count": "estimated"})
+        if response.status_code != 200 or "X-Total-Count" in response.headers:
+            print("  ❌ Filtered MongoDB estimate returned a count")
+            return False
+        response = requests.get(f"{BASE_URL}/api/mongodb/customers/search/", params={**params, "count": "exact"})
+        if response.status_code != 200 or int(response.headers.get("X-Total-Count", -1)) < len(response.json()):
+            print("  ❌ Filtered MongoDB exact count missing")
+            return False
+        print(f"  ✅ Filtered MongoDB search: no estimate, exact {response.headers['X-Total-Count']}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Total count test error: {e}")
+        return False
+
+def test_billing_history():
+    """Test the billing history written by the contract trigger and its daily rollup"""
+    print("\n🧾 Testing Billing History...")
+    
+    customer_data = {
+        "customer_name": "Billing History Test",
+        "gender": "Female",
+        "senior_citizen": False,
+        "partner": False,
+        "dependents": False,
+        "tenure": 1,
+        "phone_service": True,
+        "contract": {
+            "contract_type": "Month-to-month",
+            "paperless_billing": True,
+            "payment_method": "Electronic check",
+            "monthly_charges": 50.00,
+            "total_charges": 50.00,
+            "churn": False
+        },
+        "service": {
+            "internet_service": "No",
+            "online_security": "No",
+            "online_backup": "No",
+            "device_protection": "No",
+            "tech_support": "No",
+            "streaming_tv": "No",
+            "streaming_movies": "No"
+        }
+    }
+    customer_id = None
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/postgresql/customers/complete", json=customer_data)
+        if response.status_code != 200:
+            print(f"  ❌ Failed to create customer: {response.status_code}")
+            return False
+        created = response.json()
+        customer_id = created["customer_id"]
+        contract_id = created["contracts"][0]["contract_id"]
+        
+        # Two total_charges changes and one change that leaves it alone (not logged)
+        for update in ({"total_charges": 100.00}, {"payment_method": "Mailed check"}, {"total_charges": 150.00}):
+            response = requests.put(f"{BASE_URL}/api/postgresql/contracts/{contract_id}", json=update)
+            if response.status_code != 200:
+                print(f"  ❌ Failed to update contract: {response.status_code}")
+                return False
+        
+        history_url = f"{BASE_URL}/api/postgresql/customers/{customer_id}/billing-history"
+        response = requests.get(history_url, params={"days": 1})
+        if response.status_code != 200:
+            print(f"  ❌ Billing history failed: {response.status_code}")
+            return False
+        changes = [(entry["old_total"], entry["new_total"]) for entry in response.json()]
+        if changes != [(100.0, 150.0), (50.0, 100.0)]:
+            print(f"  ❌ Billing history wrong or not newest first: {changes}")
+            return False
+        print(f"  ✅ Billing history has the {len(changes)} total changes, newest first")
+        
+        response = requests.get(history_url, params={"days": 1000})
+        if response.status_code != 422:
+            print(f"  ❌ Window past the raw log retention not rejected: {response.status_code}")
+            return False
+        print("  ✅ Window past the raw log retention rejected")
+        
+        # Rollups are written by the maintenance pass (admin token needed to trigger one)
+        admin_token = os.getenv("ADMIN_TOKEN")
+        if admin_token:
+            response = requests.post(f"{BASE_URL}/admin/contract-logs/maintain", headers={"X-Admin-Token": admin_token})
+            if response.status_code != 200:
+                print(f"  ❌ Maintenance failed: {response.status_code}")
+                return False
+            if not response.json()["data"]["skipped"]:
+                response = requests.get(f"{history_url}/daily", params={"days": 1})
+                days = response.json()
+                if response.status_code != 200 or len(days) != 1 or days[0]["updates"] != 2 or \
+                        (days[0]["first_old_total"], days[0]["last_new_total"]) != (50.0, 150.0):
+                    print(f"  ❌ Daily rollup wrong: {days}")
+                    return False
+                print("  ✅ Daily rollup has the day's first and last totals")
+        else:
+            print("  ⏭️  ADMIN_TOKEN not set, daily rollup not checked")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Billing history test error: {e}")
+        return False
+    finally:
+        if customer_id is not None:
+            requests.delete(f"{BASE_URL}/api/postgresql/customers/{customer_id}")
+
 def main():
     """Main test function"""
     print("🚀 Starting API Tests...")
@@ -293,13 +695,42 @@ def main():
     # Test MongoDB
     mongo_success = test_mongodb_crud()
     
+    # Test batched lookups
+    lookup_success = test_batch_lookups()
+    
+    # Test PostgreSQL search
+    search_success = test_postgresql_search()
+    
+    # Test composite create
+    composite_success = test_composite_create()
+    
+    # Test MongoDB bulk writes
+    bulk_success = test_mongodb_bulk_write()
+    
+    # Test MongoDB faceted search
+    facets_success = test_mongodb_faceted_search()
+    
+    # Test total counts
+    counts_success = test_total_counts()
+    
+    # Test billing history
+    billing_success = test_billing_history()
+    
     # Summary
     print("\n" + "=" * 50)
     print("📝 Test Summary:")
     print(f"   PostgreSQL CRUD: {'✅ PASSED' if pg_success else '❌ FAILED'}")
     print(f"   MongoDB CRUD: {'✅ PASSED' if mongo_success else '❌ FAILED'}")
+    print(f"   Batched Lookups: {'✅ PASSED' if lookup_success else '❌ FAILED'}")
+    print(f"   PostgreSQL Search: {'✅ PASSED' if search_success else '❌ FAILED'}")
+    print(f"   Composite Create: {'✅ PASSED' if composite_success else '❌ FAILED'}")
+    print(f"   MongoDB Bulk Writes: {'✅ PASSED' if bulk_success else '❌ FAILED'}")
+    print(f"   MongoDB Faceted Search: {'✅ PASSED' if facets_success else '❌ FAILED'}")
+    print(f"   Total Counts: {'✅ PASSED' if counts_success else '❌ FAILED'}")
+    print(f"   Billing History: {'✅ PASSED' if billing_success else '❌ FAILED'}")
     
-    if pg_success and mongo_success:
+    if all([pg_success, mongo_success, lookup_success, search_success, composite_success, bulk_success,
+            facets_success, counts_success, billing_success]):
         print("\n🎉 All tests passed! The API is working correctly.")
     else:
         print("\n⚠️ Some tests failed. Check the logs above for details.")
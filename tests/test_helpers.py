@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Unit tests for helpers that need no running API or database
+
+Run with: python -m pytest tests/test_helpers.py
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from src.api import admission
+from src.api.admin import require_admin
+from src.api.main import app, count_headers
+from src.api.timeouts import DEFAULT_DEADLINES_MS, _header_budget_ms, parse_deadlines
+from src.database.analytics import TTLCache
+from src.database.contract_logs import add_months, partition_name, roll_up
+from src.database.counts import count_mongo
+from src.database.crud_mongodb import name_search_query
+from src.database.crud_postgresql import (CustomerCRUD, build_name_search_query, build_search_count_query, build_search_query,
+                                          decode_search_cursor, encode_search_cursor)
+from src.database import customer_profiles, ingest
+from src.monitoring.memory import MemoryTracker
+from src.monitoring.metrics import HTTP_REQUEST_SIZE
+from src.database.export import encode_batches
+from src.api.admission import AdmissionGroup, parse_limits, route_group
+from src.database.single_flight import SingleFlight, coalesce_reads
+from src.models.models import CustomerSearchFilters
+
+# Admission control
+def test_route_groups():
+    """Streaming routes have their own group, separate from lookups and batches"""
+    assert route_group("GET", "/api/postgresql/export/customers") == "streaming"
+    assert route_group("POST", "/api/ingest") == "streaming"
+    assert route_group("POST", "/api/postgresql/customers/lookup") == "bulk"
+    assert route_group("POST", "/api/mongodb/customers/bulk") == "bulk"
+    assert route_group("GET", "/api/postgresql/customers/search") == "search"
+    assert route_group("GET", "/api/postgresql/customers/") == "list"
+    assert route_group("POST", "/api/postgresql/customers/") == "default"
+    assert route_group("GET", "/health") is None
+
+def test_parse_limits():
+    limits = parse_limits("search=2:3, bulk=5")
+    assert limits["search"] == (2, 3)
+    assert limits["bulk"] == (5, admission.DEFAULT_LIMITS["bulk"][1])
+    try:
+        parse_limits("nope=1:1")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown group accepted")
+
+def test_admission_queue_full_and_hand_off():
+    async def scenario():
+        group = AdmissionGroup("test", concurrency=1, queue_size=1, queue_timeout=1)
+        assert await group.acquire() is None
+        waiting = asyncio.create_task(group.acquire())
+        await asyncio.sleep(0)
+        assert group.waiting == 1
+        # Queue is full
+        assert await group.acquire() == "queue_full"
+        # The slot goes straight to the waiter, active stays at the limit
+        group.release()
+        assert await waiting is None
+        assert group.active == 1
+        group.release()
+        assert group.active == 0
+    asyncio.run(scenario())
+
+def test_admission_timeout():
+    async def scenario():
+        group = AdmissionGroup("test", concurrency=1, queue_size=4, queue_timeout=0.01)
+        assert await group.acquire() is None
+        assert await group.acquire() == "timeout"
+        assert group.waiting == 0
+        group.release()
+        assert group.active == 0
+    asyncio.run(scenario())
+
+def test_admission_timeout_after_hand_off_passes_slot_on(monkeypatch):
+    """A slot handed over just as the wait times out is released, not leaked"""
+    async def scenario():
+        group = AdmissionGroup("test", concurrency=1, queue_size=4, queue_timeout=1)
+        assert await group.acquire() is None
+
+        async def racing_wait_for(waiter, timeout):
+            group.release()
+            raise asyncio.TimeoutError
+        monkeypatch.setattr(admission.asyncio, "wait_for", racing_wait_for)
+
+        assert await group.acquire() == "timeout"
+        assert group.active == 0
+    asyncio.run(scenario())
+
+def test_admission_limits_database_routes_running_at_once(monkeypatch):
+    """Database routes block in the threadpool, so the list limit (8) is what bounds them"""
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def get_customers(skip=0, limit=100):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.1)
+        with lock:
+            running[0] -= 1
+        return []
+    monkeypatch.setattr(CustomerCRUD, "get_customers", staticmethod(get_customers))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/api/postgresql/customers/") for _ in range(12)))
+    started = time.perf_counter()
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * 12
+    assert peak[0] == admission.DEFAULT_LIMITS["list"][0]
+    # Two rounds of 0.1 s, not twelve one after another on the event loop
+    assert time.perf_counter() - started < 0.6
+
+# Metrics
+def test_request_size_counts_chunked_bodies():
+    """A chunked upload has no Content-Length; the size comes from the body the route read"""
+    route = "/api/postgresql/customers/"
+
+    def observed():
+        state = HTTP_REQUEST_SIZE._values.get((route,))
+        return (state[1], state[2]) if state else (0.0, 0)
+
+    async def chunks():
+        for chunk in (b'{"customerID": ', b'"x"', b" " * 1000):
+            yield chunk
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(route, content=chunks(), headers={"Content-Type": "application/json"})
+    total, count = observed()
+    response = asyncio.run(scenario())
+    # Invalid customer, rejected after the whole body was read
+    assert response.status_code == 422
+    assert observed() == (total + 1018, count + 1)
+
+# Memory tracing
+def test_memory_snapshots_keep_their_totals():
+    tracker = MemoryTracker(max_snapshots=1)
+    tracker.start(1)
+    try:
+        allocated = [bytearray(1000) for _ in range(10)]
+        first = tracker.take_snapshot("a")
+        assert first["pid"] == os.getpid() and first["traces"] > 0
+        second = tracker.take_snapshot("b")
+    finally:
+        tracker.stop()
+    # Only the newest snapshot is kept, described with the totals taken when it was stored
+    assert tracker.snapshots() == [second] and len(allocated) == 10
+    status = tracker.status()
+    assert status["pid"] == os.getpid() and status["snapshots"] == [second]
+
+# Request deadlines
+def test_parse_deadlines():
+    deadlines = parse_deadlines(" search=2000, list=0 ")
+    assert deadlines["search"] == 2000
+    # 0 means no deadline
+    assert deadlines["list"] is None
+    assert deadlines["bulk"] == DEFAULT_DEADLINES_MS["bulk"]
+    assert parse_deadlines(None) == DEFAULT_DEADLINES_MS
+    # Streaming routes never get a deadline, so they cannot be given one
+    for value in ("streaming=1000", "nope=1"):
+        try:
+            parse_deadlines(value)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{value} accepted")
+
+def test_header_budget():
+    assert _header_budget_ms({"headers": [(b"x-request-timeout-ms", b"250")]}) == 250
+    assert _header_budget_ms({"headers": [(b"x-request-timeout-ms", b"0")]}) is None
+    assert _header_budget_ms({"headers": [(b"x-request-timeout-ms", b"soon")]}) is None
+    assert _header_budget_ms({"headers": []}) is None
+
+# Admin token
+def _rejected(token):
+    try:
+        require_admin(token)
+    except HTTPException as e:
+        return e.status_code == 403
+    return False
+
+def test_require_admin_fails_closed(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert _rejected(None)
+    assert _rejected("anything")
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert _rejected(None)
+    assert _rejected("wrong")
+    assert not _rejected("secret")
+
+# Total counts
+def test_filtered_mongo_estimate_is_omitted():
+    # No database call: a filtered estimate is not available
+    assert count_mongo("customers", {"gender": "Female"}, "estimated") == (None, True)
+    assert count_headers("estimated", lambda mode: (None, True)) == {}
+    assert count_headers("none", lambda mode: (10, False)) == {}
+    assert count_headers("exact", lambda mode: (10, False)) == {
+        "X-Total-Count": "10", "X-Total-Count-Estimated": "false"}
+
+# PostgreSQL search
+def test_search_cursor_round_trip():
+    cursor = encode_search_cursor("monthly_charges", True, 70.35, 1234)
+    assert decode_search_cursor(cursor, "monthly_charges", True) == (70.35, 1234)
+    # A cursor only continues the sort order it was made for
+    for sort, descending in (("monthly_charges", False), ("tenure", True)):
+        try:
+            decode_search_cursor(cursor, sort, descending)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("cursor accepted for another sort order")
+    try:
+        decode_search_cursor("not a cursor", "tenure", False)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("malformed cursor accepted")
+
+def test_build_search_query():
+    filters = CustomerSearchFilters(contract_type="Month-to-month", tenure_min=12, internet_service="Fiber optic")
+    after = encode_search_cursor("monthly_charges", True, 70.35, 1234)
+    query, params = build_search_query(filters, sort="monthly_charges", descending=True, limit=5, after=after)
+    assert params == {"limit": 5, "contract_type": "Month-to-month", "tenure_min": 12,
+                      "internet_service": "Fiber optic", "after_id": 1234, "after_value": 70.35}
+    assert "ct.contract_type = %(contract_type)s" in query
+    assert "c.tenure >= %(tenure_min)s" in query
+    assert "ct.monthly_charges IS NOT NULL" in query
+    assert "(ct.monthly_charges, ct.contract_id) < (%(after_value)s, %(after_id)s)" in query
+    assert "ORDER BY ct.monthly_charges DESC, ct.contract_id DESC" in " ".join(query.split())
+    # Every placeholder has a parameter
+    for name in params:
+        assert f"%({name})s" in query
+
+    # Default sort pages on contract_id alone and, without a service filter, selects it with a left join
+    query, params = build_search_query(CustomerSearchFilters(), after=encode_search_cursor("contract_id", False, 7, 7))
+    assert "ct.contract_id > %(after_id)s" in query
+    assert "LEFT JOIN" in query
+    try:
+        build_search_query(CustomerSearchFilters(), sort="customer_name")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown sort accepted")
+
+def test_build_search_count_query():
+    query, params = build_search_count_query(CustomerSearchFilters(churn=True))
+    assert query.startswith("SELECT 1")
+    assert params == {"churn": True}
+    # No service filter: the join is not needed to count
+    assert "services" not in query
+
+# Name search
+def test_name_search_query_mongo():
+    criteria, projection, sort = name_search_query("Ann.", "prefix")
+    # Anchored and escaped, so the customer_name index serves it as a range
+    assert criteria == {"customer_name": {"$regex": "^Ann\\."}} and projection is None
+    assert sort == [("customer_name", 1), ("_id", 1)]
+    criteria, _, _ = name_search_query("ann", "substring")
+    assert criteria == {"customer_name": {"$regex": "ann", "$options": "i"}}
+    criteria, projection, sort = name_search_query("ann smith", "similar")
+    assert criteria == {"$text": {"$search": "ann smith"}}
+    assert projection == {"score": {"$meta": "textScore"}} and sort == [("score", {"$meta": "textScore"})]
+    try:
+        name_search_query("ann", "fuzzy")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown mode accepted")
+
+def test_name_search_query_pg():
+    # LIKE wildcards in the input match literally
+    query, params = build_name_search_query("50%_off", mode="prefix", limit=5)
+    assert params == {"q": "50%_off", "pattern": "50\\%\\_off%", "limit": 5}
+    assert 'COLLATE "C" LIKE' in query
+    _, params = build_name_search_query("ann", mode="substring")
+    assert params["pattern"] == "%ann%"
+    query, _ = build_name_search_query("ann", mode="similar")
+    assert "%% %(q)s" in query
+
+# Contract log partitions
+class _RecordingCursor:
+    def __init__(self):
+        self.params = []
+
+    def execute(self, query, params=None):
+        self.params.append(params)
+
+def test_add_months():
+    assert add_months(date(2024, 1, 1), 1) == date(2024, 2, 1)
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert add_months(date(2024, 3, 1), -15) == date(2022, 12, 1)
+    # Any day of the month gives the first of the target month
+    assert add_months(date(2024, 1, 31), 1) == date(2024, 2, 1)
+    assert partition_name(date(2024, 2, 1)) == "contract_logs_p202402"
+
+def test_roll_up_windows():
+    cursor = _RecordingCursor()
+    # Mid-month to mid-month: one window per month, each ending at the next month or the end
+    assert roll_up(cursor, date(2024, 1, 20), date(2024, 3, 5)) == 45
+    assert [(p["start"], p["end"]) for p in cursor.params] == [
+        (date(2024, 1, 20), date(2024, 2, 1)),
+        (date(2024, 2, 1), date(2024, 3, 1)),
+        (date(2024, 3, 1), date(2024, 3, 5))
+    ]
+    cursor = _RecordingCursor()
+    assert roll_up(cursor, date(2024, 12, 31), date(2025, 1, 1)) == 1
+    assert [(p["start"], p["end"]) for p in cursor.params] == [(date(2024, 12, 31), date(2025, 1, 1))]
+    # Empty range: nothing to do
+    cursor = _RecordingCursor()
+    assert roll_up(cursor, date(2024, 5, 1), date(2024, 5, 1)) == 0
+    assert cursor.params == []
+
+# Export
+def test_csv_columns_are_the_first_batch_union(caplog):
+    batches = iter([[{"a": 1}, {"a": 2, "b": 3}], [{"a": 4}], [{"a": 5, "c": 6}]])
+    chunks = encode_batches(batches, "csv")
+    assert b"".join([next(chunks), next(chunks)]).decode().splitlines() == ["a,b", "1,", "2,3", "4,"]
+    # A field the header cannot hold fails the export instead of being dropped
+    with pytest.raises(ValueError, match="fields missing from the first batch: c"):
+        next(chunks)
+    assert "CSV export stopped" in caplog.text
+
+# Ingest
+def test_mongo_ingest_rebuilds_profiles_of_the_chunk(monkeypatch):
+    pd = pytest.importorskip("pandas")
+    inserted, synced = {}, []
+
+    class FakeCollection:
+        def __init__(self, name):
+            self.name = name
+
+        def insert_many(self, docs, ordered=True):
+            inserted[self.name] = docs
+            return type("InsertManyResult", (), {"inserted_ids": list(range(len(docs)))})()
+
+    @contextmanager
+    def fake_collection(name):
+        yield FakeCollection(name)
+    monkeypatch.setattr(ingest, "get_mongo_collection", fake_collection)
+    monkeypatch.setattr(ingest, "sync_profiles", lambda operation, ids: synced.append((operation, ids)))
+
+    row = dict.fromkeys(ingest.TELCO_COLUMNS, "No")
+    frame = pd.DataFrame([dict(row, customerID="0001-A"), dict(row, customerID="0002-B")])
+    assert ingest.MongoChunkLoader().load(frame) == {"customers": 2, "contracts": 2, "services": 2}
+    assert synced == [("ingest", ["0001-A", "0002-B"])]
+
+# Analytics
+def test_ttl_cache_hands_out_the_expired_value_while_recomputing():
+    cache = TTLCache(ttl=60)
+    assert cache.get(lambda: 1)[0] == 1
+    cache.ttl = 0
+    started, release = threading.Event(), threading.Event()
+
+    def slow_compute():
+        started.set()
+        release.wait(5)
+        return 2
+    recompute = threading.Thread(target=cache.get, args=(slow_compute,))
+    recompute.start()
+    assert started.wait(5)
+    # Neither waits for the running aggregation nor starts another one
+    assert cache.get(lambda: 3)[0] == 1
+    release.set()
+    recompute.join()
+    cache.ttl = 60
+    assert cache.get(lambda: 4)[0] == 2
+    # After clear() callers wait for a new value
+    cache.clear()
+    assert cache.get(lambda: 5)[0] == 5
+
+# Customer profiles
+def test_failed_profile_sync_is_retried_by_the_next_sync(monkeypatch, caplog):
+    from pymongo.errors import AutoReconnect
+    rebuilt = []
+
+    def rebuild_profiles(customer_ids):
+        if "down" in customer_ids:
+            raise AutoReconnect("connection refused")
+        rebuilt.append(sorted(customer_ids))
+    monkeypatch.setattr(customer_profiles, "CUSTOMER_PROFILES_ENABLED", True)
+    monkeypatch.setattr(customer_profiles, "rebuild_profiles", rebuild_profiles)
+    monkeypatch.setattr(customer_profiles, "_pending", set())
+
+    customer_profiles.sync_profiles("ingest", ["down", "0001-A"])
+    assert customer_profiles.pending_profiles() == ["0001-A", "down"]
+    assert "queued for retry" in caplog.text
+    # Mongo answers again: the next sync also rebuilds the queued profiles
+    monkeypatch.setattr(customer_profiles, "rebuild_profiles", lambda ids: rebuilt.append(sorted(ids)))
+    customer_profiles.sync_profiles("create_customer", ["0002-B"])
+    assert rebuilt == [["0002-B"], ["0001-A", "down"]]
+    assert customer_profiles.pending_profiles() == []
+
+# Request coalescing
+def _counting_crud(delay: float):
+    calls = []
+
+    class FakeCRUD:
+        @staticmethod
+        def get_customer(customer_id):
+            calls.append(customer_id)
+            time.sleep(delay)
+            return {"customer_id": customer_id, "services": []}
+
+        @staticmethod
+        def update_customer(customer_id):
+            return True
+    return FakeCRUD, calls
+
+def test_single_flight_joins_calls_in_flight():
+    FakeCRUD, calls = _counting_crud(delay=0.2)
+    coalesce_reads(FakeCRUD, "test", SingleFlight(window=0))
+    start = threading.Barrier(8)
+
+    def read():
+        start.wait()
+        return FakeCRUD.get_customer(1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: read(), range(8)))
+    assert calls == [1]
+    assert all(result == {"customer_id": 1, "services": []} for result in results)
+    # Callers that joined got their own copies
+    results[0]["services"].append("mutated")
+    assert results[1]["services"] == []
+    assert sum(result is results[0] for result in results) == 1
+
+def test_single_flight_window_and_writes():
+    FakeCRUD, calls = _counting_crud(delay=0)
+    coalesce_reads(FakeCRUD, "test", SingleFlight(window=60))
+    first = FakeCRUD.get_customer(1)
+    # Hits within the window are copies of the stored result, the caller that ran the call got it as is
+    hit = FakeCRUD.get_customer(1)
+    assert hit == first and hit is not first
+    hit["services"].append("mutated")
+    assert FakeCRUD.get_customer(1) == {"customer_id": 1, "services": []}
+    FakeCRUD.get_customer(2)
+    assert calls == [1, 2]
+    # A write ends sharing
+    FakeCRUD.update_customer(1)
+    FakeCRUD.get_customer(1)
+    assert calls == [1, 2, 1]
+
+def test_single_flight_coalesces_concurrent_requests(monkeypatch):
+    """Identical requests handled at once in the threadpool share one database call"""
+    calls = []
+
+    class FakeCRUD:
+        @staticmethod
+        def get_customer(customer_id):
+            calls.append(customer_id)
+            time.sleep(0.2)
+            return {"customer_id": customer_id, "customer_name": "Test", "gender": "Female", "senior_citizen": False,
+                    "partner": False, "dependents": False, "tenure": 1, "phone_service": True}
+    coalesce_reads(FakeCRUD, "test", SingleFlight(window=0))
+    monkeypatch.setattr(CustomerCRUD, "get_customer", vars(FakeCRUD)["get_customer"])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.get("/api/postgresql/customers/7") for _ in range(6)))
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * 6
+    assert all(response.json()["customer_id"] == 7 for response in responses)
+    assert calls == [7]
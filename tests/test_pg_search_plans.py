@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL search plan check: no query the search route builds uses a sequential scan
+
+Loads synthetic customers into a scratch schema (the schema from sql/schema_design.sql, as
+benchmarks/bench_pg_search_plans.py does) and EXPLAINs the first and second page of each
+benchmark case. Needs a PostgreSQL server (PG_* settings from .env) and is skipped without
+one; SEARCH_PLAN_ROWS sets the number of customers (default 200000).
+
+Run with: python -m pytest tests/test_pg_search_plans.py
+"""
+
+import os
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+from psycopg2.extras import RealDictCursor
+
+from benchmarks.bench_pg_search_plans import CASES, SCHEMA, explain, scan_nodes, setup
+from src.database.crud_postgresql import build_search_query, encode_search_cursor
+from src.database.database import create_pg_connection
+from src.models.models import CustomerSearchFilters
+
+pytestmark = pytest.mark.database
+
+ROWS = int(os.getenv("SEARCH_PLAN_ROWS", "200000"))
+PAGE_SIZE = 100
+
+@pytest.fixture(scope="module")
+def search_cursor():
+    try:
+        conn = create_pg_connection()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+    conn.autocommit = True
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        setup(cursor, ROWS)
+        yield cursor
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+@pytest.mark.parametrize("label, filters, sort, descending", CASES, ids=[case[0] for case in CASES])
+def test_search_plans_use_no_sequential_scan(search_cursor, label, filters, sort, descending):
+    search_filters = CustomerSearchFilters(**filters)
+    after = None
+    for page in (1, 2):
+        query, params = build_search_query(search_filters, sort=sort, descending=descending,
+                                           limit=PAGE_SIZE, after=after)
+        scans = scan_nodes(explain(search_cursor, query, params)["Plan"])
+        assert not [scan for scan in scans if scan[0] == "Seq Scan"], f"page {page}: {scans}"
+
+        # Next page starts after the last row of this one
+        search_cursor.execute(query, params)
+        rows = search_cursor.fetchall()
+        if len(rows) < PAGE_SIZE:
+            break
+        after = encode_search_cursor(sort, descending, rows[-1][sort], rows[-1]["contract_id"])